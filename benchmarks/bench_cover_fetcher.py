@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Benchmark: CoverFetcher against a local HTTP server standing in for the CDN
+
+Serves a fixed set of generated cover images (so many videos share the
+same bytes) from a threaded local server, fetches the synthetic covers of
+a number of users through CoverFetcher and reports throughput, latency,
+connection reuse and dedupe. A few covers are not images and must come
+back as None without failing the others. A second pass over the same
+covers checks that nothing is written twice, and both check that no
+download or write is left tracked. Requires Pillow.
+
+Usage:
+    python benchmarks/bench_cover_fetcher.py [users] [distinct-images] [connections] [latency-ms]
+"""
+
+import asyncio
+import io
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from cover_fetcher import CoverFetcher  # noqa: E402
+from fake_tiktok import synthetic_videos  # noqa: E402
+
+
+def make_covers(count, width=720, height=960):
+    """Distinct JPEG covers roughly the size TikTok serves"""
+    covers = []
+    for i in range(count):
+        image = Image.radial_gradient('L').resize((width, height)).convert('RGB')
+        draw = ImageDraw.Draw(image)
+        for j in range(40):
+            x, y = (i * 37 + j * 53) % width, (i * 91 + j * 29) % height
+            draw.rectangle((x, y, x + 60, y + 90), fill=((i * 50) % 256, (j * 6) % 256, 128))
+        out = io.BytesIO()
+        image.save(out, 'JPEG', quality=90)
+        covers.append(out.getvalue())
+    return covers
+
+
+def cover_index(video_id, count):
+    return zlib.crc32(video_id.encode('ascii')) % count
+
+
+def start_cdn(covers, latency):
+    """Threaded local server returning covers[crc32(video id) % len(covers)]"""
+    stats = {"requests": 0, "connections": set()}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out as separate writes, don't let Nagle hold the body back
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            with lock:
+                stats["requests"] += 1
+                stats["connections"].add(self.client_address)
+            if latency:
+                time.sleep(latency)
+            expires = parse_qs(parsed.query).get('x-expires', ['0'])[0]
+            if int(expires) <= time.time():
+                self.send_error(403, 'Signature expired')
+                return
+            name = parsed.path.rsplit('/', 1)[-1]
+            body = name.encode('ascii') if name.startswith('broken') else covers[cover_index(name, len(covers))]
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+async def fetch_all(fetcher, videos):
+    latencies = []
+
+    async def fetch(user, video):
+        started = time.perf_counter()
+        path = await fetcher.thumbnail(user, video["id"], video["video"]["cover"])
+        latencies.append(time.perf_counter() - started)
+        return path
+
+    started = time.perf_counter()
+    paths = await asyncio.gather(*(fetch(user, video) for user, video in videos))
+    elapsed = time.perf_counter() - started
+    assert not fetcher._in_flight and not fetcher._writes, "finished fetches are released"
+    await fetcher.close()
+    return paths, latencies, elapsed
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    distinct = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    connections = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    latency = float(sys.argv[4]) / 1000 if len(sys.argv) > 4 else 0.02
+
+    covers = make_covers(distinct)
+    server, stats = start_cdn(covers, latency)
+    base_url = f'http://127.0.0.1:{server.server_address[1]}/obj/'
+
+    now = time.time()
+    videos = [(f'user{u}', video) for u in range(users)
+              for video in synthetic_videos(f'user{u}', 7, now=now, cover_base_url=base_url)]
+    # A few covers whose signature has already lapsed are skipped without a request
+    expired = videos[:5]
+    for _, video in expired:
+        video["video"]["cover"] = f'{base_url}{video["id"]}?x-expires={int(now) - 60}'
+    # Covers that are not images fail on their own
+    broken = videos[5:8]
+    for _, video in broken:
+        video["video"]["cover"] = f'{base_url}broken-{video["id"]}?x-expires={int(now) + 3600}'
+    referenced = {cover_index(video["id"], distinct)
+                  for _, video in videos[len(expired) + len(broken):]}
+
+    with tempfile.TemporaryDirectory() as root:
+        fetcher = CoverFetcher(root=root, connections=connections)
+        paths, latencies, elapsed = asyncio.run(fetch_all(fetcher, videos))
+        source_bytes = sum(len(covers[i]) for i in referenced)
+        stored_bytes = sum(os.path.getsize(p) for p in set(paths) if p)
+
+        print(f"{len(videos)} covers from {users} users, {distinct} distinct images, "
+              f"{connections} connections, {latency * 1000:.0f} ms server latency")
+        print(f"  {elapsed:.2f}s, {len(videos) / elapsed:,.0f} covers/s, "
+              f"p50 {percentile(latencies, 50) * 1000:.1f} ms, "
+              f"p99 {percentile(latencies, 99) * 1000:.1f} ms")
+        print(f"  {stats['requests']} requests over {len(stats['connections'])} connections")
+        print(f"  stored {fetcher.stored}, deduplicated {fetcher.deduplicated}, "
+              f"expired {fetcher.expired}, failed {fetcher.failed}")
+        print(f"  {source_bytes:,} bytes of distinct covers stored as {stored_bytes:,} bytes")
+
+        assert fetcher.stored == len(referenced), "each distinct cover is stored once"
+        assert fetcher.expired == len(expired) and fetcher.failed == len(broken)
+        assert paths[len(expired):len(expired) + len(broken)] == [None] * len(broken)
+
+        second = CoverFetcher(root=root, connections=connections)
+        again, _, elapsed = asyncio.run(fetch_all(second, videos))
+        print(f"  second pass: {elapsed:.2f}s, stored {second.stored}, "
+              f"deduplicated {second.deduplicated}")
+        assert second.stored == 0 and again == paths, "nothing is written twice"
+
+    server.shutdown()
+    print("✅ Cover fetcher checks passed")
+
+
+if __name__ == '__main__':
+    main()
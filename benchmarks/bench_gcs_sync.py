@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark: GCSUploader sync mode against the local stub bucket
+
+Uploads a synthetic json/ tree with upload_json_folder(sync=True) through
+benchmarks/gcs_stub.py, then checks that a second sync uploads nothing,
+that only changed files are uploaded again, and that a --manifest file
+round-trips: written by one sync, it replaces the bucket listing in the
+next. Requires google-cloud-storage (gcs_uploader imports it).
+
+Usage:
+    python benchmarks/bench_gcs_sync.py [files] [changed]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.gcs_stub import LocalStorageClient  # noqa: E402
+
+try:
+    from gcs_uploader import GCSUploader, load_manifest  # noqa: E402
+except ImportError as e:
+    print(f"⏭️  Skipping the GCS sync checks (missing dependency: {e})")
+    sys.exit(0)
+
+PREFIX = 'tiktok-data/json/'
+
+
+class ListingDisabledClient(LocalStorageClient):
+    """Stub client that fails if the bucket is listed (manifest syncs must not)"""
+
+    def list_blobs(self, bucket_name, prefix=''):
+        raise AssertionError("the bucket was listed although a manifest was given")
+
+
+def write_users(json_dir, count):
+    os.makedirs(json_dir, exist_ok=True)
+    for i in range(count):
+        with open(os.path.join(json_dir, f'user{i}.json'), 'w', encoding='utf-8') as f:
+            json.dump({"user": f"user{i}", "videos": [{"id": str(i), "title": "x" * 200}]}, f)
+
+
+def touch_users(json_dir, indices):
+    for i in indices:
+        with open(os.path.join(json_dir, f'user{i}.json'), 'w', encoding='utf-8') as f:
+            json.dump({"user": f"user{i}", "videos": [], "changed": time.time()}, f)
+
+
+def sync(client, json_dir, manifest_path=None):
+    uploader = GCSUploader('bench-bucket', client=client)
+    before = client.uploads
+    started = time.perf_counter()
+    synced = uploader.upload_json_folder(json_dir, PREFIX, sync=True, manifest_path=manifest_path)
+    return len(synced), client.uploads - before, time.perf_counter() - started
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    changed = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+
+    with tempfile.TemporaryDirectory() as root:
+        json_dir = os.path.join(root, 'json')
+        manifest_path = os.path.join(root, 'manifest.json')
+        write_users(json_dir, files)
+        client = LocalStorageClient(os.path.join(root, 'gcs'))
+        results = []
+
+        synced, uploads, elapsed = sync(client, json_dir)
+        results.append(("first sync", uploads, elapsed))
+        assert synced == files and uploads == files, "every new file is uploaded"
+
+        synced, uploads, elapsed = sync(client, json_dir)
+        results.append(("unchanged", uploads, elapsed))
+        assert synced == files and uploads == 0, "unchanged files are skipped"
+
+        touch_users(json_dir, range(changed))
+        synced, uploads, elapsed = sync(client, json_dir)
+        results.append((f"{changed} changed", uploads, elapsed))
+        assert synced == files and uploads == changed, "only changed files are uploaded"
+
+        # Without a manifest file the bucket is listed once and the manifest saved
+        synced, uploads, elapsed = sync(client, json_dir, manifest_path)
+        results.append(("manifest written", uploads, elapsed))
+        assert uploads == 0 and os.path.exists(manifest_path)
+        assert load_manifest(manifest_path) == {
+            name: {"md5_hash": blob.md5_hash, "crc32c": blob.crc32c, "size": blob.size}
+            for (_, name), blob in client.blobs.items()}, "manifest matches the bucket"
+
+        # The saved manifest stands in for the listing and is updated after the sync
+        manifest_client = ListingDisabledClient(os.path.join(root, 'gcs'))
+        manifest_client.blobs = client.blobs
+        touch_users(json_dir, range(changed, 2 * changed))
+        synced, uploads, elapsed = sync(manifest_client, json_dir, manifest_path)
+        results.append(("manifest, changed", uploads, elapsed))
+        assert synced == files and uploads == changed, "the manifest detects changed files"
+        synced, uploads, elapsed = sync(manifest_client, json_dir, manifest_path)
+        results.append(("manifest, unchanged", uploads, elapsed))
+        assert uploads == 0, "the updated manifest records the new uploads"
+
+    print(f"\n{files} files, {changed} changed per round")
+    for name, uploads, elapsed in results:
+        print(f"   {name:<22} {uploads:>6} uploads  {elapsed:.3f}s")
+    print("✅ GCS sync checks passed")
+
+
+if __name__ == '__main__':
+    main()
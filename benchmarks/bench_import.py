@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark: CLI start-up time and heavy imports
+
+Runs the light CLI paths (import, --help, json_manager, postprocessing, a
+dry-run scrape) in fresh interpreters, reports their median wall time and
+fails if any of them loads a heavy dependency (Playwright, TikTokApi,
+feedgen, NumPy, google-cloud-storage, httpx, Pillow) or takes longer than
+the budget.
+
+Usage:
+    python benchmarks/bench_import.py [--runs 5] [--budget-ms 250] [--importtime] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(REPO_ROOT, 'cli.py')
+
+HEAVY_MODULES = ('playwright', 'TikTokApi', 'feedgen', 'numpy', 'google.cloud.storage',
+                 'httpx', 'PIL')
+
+CASES = {
+    "import cli": "import cli",
+    "import json_manager": "import json_manager",
+    "import postprocessing": "import postprocessing",
+    "cli --help": ['--help'],
+    "cli report --help": ['report', '--help'],
+    "cli scrape --dry-run": ['scrape', '--dry-run'],
+}
+
+# Runs a case and reports the heavy modules it loaded, even when argparse exits
+WRAPPER = """
+import atexit, sys
+heavy = {heavy!r}
+atexit.register(lambda: sys.stderr.write(
+    'HEAVY_MODULES ' + ','.join(m for m in heavy if m in sys.modules) + '\\n'))
+case = {case!r}
+if isinstance(case, str):
+    exec(case)
+else:
+    import runpy
+    sys.argv = [{cli!r}] + case
+    runpy.run_path({cli!r}, run_name='__main__')
+"""
+
+
+def run_case(case, cwd, env, extra_args=()):
+    code = WRAPPER.format(heavy=HEAVY_MODULES, case=case, cli=CLI)
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, *extra_args, '-c', code], cwd=cwd, env=env,
+                               capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    heavy = []
+    for line in completed.stderr.splitlines():
+        if line.startswith('HEAVY_MODULES '):
+            heavy = [name for name in line.split(' ', 1)[1].split(',') if name]
+    return elapsed, heavy, completed
+
+
+def top_imports(stderr, count=10):
+    """The slowest imports (cumulative) from -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            parts = [part.strip() for part in line[len('import time:'):].split('|')]
+            if parts[1].isdigit():
+                rows.append((int(parts[1]), parts[2]))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=250.0,
+                        help='Median wall time allowed per case')
+    parser.add_argument('--importtime', action='store_true',
+                        help='Show the slowest imports of each case')
+    parser.add_argument('--output', help='Write the results as JSON')
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        filter(None, [REPO_ROOT, os.environ.get('PYTHONPATH')])))
+    baseline = statistics.median(
+        run_case("pass", REPO_ROOT, env)[0] for _ in range(args.runs)) * 1000
+    print(f"Interpreter start-up: {baseline:.0f} ms")
+
+    results = {}
+    failures = 0
+    with tempfile.TemporaryDirectory() as workdir:
+        # The dry run plans against an empty tree with two subscriptions
+        with open(os.path.join(workdir, 'subscriptions.csv'), 'w', encoding='utf-8') as f:
+            f.write('alice\nbob\n')
+
+        for name, case in CASES.items():
+            times, heavy = [], set()
+            for _ in range(args.runs):
+                elapsed, loaded, completed = run_case(case, workdir, env)
+                times.append(elapsed * 1000)
+                heavy.update(loaded)
+            median = statistics.median(times)
+            over_budget = median > args.budget_ms
+            ok = not heavy and not over_budget and completed.returncode == 0
+            failures += not ok
+            results[name] = {"median_ms": round(median, 1), "min_ms": round(min(times), 1),
+                             "heavy_modules": sorted(heavy), "ok": ok}
+
+            status = '✅' if ok else '❌'
+            notes = []
+            if heavy:
+                notes.append(f"loaded {', '.join(sorted(heavy))}")
+            if over_budget:
+                notes.append(f"over the {args.budget_ms:.0f} ms budget")
+            if completed.returncode != 0:
+                notes.append(f"exit code {completed.returncode}")
+            print(f"{status} {name:<24} {median:7.1f} ms"
+                  + (f"  ({'; '.join(notes)})" if notes else ''))
+
+            if args.importtime:
+                _, _, completed = run_case(case, workdir, env, ('-X', 'importtime'))
+                for micros, module in top_imports(completed.stderr):
+                    print(f"      {micros / 1000:8.1f} ms  {module}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"interpreter_ms": round(baseline, 1), "budget_ms": args.budget_ms,
+                       "results": results}, f, indent=2)
+            f.write('\n')
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
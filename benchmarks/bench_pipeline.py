@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: the whole feed pipeline, offline, at several scales
+
+For each scale a synthetic subscriptions.csv is scraped through
+postprocessing.user_videos with the synthetic TikTok backend, and the
+output is then run through the json_manager convert, consolidate, csv and
+report stages and uploaded with GCSUploader to a local stub bucket
+(benchmarks/gcs_stub.py). Every stage runs in its own process so its peak
+RSS is not inflated by the stages before it.
+
+Per stage it reports throughput (users per second), p50/p99 latency per
+user and peak RSS, and writes the results as JSON so runs from different
+commits can be compared with --compare. The scrape stage always runs
+because the other stages read its output; the upload stage is skipped when
+google-cloud-storage is not installed.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--scales 10,1000,10000] [--stages scrape,convert,...]
+        [--concurrency 16] [--videos-per-user 10] [--upload-latency-ms 0]
+        [--output results.json] [--compare baseline.json] [--tolerance 0.1] [--keep]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+STAGES = ('scrape', 'convert', 'consolidate', 'csv', 'report', 'upload')
+RESULT_MARKER = 'BENCH_RESULT '
+RESULTS_DIR = Path(REPO_ROOT) / 'benchmarks' / 'results'
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (None if empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB everywhere else
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def summarize(latencies, seconds, errors=0):
+    return {
+        "items": len(latencies),
+        "errors": errors,
+        "seconds": round(seconds, 4),
+        "throughput": round(len(latencies) / seconds, 2) if seconds > 0 else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3) if latencies else None,
+        "max_ms": round(max(latencies) * 1000, 3) if latencies else None
+    }
+
+
+# Stages, run inside a child process with the scale's working tree as cwd
+
+def stage_scrape(users, args):
+    """postprocessing.user_videos against the synthetic backend"""
+    with open('subscriptions.csv', 'w', encoding='utf-8') as f:
+        f.writelines(f'bench{i:06d}\n' for i in range(users))
+
+    os.environ.update({
+        'TIKTOK_BACKEND': 'synthetic',
+        'SCHEDULER': 'all',
+        'SHARD_COUNT': '1',
+        'MAX_CONCURRENT_USERS': str(args.concurrency),
+        'USER_TIMEOUT_SECONDS': '0',
+        'FAKE_VIDEOS_PER_USER': str(args.videos_per_user),
+        'FAKE_LATENCY_MS': '0',
+        'FAKE_ERROR_RATE': '0',
+        'FAKE_SEED': '0',
+        # Pacing is not what is being measured
+        'REQUESTS_PER_SECOND': '1000000',
+        'REQUEST_BURST': str(args.concurrency * 2),
+    })
+    os.environ.pop('GCS_BUCKET_NAME', None)
+
+    import config
+    import postprocessing
+
+    config.GCS_BUCKET_NAME = None
+
+    latencies = []
+    process_user = postprocessing.process_user
+
+    async def timed_process_user(user, pool, limiter):
+        started = time.perf_counter()
+        await process_user(user, pool, limiter)
+        latencies.append(time.perf_counter() - started)
+
+    postprocessing.process_user = timed_process_user
+    started = time.perf_counter()
+    asyncio.run(postprocessing.user_videos())
+    return latencies, time.perf_counter() - started, users - len(latencies)
+
+
+def stage_convert(users, args):
+    """json_manager's RSS -> JSON conversion, one file at a time"""
+    from json_manager import _convert_rss_file
+
+    out_dir = Path('convert')
+    out_dir.mkdir(exist_ok=True)
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for rss_file in sorted(Path('rss').glob('*.xml')):
+        file_started = time.perf_counter()
+        if _convert_rss_file(rss_file, out_dir / f'{rss_file.stem}.json'):
+            latencies.append(time.perf_counter() - file_started)
+        else:
+            errors += 1
+    return latencies, time.perf_counter() - started, errors
+
+
+class TimedSink:
+    """
+    Wraps a json_manager sink and times each user
+
+    A user's latency runs from the end of the previous user to the end of
+    its add(), so it includes reading and parsing json/<user>.json.
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.name = sink.name
+        self.latencies = []
+        self._last = None
+
+    def start(self):
+        self.sink.start()
+        self._last = time.perf_counter()
+
+    def add(self, json_file, feed):
+        self.sink.add(json_file, feed)
+        now = time.perf_counter()
+        self.latencies.append(now - self._last)
+        self._last = now
+
+    def finish(self):
+        self.sink.finish()
+
+
+def sink_stage(sink_class):
+    def run(users, args):
+        import json_manager
+
+        sink = TimedSink(getattr(json_manager, sink_class)())
+        started = time.perf_counter()
+        json_manager.run_sinks([sink], json_dir='json')
+        return sink.latencies, time.perf_counter() - started, 0
+    return run
+
+
+def stage_upload(users, args):
+    """GCSUploader.upload_json_folder against the local stub bucket"""
+    import config
+    from gcs_uploader import GCSUploader
+    from benchmarks.gcs_stub import LocalStorageClient
+
+    client = LocalStorageClient('gcs', latency=args.upload_latency_ms / 1000)
+    uploader = GCSUploader('bench-bucket', client=client)
+
+    latencies = []
+    upload_file = uploader.upload_file
+
+    def timed_upload_file(local_file_path, gcs_file_path=None):
+        started = time.perf_counter()
+        ok = upload_file(local_file_path, gcs_file_path)
+        if ok:
+            latencies.append(time.perf_counter() - started)
+        return ok
+
+    uploader.upload_file = timed_upload_file
+    workers = int(os.environ.get('GCS_UPLOAD_WORKERS') or getattr(config, 'GCS_UPLOAD_WORKERS', 8))
+    started = time.perf_counter()
+    uploaded = uploader.upload_json_folder('json', max_workers=workers)
+    return latencies, time.perf_counter() - started, users - len(uploaded)
+
+
+STAGE_FUNCTIONS = {
+    'scrape': stage_scrape,
+    'convert': stage_convert,
+    'consolidate': sink_stage('ConsolidatedSink'),
+    'csv': sink_stage('CsvSink'),
+    'report': sink_stage('ReportSink'),
+    'upload': stage_upload,
+}
+
+
+def run_child(args):
+    """Run one stage in this process and print its result"""
+    os.chdir(args.workdir)
+    result = {"stage": args.child, "scale": args.users, "baseline_rss_mb": round(peak_rss_mb(), 1)}
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            latencies, seconds, errors = STAGE_FUNCTIONS[args.child](args.users, args)
+        result.update(summarize(latencies, seconds, errors))
+    except ImportError as e:
+        result["skipped"] = f"missing dependency: {e}"
+    result["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    print(RESULT_MARKER + json.dumps(result))
+
+
+def run_stage(stage, users, workdir, args):
+    command = [sys.executable, os.path.abspath(__file__), '--child', stage,
+               '--users', str(users), '--workdir', workdir,
+               '--concurrency', str(args.concurrency),
+               '--videos-per-user', str(args.videos_per_user),
+               '--upload-latency-ms', str(args.upload_latency_ms)]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        filter(None, [REPO_ROOT, os.environ.get('PYTHONPATH')])))
+    completed = subprocess.run(command, capture_output=True, text=True, env=env)
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    tail = (completed.stderr or completed.stdout).strip().splitlines()[-5:]
+    return {"stage": stage, "scale": users, "failed": f"exit code {completed.returncode}",
+            "stderr": tail}
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def print_result(result):
+    name = f"{result['stage']:<12} {result['scale']:>6} users"
+    if 'skipped' in result:
+        print(f"⏭️  {name}  skipped ({result['skipped']})")
+    elif 'failed' in result:
+        print(f"❌ {name}  failed ({result['failed']})")
+        for line in result.get('stderr', []):
+            print(f"      {line}")
+    else:
+        print(f"   {name}  {result['throughput'] or 0:>9.1f}/s  "
+              f"p50 {result['p50_ms'] or 0:>8.2f} ms  p99 {result['p99_ms'] or 0:>8.2f} ms  "
+              f"peak RSS {result['peak_rss_mb']:>7.1f} MiB"
+              + (f"  ({result['errors']} errors)" if result['errors'] else ''))
+
+
+def compare(results, baseline_path, tolerance):
+    """
+    Print throughput and peak RSS changes against a previous results file
+
+    Returns:
+        Number of stages that regressed by more than the tolerance
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    previous = {(r['stage'], r['scale']): r for r in baseline.get('results', [])}
+
+    print(f"\n📏 Compared with {baseline_path} ({(baseline.get('commit') or 'unknown')[:12]})")
+    regressions = 0
+    for result in results:
+        old = previous.get((result['stage'], result['scale']))
+        if not old or not old.get('throughput') or not result.get('throughput'):
+            continue
+        speed = result['throughput'] / old['throughput'] - 1
+        memory = result['peak_rss_mb'] / old['peak_rss_mb'] - 1 if old.get('peak_rss_mb') else 0
+        regressed = speed < -tolerance or memory > tolerance
+        regressions += regressed
+        print(f"{'⚠️ ' if regressed else '   '} {result['stage']:<12} {result['scale']:>6} users  "
+              f"throughput {speed:+7.1%}  peak RSS {memory:+7.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', default='10,1000,10000',
+                        help='Comma-separated numbers of users')
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help=f'Comma-separated stages out of {", ".join(STAGES)}')
+    parser.add_argument('--concurrency', type=int, default=16,
+                        help='MAX_CONCURRENT_USERS for the scrape stage')
+    parser.add_argument('--videos-per-user', type=int, default=10)
+    parser.add_argument('--upload-latency-ms', type=float, default=0.0,
+                        help='Simulated round trip per upload to the stub bucket')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/<time>-<commit>.json)')
+    parser.add_argument('--compare', help='Previous results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='Allowed throughput loss / peak RSS growth before --compare fails')
+    parser.add_argument('--keep', action='store_true', help='Keep the working trees')
+    parser.add_argument('--child', choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument('--users', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return 0
+
+    scales = [int(scale) for scale in args.scales.split(',') if scale.strip()]
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    # Everything else reads what the scrape stage writes
+    stages = ['scrape'] + [stage for stage in STAGES if stage in stages and stage != 'scrape']
+
+    commit, dirty = git_revision()
+    started_at = datetime.now(timezone.utc)
+    root = tempfile.mkdtemp(prefix='tiktok-bench-')
+    results = []
+    try:
+        for users in scales:
+            workdir = os.path.join(root, f'{users}-users')
+            os.makedirs(workdir)
+            print(f"🏁 {users} users")
+            for stage in stages:
+                result = run_stage(stage, users, workdir, args)
+                print_result(result)
+                results.append(result)
+                if stage == 'scrape' and ('failed' in result or 'skipped' in result):
+                    break
+    finally:
+        if args.keep:
+            print(f"📂 Working trees kept in {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+    output = {
+        "commit": commit,
+        "dirty": dirty,
+        "started_at": started_at.isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {"concurrency": args.concurrency, "videos_per_user": args.videos_per_user,
+                     "upload_latency_ms": args.upload_latency_ms},
+        "results": results
+    }
+    if args.output:
+        output_path = Path(args.output)
+    else:
+        output_path = RESULTS_DIR / f"{started_at:%Y%m%dT%H%M%SZ}-{(commit or 'unknown')[:7]}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2)
+        f.write('\n')
+    print(f"💾 Results written to {output_path}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print(f"❌ {regressions} stages regressed by more than {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
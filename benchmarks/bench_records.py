@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory and conversion cost of VideoRecord/UserFeed vs dicts
+
+Loads a synthetic corpus in the json/<user>.json shape both as plain dicts
+(what json.load returns) and as slotted records, and reports the memory
+held by each plus the from_dict/to_dict throughput. Load times are
+measured under tracemalloc, so only compare them with each other.
+
+Usage:
+    python benchmarks/bench_records.py [videos] [videos-per-user]
+"""
+
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import UserFeed  # noqa: E402
+
+
+def synthetic_corpus(total_videos, videos_per_user, seed=42):
+    """Serialized json/<user>.json payloads, as they would be read from disk"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    users = []
+    for u in range(0, total_videos, videos_per_user):
+        user = f"user{u // videos_per_user}"
+        videos = []
+        for v in range(min(videos_per_user, total_videos - u)):
+            video_id = str(7000000000000000000 + u + v)
+            caption = f"caption {rng.randrange(10 ** 6)} #fyp"
+            videos.append({
+                "id": video_id,
+                "link": f"https://tiktok.com/@{user}/video/{video_id}",
+                "title": caption,
+                "description": caption,
+                "created_time": (start + timedelta(seconds=rng.randrange(365 * 86400))).isoformat(),
+                "cover_url": f"https://p16-sign.tiktokcdn.com/obj/{video_id}.jpeg",
+                "author": user,
+                "stats": {
+                    "views": rng.randrange(1_000_000),
+                    "likes": rng.randrange(100_000),
+                    "comments": rng.randrange(10_000),
+                    "shares": rng.randrange(10_000)
+                }
+            })
+        users.append(json.dumps({"user": user, "updated": videos[0]["created_time"],
+                                 "videos": videos}))
+    return users
+
+
+def measure(build):
+    """Memory retained by build()'s result and the time it took"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained, peak, elapsed
+
+
+def main():
+    total_videos = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    per_user = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    print(f"🧪 Generating {total_videos:,} synthetic videos ({per_user} per user)")
+    corpus = synthetic_corpus(total_videos, per_user)
+
+    dicts, dict_bytes, _, dict_time = measure(lambda: [json.loads(raw) for raw in corpus])
+    del dicts
+    feeds, record_bytes, record_peak, record_time = measure(
+        lambda: [UserFeed.from_dict(json.loads(raw)) for raw in corpus])
+
+    started = time.perf_counter()
+    round_trip = [feed.to_dict() for feed in feeds]
+    to_dict_time = time.perf_counter() - started
+    assert round_trip[0] == json.loads(corpus[0]), "to_dict() does not round-trip"
+
+    print(f"   dicts:   {dict_bytes / 2 ** 20:8.1f} MiB  "
+          f"({dict_bytes / total_videos:.0f} B/video, json.load {dict_time:.2f}s)")
+    print(f"   records: {record_bytes / 2 ** 20:8.1f} MiB  "
+          f"({record_bytes / total_videos:.0f} B/video, json.load + from_dict {record_time:.2f}s, "
+          f"peak {record_peak / 2 ** 20:.1f} MiB)")
+    print(f"   saved:   {(1 - record_bytes / dict_bytes):.0%} of the dict corpus")
+    print(f"   to_dict: {to_dict_time:.2f}s ({total_videos / to_dict_time:,.0f} videos/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Benchmark: summary report, plain loop vs NumPy columns
+
+The summary (per-user and overall sums, latest video, engagement rate) is
+computed by ReportSink's plain loop over the dicts json.load returns; the
+previous loop is timed next to it to show the sink costs no more than it.
+report --detailed adds percentiles and per-day buckets over every video.
+Those are timed once with report_stats (StatsColumns.add_videos, then
+summarize()) and once with the same statistics in pure Python (sorted
+lists and a Counter), which is what NumPy replaces. Reading the files is
+the same for every variant and is not timed. Each timing is the best of
+a few runs.
+
+Usage:
+    python benchmarks/bench_report.py [videos] [videos-per-user] [runs]
+"""
+
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_manager import ReportSink  # noqa: E402
+from report_stats import PERCENTILES, StatsColumns, summarize  # noqa: E402
+
+
+def synthetic_users(total_videos, videos_per_user, seed=42):
+    """Build synthetic json/<user>.json payloads"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    users = []
+    for u in range(0, total_videos, videos_per_user):
+        videos = []
+        for v in range(min(videos_per_user, total_videos - u)):
+            created = start + timedelta(seconds=rng.randrange(365 * 86400))
+            videos.append({
+                "id": f"{u}-{v}",
+                "created_time": created.isoformat(),
+                "stats": {
+                    "views": rng.randrange(1_000_000),
+                    "likes": rng.randrange(100_000),
+                    "comments": rng.randrange(10_000),
+                    "shares": rng.randrange(10_000)
+                }
+            })
+        users.append({"user": f"user{u // videos_per_user}", "videos": videos})
+    return users
+
+
+def loop_report(users):
+    """The previous generate_summary_report aggregation"""
+    totals = {"users": 0, "videos": 0, "total_views": 0, "total_likes": 0,
+              "total_comments": 0, "total_shares": 0}
+    report_users = {}
+    for user_data in users:
+        videos = user_data.get('videos', [])
+        user_stats = {"video_count": len(videos), "total_views": 0, "total_likes": 0,
+                      "total_comments": 0, "total_shares": 0, "latest_video": None}
+        for video in videos:
+            stats = video.get('stats', {})
+            user_stats["total_views"] += stats.get('views', 0)
+            user_stats["total_likes"] += stats.get('likes', 0)
+            user_stats["total_comments"] += stats.get('comments', 0)
+            user_stats["total_shares"] += stats.get('shares', 0)
+            if not user_stats["latest_video"] or video.get('created_time', '') > user_stats["latest_video"]:
+                user_stats["latest_video"] = video.get('created_time', '')
+        report_users[user_data['user']] = user_stats
+        totals["users"] += 1
+        totals["videos"] += user_stats["video_count"]
+        for key in ("total_views", "total_likes", "total_comments", "total_shares"):
+            totals[key] += user_stats[key]
+    return {"users": report_users, "totals": totals}
+
+
+def sink_report(users):
+    """ReportSink.start() and add() for every user, without writing the file"""
+    sink = ReportSink()
+    sink.start()
+    for user_data in users:
+        sink.add(Path(f"{user_data['user']}.json"), user_data)
+    return sink.report
+
+
+def numpy_detail(users):
+    """What report --detailed adds: StatsColumns.add_videos per user, then summarize()"""
+    columns = StatsColumns()
+    for user_data in users:
+        columns.add_videos(user_data['videos'])
+    return summarize(columns)
+
+
+def python_detail(users):
+    """The same percentiles and per-day buckets with sorted lists and a Counter"""
+    columns = {"views": [], "likes": [], "comments": [], "shares": [], "engagement_rate": []}
+    day_videos = Counter()
+    day_views = Counter()
+    for user_data in users:
+        for video in user_data['videos']:
+            stats = video['stats']
+            views = stats['views']
+            columns["views"].append(views)
+            columns["likes"].append(stats['likes'])
+            columns["comments"].append(stats['comments'])
+            columns["shares"].append(stats['shares'])
+            columns["engagement_rate"].append(
+                (stats['likes'] + stats['comments'] + stats['shares']) / views if views else 0.0)
+            day = datetime.fromisoformat(video['created_time']).astimezone(timezone.utc).date()
+            day_videos[day] += 1
+            day_views[day] += views
+
+    percentiles = {}
+    for name, values in columns.items():
+        values.sort()
+        result = {}
+        for p in PERCENTILES:
+            # linear interpolation, as np.percentile does by default
+            position = (len(values) - 1) * p / 100
+            low = int(position)
+            high = min(low + 1, len(values) - 1)
+            result[f"p{p}"] = float(values[low] + (values[high] - values[low]) * (position - low))
+        percentiles[name] = result
+    daily = [{"date": day.isoformat(), "videos": day_videos[day], "views": day_views[day]}
+             for day in sorted(day_videos)]
+    return {"percentiles": percentiles, "daily": daily}
+
+
+def timed(runs, fn, *args):
+    """Best of `runs` timings of fn(*args), with the last result"""
+    best = float('inf')
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return result, best
+
+
+def speedup(baseline, seconds):
+    ratio = baseline / max(seconds, 1e-9)
+    return f"{ratio:.1f}x faster" if ratio >= 1 else f"{1 / ratio:.1f}x slower"
+
+
+def main():
+    total_videos = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    per_user = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    runs = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    print(f"🧪 Generating {total_videos:,} synthetic videos ({per_user} per user)")
+    users = synthetic_users(total_videos, per_user)
+
+    loop, loop_time = timed(runs, loop_report, users)
+    sink, sink_time = timed(runs, sink_report, users)
+    vectorized, numpy_time = timed(runs, numpy_detail, users)
+    python, python_time = timed(runs, python_detail, users)
+
+    for key in ("videos", "total_views", "total_likes", "total_comments", "total_shares"):
+        assert loop["totals"][key] == sink["totals"][key], key
+    assert vectorized["daily"] == python["daily"], "daily buckets"
+    for name, values in python["percentiles"].items():
+        for p, value in values.items():
+            assert abs(vectorized["percentiles"][name][p] - value) <= 1e-9 * max(1.0, abs(value)), (name, p)
+
+    print(f"   Summary, previous loop:         {loop_time:.3f}s")
+    print(f"   Summary, ReportSink:            {sink_time:.3f}s (adds the engagement rate)")
+    print(f"   --detailed, pure Python:        {python_time:.3f}s")
+    print(f"   --detailed, NumPy columns:      {numpy_time:.3f}s "
+          f"({speedup(python_time, numpy_time)}, {len(vectorized['daily'])} daily buckets)")
+
+
+if __name__ == "__main__":
+    main()
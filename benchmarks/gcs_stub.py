@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for google.cloud.storage.Client used by the benchmarks
+
+Implements the subset GCSUploader touches (bucket(), blob(),
+upload_from_filename(), upload_from_string() and list_blobs()). Blobs are
+written under a local directory, one file per object, so uploads pay real
+read and write costs plus an optional simulated round trip.
+"""
+
+import base64
+import hashlib
+import threading
+import time
+from pathlib import Path
+
+
+class LocalBlob:
+    def __init__(self, bucket: 'LocalBucket', name: str):
+        self.bucket = bucket
+        self.name = name
+        self.content_type = None
+        self.metadata = None
+        self.md5_hash = None
+        self.crc32c = None
+        self.size = None
+
+    def upload_from_filename(self, filename: str):
+        with open(filename, 'rb') as f:
+            self._store(f.read())
+
+    def upload_from_string(self, data, content_type: str = None):
+        if content_type:
+            self.content_type = content_type
+        self._store(data.encode('utf-8') if isinstance(data, str) else data)
+
+    def _store(self, data: bytes):
+        client = self.bucket.client
+        if client.latency:
+            time.sleep(client.latency)
+        path = client.root / self.bucket.name / self.name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        self.md5_hash = base64.b64encode(hashlib.md5(data).digest()).decode('ascii')
+        self.size = len(data)
+        with client.lock:
+            client.blobs[(self.bucket.name, self.name)] = self
+            client.uploads += 1
+
+
+class LocalBucket:
+    def __init__(self, client: 'LocalStorageClient', name: str):
+        self.client = client
+        self.name = name
+
+    def blob(self, name: str) -> LocalBlob:
+        return LocalBlob(self, name)
+
+
+class LocalStorageClient:
+    def __init__(self, root: str, latency: float = 0.0):
+        """
+        Initialize the stub client
+
+        Args:
+            root: Directory the buckets are written to
+            latency: Seconds added to every upload to simulate a round trip
+        """
+        self.root = Path(root)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.blobs = {}
+        self.uploads = 0
+
+    def bucket(self, name: str) -> LocalBucket:
+        return LocalBucket(self, name)
+
+    def list_blobs(self, bucket_name: str, prefix: str = ''):
+        with self.lock:
+            return [blob for (bucket, name), blob in self.blobs.items()
+                    if bucket == bucket_name and name.startswith(prefix)]
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Command line entry point for the TikTok RSS pipeline
+
+    python cli.py scrape [--dry-run]
+    python cli.py convert [--workers N] [--force]
+    python cli.py consolidate [--db [PATH]]
+    python cli.py csv [--db [PATH]]
+    python cli.py report [--db [PATH]] [--detailed]
+    python cli.py upload [--bucket NAME] [--credentials PATH] [--sync] [--manifest PATH]
+
+Each subcommand imports only what it needs: Playwright, TikTokApi and
+feedgen are loaded by "scrape", NumPy by "report --detailed", google-cloud-storage
+by "upload". Starting the CLI, --help and dry runs stay fast.
+benchmarks/bench_import.py guards that.
+"""
+
+import argparse
+import sys
+
+
+def scrape(args):
+    if args.dry_run:
+        return plan_scrape()
+
+    import asyncio
+    import postprocessing
+
+    asyncio.run(postprocessing.user_videos())
+    return 0
+
+
+def plan_scrape():
+    """Show who a scrape would visit without starting a browser"""
+    import sharding
+    from scheduler import load_subscriptions, plan_users
+
+    subscriptions, shard_index, shard_count = sharding.select_shard(load_subscriptions())
+    users, _ = plan_users(subscriptions)
+    for user in users:
+        print(f'   {user}')
+    print(f'🧪 Dry run: {len(users)} of {len(subscriptions)} users would be scraped')
+    return 0
+
+
+def convert(args):
+    import json_manager
+
+    json_manager.convert_all_rss_to_json(args.workers, args.force)
+    return 0
+
+
+def consolidate(args):
+    import json_manager
+
+    json_manager.create_consolidated_json(args.db)
+    return 0
+
+
+def export_csv(args):
+    import json_manager
+
+    json_manager.export_to_csv(args.db)
+    return 0
+
+
+def report(args):
+    import json_manager
+
+    json_manager.generate_summary_report(args.db, args.detailed)
+    return 0
+
+
+def upload(args):
+    try:
+        from gcs_uploader import upload_json_files
+    except ImportError:
+        print("❌ Google Cloud Storage not available. Install with: pip install google-cloud-storage")
+        return 1
+
+    ok = upload_json_files(args.bucket, args.credentials, sync=args.sync,
+                           manifest_path=args.manifest)
+    return 0 if ok else 1
+
+
+def add_db_argument(parser):
+    parser.add_argument('--db', nargs='?', const='', default=None, metavar='PATH',
+                        help='Read users from the SQLite store (default path: VIDEO_STORE_PATH)')
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='cli.py', description='TikTok RSS pipeline')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    command = commands.add_parser('scrape', help='Scrape the subscriptions and write the feeds')
+    command.add_argument('--dry-run', action='store_true',
+                         help='Only list the users that are due, without scraping')
+    command.set_defaults(handler=scrape)
+
+    command = commands.add_parser('convert', help='Convert rss/*.xml to json/*.json')
+    command.add_argument('--workers', type=int, default=None,
+                         help='Worker processes (default: CONVERT_WORKERS or CPU count)')
+    command.add_argument('--force', action='store_true',
+                         help='Also overwrite up-to-date JSON and JSON written by the scraper')
+    command.set_defaults(handler=convert)
+
+    command = commands.add_parser('consolidate', help='Write tiktok_data_consolidated.json')
+    add_db_argument(command)
+    command.set_defaults(handler=consolidate)
+
+    command = commands.add_parser('csv', help='Write tiktok_videos.csv')
+    add_db_argument(command)
+    command.set_defaults(handler=export_csv)
+
+    command = commands.add_parser('report', help='Write tiktok_summary_report.json')
+    add_db_argument(command)
+    command.add_argument('--detailed', action='store_true',
+                         help='Add percentiles and per-day buckets (needs NumPy)')
+    command.set_defaults(handler=report)
+
+    command = commands.add_parser('upload', help='Upload json/*.json to Google Cloud Storage')
+    command.add_argument('--bucket', help='Bucket name (default: GCS_BUCKET_NAME)')
+    command.add_argument('--credentials', help='Service account JSON file')
+    command.add_argument('--sync', action='store_true',
+                         help='Only upload changed files (lists the bucket: needs '
+                              'storage.objects.list)')
+    command.add_argument('--manifest', help='Cached manifest of remote checksums (with --sync)')
+    command.set_defaults(handler=upload)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if getattr(args, 'db', None) == '':
+        from settings import get_setting
+
+        args.db = get_setting('VIDEO_STORE_PATH', 'tiktok.db')
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
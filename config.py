@@ -10,3 +10,104 @@ ghRawURL = "https://raw.githubusercontent.com/conoro/tiktok-rss-flat/main/"
 # export GOOGLE_APPLICATION_CREDENTIALS="path/to/credentials.json"
 GCS_BUCKET_NAME = None  # Replace with your bucket name
 GCS_CREDENTIALS_PATH = None  # Replace with path to your service account JSON file
+
+# Scraping concurrency (can be overridden with environment variables)
+# MAX_CONCURRENT_USERS: number of users scraped at the same time
+# USER_TIMEOUT_SECONDS: give up on a single user after this many seconds (0 = no limit)
+MAX_CONCURRENT_USERS = 4
+USER_TIMEOUT_SECONDS = 180
+
+# msToken cache: MS_TOKEN from the environment is always used first,
+# otherwise a token fetched by the browser is reused until it expires
+MS_TOKEN_CACHE_PATH = ".cache/ms_token.json"
+MS_TOKEN_TTL_SECONDS = 6 * 3600
+
+# Number of videos kept in each user's feed. New videos are merged with the
+# previous json/<user>.json. Videos already in the feed get fresh stats from the
+# same API page, and further pages are only requested until the last-seen
+# video is crossed.
+MAX_VIDEOS_PER_USER = 7
+
+# Number of parallel GCS uploads
+GCS_UPLOAD_WORKERS = 8
+
+# SQLite store updated on every run and readable with "json_manager.py <command> --db".
+# The file is not committed: when it does not exist yet it is created from json/,
+# so it always holds every user, not just the ones due in this run. Set to None to disable
+VIDEO_STORE_PATH = "tiktok.db"
+
+# Append-only stats time-series (one sample per video per run, 48 bytes
+# each), read with "json_manager.py velocity". The log is not committed: the
+# GitHub Actions workflow restores it from the Actions cache before the scrape
+# and saves it afterwards. Set to None to disable.
+STATS_LOG_PATH = "stats/stats.bin"
+
+# "json_manager.py compact-stats" (run by the workflow after every scrape)
+# keeps every sample of the last STATS_LOG_FULL_DAYS days and the last
+# sample per video per day before that
+STATS_LOG_FULL_DAYS = 7
+
+# RSS writer: "stream" writes feeds directly (fast, same output as feedgen),
+# "feedgen" builds them with the feedgen library
+RSS_WRITER = "stream"
+
+# Feed formats written for every user (comma-separated): "rss" -> rss/<user>.xml,
+# "atom" -> atom/<user>.xml, "jsonfeed" -> jsonfeed/<user>.json (JSON Feed 1.1)
+FEED_FORMATS = "rss,atom,jsonfeed"
+
+# TikTok request pacing: a token bucket shared by all users. When TikTok
+# throttles (captcha / empty responses) the rate is halved, requests back
+# off exponentially with jitter and are retried REQUEST_MAX_RETRIES times;
+# users that still fail are retried for up to USER_RETRY_ROUNDS more rounds.
+REQUESTS_PER_SECOND = 1.0
+REQUEST_BURST = 2
+REQUEST_MAX_RETRIES = 3
+BACKOFF_MAX_SECONDS = 120
+USER_RETRY_ROUNDS = 2
+
+# Activity-based scheduling: each user is polled about twice per expected gap
+# between their posts, between SCHEDULE_MIN_HOURS and SCHEDULE_MAX_HOURS
+# (per-user overrides: "username,min_hours,max_hours" in subscriptions.csv).
+# SCHEDULER = "all" scrapes every subscription on every run.
+SCHEDULER = "activity"
+SCHEDULE_STATE_PATH = "schedule.json"
+SCHEDULE_MIN_HOURS = 4
+SCHEDULE_MAX_HOURS = 168
+SCHEDULE_GRACE_MINUTES = 30
+MAX_USERS_PER_RUN = 0  # 0 = no limit
+
+# Sharding: worker SHARD_INDEX of SHARD_COUNT only scrapes the users it owns
+# (usually set per worker through the environment, see README)
+SHARD_INDEX = 0
+SHARD_COUNT = 1
+
+# Offline TikTok backend for benchmarks and dry runs: "live" (default),
+# "replay" (payloads from TIKTOK_REPLAY_PATH) or "synthetic" (generated users).
+# FAKE_LATENCY_MS, FAKE_JITTER_MS, FAKE_ERROR_RATE, FAKE_SEED and
+# FAKE_VIDEOS_PER_USER tune the fake, and FAKE_COVER_BASE_URL points synthetic
+# cover URLs at a local HTTP server standing in for the CDN. Set
+# TIKTOK_RECORD_PATH on a live run to capture payloads for replay.
+TIKTOK_BACKEND = "live"
+TIKTOK_REPLAY_PATH = "tiktok_example_data.json"
+TIKTOK_RECORD_PATH = None
+
+# Per-stage timings and counters for each run, off by default. Set to one or
+# more comma-separated paths: files ending in .prom get a Prometheus textfile
+# (for node_exporter's textfile collector), anything else a JSON summary.
+METRICS_PATH = None
+
+# Thumbnails: "off", "screenshot" or "fetch". With "screenshot" cover images
+# are screenshotted by one shared headless Chromium, THUMBNAIL_PAGES at a time,
+# and cached under THUMBNAIL_DIR/<user>/<video id>.jpg
+THUMBNAILS = "off"
+THUMBNAIL_PAGES = 4
+THUMBNAIL_DIR = "thumbnails"
+
+# THUMBNAILS = "fetch" downloads the cover images directly instead, over up to
+# THUMBNAIL_CONNECTIONS pooled connections, re-encodes them (with Pillow) to
+# THUMBNAIL_FORMAT ("jpeg" or "webp") no larger than THUMBNAIL_SIZE pixels and
+# stores each distinct image once under THUMBNAIL_DIR/covers/
+THUMBNAIL_SIZE = 360
+THUMBNAIL_FORMAT = "jpeg"
+THUMBNAIL_QUALITY = 70
+THUMBNAIL_CONNECTIONS = 8
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Content-hash guarded writes for generated feeds
+
+Each artifact (rss/<user>.xml, json/<user>.json) gets a <file>.sha256
+sidecar holding the hash of its meaningful payload. Volatile fields such
+as retrieval timestamps are left out of the hash, so a feed whose videos
+did not change is not rewritten, committed or uploaded again. The sidecar
+also holds the hash of the file's bytes as written, so an artifact that
+was replaced or edited since (e.g. by "json_manager.py convert") is
+written again.
+"""
+
+import copy
+import hashlib
+import json
+from pathlib import Path
+
+# Fields that change on every run without the feed content changing
+VOLATILE_FIELDS = {
+    "user_info": ["retrieved_at"],
+}
+
+
+def canonical_json(data) -> str:
+    """Deterministic JSON serialization used for hashing"""
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def meaningful_payload(user_json_data: dict) -> dict:
+    """Return a copy of a user's JSON data without volatile fields"""
+    payload = copy.deepcopy(user_json_data)
+    for section, fields in VOLATILE_FIELDS.items():
+        if isinstance(payload.get(section), dict):
+            for field in fields:
+                payload[section].pop(field, None)
+    # Without videos, "updated" falls back to the current time
+    if not payload.get('videos'):
+        payload.pop('updated', None)
+    return payload
+
+
+def payload_hash(data) -> str:
+    """SHA-256 of the canonical serialization of data"""
+    return hashlib.sha256(canonical_json(data).encode('utf-8')).hexdigest()
+
+
+def hash_path(artifact_path) -> Path:
+    """Path of the sidecar hash file for an artifact"""
+    artifact_path = Path(artifact_path)
+    return artifact_path.with_name(artifact_path.name + '.sha256')
+
+
+def file_hash(path) -> str:
+    """SHA-256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_unchanged(artifact_path, digest: str) -> bool:
+    """True if the stored hash matches digest and the artifact is still the file written then"""
+    try:
+        stored = hash_path(artifact_path).read_text(encoding='utf-8').split()
+        # Sidecars holding only the payload hash cannot vouch for the file
+        if len(stored) != 2 or stored[0] != digest:
+            return False
+        return file_hash(artifact_path) == stored[1]
+    except FileNotFoundError:
+        return False
+
+
+def write_hash(artifact_path, digest: str):
+    """Store digest and the hash of the artifact as written next to it"""
+    hash_path(artifact_path).write_text(
+        f'{digest} {file_hash(artifact_path)}\n', encoding='utf-8')
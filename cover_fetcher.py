@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Direct cover image fetcher
+
+Downloads video['cover'] URLs over one pooled async HTTP client while
+their x-expires signature is still valid, re-encodes them to small JPEG or
+WebP thumbnails and stores them content-addressed as
+thumbnails/covers/<hh>/<sha256>.<ext>, so identical covers are written
+once however many videos share them. Re-encoding needs Pillow; without
+it covers are stored as downloaded.
+"""
+
+import asyncio
+import hashlib
+import io
+import itertools
+import os
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+
+# Pillow is only needed to re-encode, stay optional
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+FORMATS = {
+    "jpeg": ("JPEG", "jpg"),
+    "webp": ("WEBP", "webp"),
+}
+
+# Extensions for covers stored as downloaded
+CONTENT_TYPE_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/webp": "webp",
+    "image/png": "png",
+    "image/heic": "heic",
+}
+
+HEADERS = {
+    "User-Agent": ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+                   "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"),
+    "Referer": "https://www.tiktok.com/",
+}
+
+
+def cover_expires(url: str) -> Optional[int]:
+    """Unix time a signed TikTok cover URL stops working, if it says"""
+    try:
+        value = parse_qs(urlparse(url).query).get('x-expires', [None])[0]
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def reencode(data: bytes, size: int, image_format: str, quality: int) -> bytes:
+    """Shrink an image to fit size x size and encode it as JPEG or WebP"""
+    pil_format, _ = FORMATS[image_format]
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert('RGB')
+        image.thumbnail((size, size))
+        out = io.BytesIO()
+        if pil_format == "JPEG":
+            image.save(out, pil_format, quality=quality, optimize=True, progressive=True)
+        else:
+            image.save(out, pil_format, quality=quality, method=4)
+    return out.getvalue()
+
+
+class CoverFetcher:
+    def __init__(self, root: str = 'thumbnails', size: int = 360, image_format: str = 'jpeg',
+                 quality: int = 70, connections: int = 8, timeout: float = 15.0,
+                 client: Optional[httpx.AsyncClient] = None):
+        """
+        Initialize the fetcher
+
+        Args:
+            root: Directory the covers/ store lives under
+            size: Longest side of a stored thumbnail in pixels
+            image_format: "jpeg" or "webp"
+            quality: Encoder quality (1-100)
+            connections: Maximum number of pooled connections (downloads in flight)
+            timeout: Seconds before a download is abandoned
+            client: Pre-built httpx.AsyncClient (closed by the caller)
+        """
+        if image_format not in FORMATS:
+            raise ValueError(f"Unknown thumbnail format {image_format!r} "
+                             f"(expected {' or '.join(FORMATS)})")
+        self.root = Path(root)
+        self.size = size
+        self.image_format = image_format
+        self.quality = quality
+        self.connections = max(1, connections)
+        self.timeout = timeout
+        self._client = client
+        self._owns_client = client is None
+        # httpcore's pool slows down quadratically with the number of waiting
+        # requests, so downloads queue here instead of inside the client
+        self._slots = asyncio.Semaphore(self.connections)
+        self._in_flight = {}
+        self._writes = {}
+        self._tmp_ids = itertools.count()
+
+        self.stored = 0
+        self.deduplicated = 0
+        self.expired = 0
+        self.failed = 0
+        self.bytes_downloaded = 0
+        self.bytes_written = 0
+
+        if not PIL_AVAILABLE:
+            print("⚠️  Pillow not available, covers are stored without re-encoding. "
+                  "Install with: pip install Pillow")
+
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self.connections,
+                                  max_keepalive_connections=self.connections)
+            self._client = httpx.AsyncClient(limits=limits, timeout=self.timeout,
+                                             headers=HEADERS, follow_redirects=True)
+        return self._client
+
+    async def close(self):
+        if self._client is not None and self._owns_client:
+            await self._client.aclose()
+        self._client = None
+
+    def stats(self) -> dict:
+        return {"stored": self.stored, "deduplicated": self.deduplicated,
+                "expired": self.expired, "failed": self.failed}
+
+    def cover_path(self, digest: str, extension: str) -> Path:
+        return self.root / 'covers' / digest[:2] / f'{digest}.{extension}'
+
+    async def thumbnail(self, user: str, video_id: str, url: str) -> Optional[Path]:
+        """
+        Download a video's cover and store its thumbnail
+
+        Args:
+            user: TikTok username (for log messages)
+            video_id: Video id (for log messages)
+            url: Signed cover URL
+
+        Returns:
+            Path of the stored thumbnail, or None if the cover could not be fetched
+        """
+        if not url:
+            return None
+        expires = cover_expires(url)
+        if expires is not None and expires <= time.time():
+            self.expired += 1
+            return None
+
+        # The same URL requested again while it downloads shares the download
+        task = self._in_flight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(user, video_id, url))
+            self._in_flight[url] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, user: str, video_id: str, url: str) -> Optional[Path]:
+        try:
+            async with self._slots:
+                response = await self.client().get(url)
+            response.raise_for_status()
+            data = response.content
+        except (httpx.HTTPError, httpx.InvalidURL, OSError) as e:
+            print(f"⚠️  Could not download cover of {user}/{video_id}: {e}")
+            self.failed += 1
+            return None
+        self.bytes_downloaded += len(data)
+
+        # Keyed on the source bytes and the encoding, so an unchanged cover
+        # is neither re-encoded nor written again
+        content_type = response.headers.get('content-type', '').split(';')[0].strip()
+        if PIL_AVAILABLE:
+            extension = FORMATS[self.image_format][1]
+            key = f'{self.image_format}:{self.size}:{self.quality}:'.encode('ascii')
+        else:
+            extension = CONTENT_TYPE_EXTENSIONS.get(content_type, 'jpg')
+            key = b'original:'
+        path = self.cover_path(hashlib.sha256(key + data).hexdigest(), extension)
+        write = self._writes.get(path)
+        if write is None and path.is_file():
+            self.deduplicated += 1
+            return path
+        if write is not None:
+            self.deduplicated += 1
+        else:
+            # Once written, later requests find the file on disk
+            write = asyncio.ensure_future(self._store(user, video_id, data, path))
+            self._writes[path] = write
+            write.add_done_callback(lambda _: self._writes.pop(path, None))
+        return await asyncio.shield(write)
+
+    async def _store(self, user: str, video_id: str, data: bytes, path: Path) -> Optional[Path]:
+        if PIL_AVAILABLE:
+            try:
+                data = await asyncio.to_thread(
+                    reencode, data, self.size, self.image_format, self.quality)
+            except Exception as e:
+                print(f"⚠️  Could not re-encode cover of {user}/{video_id}: {e}")
+                self.failed += 1
+                return None
+
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}-{next(self._tmp_ids)}.tmp')
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️  Could not store cover of {user}/{video_id}: {e}")
+            self.failed += 1
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+            return None
+        self.stored += 1
+        self.bytes_written += len(data)
+        return path
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Record/replay and synthetic TikTok backends for offline runs
+
+postprocessing normally leases live TikTokApi sessions from
+TikTokSessionPool. With TIKTOK_BACKEND set it uses FakeSessionPool
+instead, which serves the same ttuser.info() / ttuser.videos() calls from
+
+- "replay": payloads captured from live runs by RecordingSessionPool
+  (TIKTOK_RECORD_PATH) or the tiktok_example_data.json video list, or
+- "synthetic": deterministic generated users, any number of them,
+
+with optional latency and error injection. That lets the whole
+scrape -> feed -> JSON -> upload pipeline run without a TikTok account
+or Chromium.
+"""
+
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from TikTokApi.exceptions import CaptchaException, EmptyResponseException, NotFoundException
+
+# Errors injected at random, weighted towards what TikTok does when it throttles
+INJECTED_ERRORS = (EmptyResponseException, EmptyResponseException, CaptchaException)
+
+COVER_BASE_URL = "https://p16-sign.tiktokcdn.com/obj/"
+
+
+class FakeVideo:
+    """Stands in for TikTokApi's Video: an id plus the raw as_dict payload"""
+    __slots__ = ('id', 'as_dict')
+
+    def __init__(self, as_dict: dict):
+        self.id = str(as_dict['id'])
+        self.as_dict = as_dict
+
+
+def load_recording(path: str) -> Dict[str, dict]:
+    """
+    Load recorded payloads as {user: {"info": ..., "videos": [...]}}
+
+    Accepts files written by RecordingSessionPool and plain lists of video
+    payloads such as tiktok_example_data.json (grouped by author).
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    if isinstance(data, dict):
+        return data.get('users', data)
+
+    users = {}
+    for video in data:
+        author = video.get('author')
+        user = author.get('uniqueId') if isinstance(author, dict) else author
+        users.setdefault(user or Path(path).stem, {"info": {}, "videos": []})["videos"].append(video)
+    return users
+
+
+def synthetic_videos(user: str, count: int, seed: int = 0, now: Optional[float] = None,
+                     cover_base_url: str = COVER_BASE_URL) -> List[dict]:
+    """
+    Deterministic as_dict payloads for a synthetic user, newest first
+
+    Cover URLs are cover_base_url + video id, signed to expire a day after now,
+    so a local HTTP server can stand in for the CDN.
+    """
+    rng = random.Random(f"{seed}:{user}")
+    now = int(now if now is not None else time.time())
+    # Each user gets their own posting rhythm, from several a day to monthly
+    mean_gap = rng.choice((3, 8, 24, 72, 24 * 30)) * 3600
+    created = now - rng.randrange(mean_gap)
+    base_id = 7000000000000000000 + rng.randrange(10 ** 15) * 1000
+
+    videos = []
+    for i in range(count):
+        video_id = str(base_id + count - i)
+        views = int(rng.paretovariate(1.2) * 1000)
+        videos.append({
+            "id": video_id,
+            "desc": rng.choice(("", f"Video {i} from {user} #fyp", f"Day {i} & <counting> 🎉")),
+            "createTime": created,
+            "author": {"uniqueId": user},
+            "video": {
+                "cover": f"{cover_base_url}{video_id}?x-expires={now + 86400}"
+            },
+            "stats": {
+                "playCount": views,
+                "diggCount": views // rng.randint(8, 40),
+                "commentCount": views // rng.randint(100, 1000),
+                "shareCount": views // rng.randint(200, 2000)
+            }
+        })
+        created -= max(60, int(rng.expovariate(1 / mean_gap)))
+    return videos
+
+
+class FakeUser:
+    def __init__(self, backend: 'FakeBackend', username: str):
+        self.backend = backend
+        self.username = username
+
+    async def info(self) -> dict:
+        await self.backend.request(self.username)
+        return self.backend.user_payload(self.username)["info"]
+
+    async def videos(self, count: int = 30):
+        await self.backend.request(self.username)
+        for video in self.backend.user_payload(self.username)["videos"][:count]:
+            yield FakeVideo(video)
+
+
+class FakeApi:
+    def __init__(self, backend: 'FakeBackend'):
+        self.backend = backend
+
+    def user(self, username: str) -> FakeUser:
+        return FakeUser(self.backend, username)
+
+
+class FakeBackend:
+    def __init__(self, recording: Optional[Dict[str, dict]] = None, videos_per_user: int = 10,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 seed: int = 0, now: Optional[float] = None,
+                 cover_base_url: str = COVER_BASE_URL):
+        """
+        Initialize the fake backend
+
+        Args:
+            recording: Recorded payloads to replay; None generates synthetic users
+            videos_per_user: Videos generated for each synthetic user
+            latency: Seconds every request takes
+            jitter: Extra random latency of up to this many seconds
+            error_rate: Fraction of requests failing with a throttling error
+            seed: Seed for synthetic users, latency and injected errors
+            now: Reference time for synthetic createTime values
+            cover_base_url: Prefix of synthetic cover URLs
+        """
+        self.recording = recording
+        self.videos_per_user = videos_per_user
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.seed = seed
+        self.now = now if now is not None else time.time()
+        self.cover_base_url = cover_base_url
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self._synthetic: Dict[str, dict] = {}
+
+    def user_payload(self, username: str) -> dict:
+        if self.recording is not None:
+            payload = self.recording.get(username)
+            if payload is None:
+                raise NotFoundException(None, f"{username} is not in the recording")
+            return payload
+        if username not in self._synthetic:
+            self._synthetic[username] = {
+                "info": {"userInfo": {"user": {"uniqueId": username}}},
+                "videos": synthetic_videos(username, self.videos_per_user, self.seed, self.now,
+                                           self.cover_base_url)
+            }
+        return self._synthetic[username]
+
+    async def request(self, username: str):
+        """Simulate one round trip, failing it at the configured error rate"""
+        self.requests += 1
+        delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.errors += 1
+            raise self.rng.choice(INJECTED_ERRORS)(None, f"injected error for {username}")
+
+
+class FakeSessionPool:
+    """Drop-in replacement for TikTokSessionPool backed by a FakeBackend"""
+
+    def __init__(self, backend: FakeBackend, size: int = 1):
+        self.backend = backend
+        self.size = max(1, size)
+        self.recreated = 0
+        self._idle: asyncio.Queue = asyncio.Queue()
+
+    async def start(self):
+        for _ in range(self.size):
+            self._idle.put_nowait(FakeApi(self.backend))
+
+    async def close(self):
+        pass
+
+    @asynccontextmanager
+    async def lease(self):
+        api = await self._idle.get()
+        try:
+            yield api
+        finally:
+            self._idle.put_nowait(api)
+
+
+class RecordingUser:
+    def __init__(self, user, recorder: 'RecordingSessionPool'):
+        self._user = user
+        self._recorder = recorder
+
+    async def info(self):
+        info = await self._user.info()
+        self._recorder.record(self._user.username, info=info)
+        return info
+
+    async def videos(self, count: int = 30):
+        recorded = []
+        try:
+            async for video in self._user.videos(count=count):
+                recorded.append(video.as_dict)
+                yield video
+        finally:
+            self._recorder.record(self._user.username, videos=recorded)
+
+
+class RecordingApi:
+    def __init__(self, api, recorder: 'RecordingSessionPool'):
+        self._api = api
+        self._recorder = recorder
+
+    def user(self, username: str) -> RecordingUser:
+        return RecordingUser(self._api.user(username), self._recorder)
+
+
+class RecordingSessionPool:
+    """Wraps a live session pool and saves every info()/videos() payload"""
+
+    def __init__(self, pool, path: str):
+        self.pool = pool
+        self.path = path
+        self.users: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self.users = load_recording(path)
+
+    def record(self, username: str, info: Optional[dict] = None, videos: Optional[list] = None):
+        with self._lock:
+            entry = self.users.setdefault(username, {"info": {}, "videos": []})
+            if info is not None:
+                entry["info"] = info
+            if videos:
+                entry["videos"] = videos
+
+    async def start(self):
+        await self.pool.start()
+
+    async def close(self):
+        try:
+            await self.pool.close()
+        finally:
+            self.save()
+
+    def save(self):
+        path = Path(self.path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with self._lock, open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"recorded_at": time.time(), "users": self.users}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        print(f"📼 Recorded {len(self.users)} users to {self.path}")
+
+    @asynccontextmanager
+    async def lease(self):
+        async with self.pool.lease() as api:
+            yield RecordingApi(api, self)
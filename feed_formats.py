@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+RSS, Atom and JSON Feed 1.1 output from one feed model
+
+The scraper builds a Feed once per user and every enabled format is
+rendered from it, reusing the same escaped text and formatted dates.
+Outputs go to rss/<user>.xml, atom/<user>.xml and jsonfeed/<user>.json.
+"""
+
+import json
+import os
+from typing import Dict, Iterable, Iterator
+
+from feed_model import Feed, FeedItem, escape_attr, escape_text
+from rss_writer import XML_DECLARATION, render_rss, write_feed
+
+
+def _render_atom_entry(item: FeedItem) -> str:
+    enclosure = (f"    <link href=\"{item.cover_attr}\" rel=\"enclosure\" type=\"{item.cover_type}\"/>\n"
+                 if item.cover_url else "")
+    return (
+        "  <entry>\n"
+        f"    <id>{item.link_xml}</id>\n"
+        f"    <title>{item.title_xml}</title>\n"
+        f"    <link href=\"{item.link_attr}\" rel=\"alternate\"/>\n"
+        f"{enclosure}"
+        f"    <published>{item.published_rfc3339}</published>\n"
+        f"    <updated>{item.published_rfc3339}</updated>\n"
+        f"    <content type=\"text\">{item.content_xml}</content>\n"
+        "  </entry>\n"
+    )
+
+
+def render_atom(feed: Feed) -> Iterator[str]:
+    """Yield an Atom 1.0 document in chunks, newest entry first"""
+    self_url = feed.url('atom', '.xml')
+    yield (
+        XML_DECLARATION +
+        '<feed xmlns="http://www.w3.org/2005/Atom" xml:lang="en">\n'
+        f"  <id>{feed.profile_url_xml}</id>\n"
+        f"  <title>{feed.title_xml}</title>\n"
+        f"  <subtitle>{feed.description_xml}</subtitle>\n"
+        f"  <updated>{feed.updated_rfc3339}</updated>\n"
+        f"  <link href=\"{escape_attr(self_url)}\" rel=\"self\"/>\n"
+        f"  <link href=\"{feed.profile_url_attr}\" rel=\"alternate\"/>\n"
+        f"  <author>\n    <name>{escape_text(feed.user)}</name>\n"
+        f"    <uri>{feed.profile_url_xml}</uri>\n  </author>\n"
+        f"  <logo>{feed.logo_url_xml}</logo>\n"
+    )
+    for item in feed.items:
+        yield _render_atom_entry(item)
+    yield "</feed>\n"
+
+
+def render_json_feed(feed: Feed) -> Iterator[str]:
+    """Yield a JSON Feed 1.1 document, newest item first"""
+    items = []
+    for item in feed.items:
+        entry = {
+            "id": item.id,
+            "url": item.link,
+            "title": item.title,
+            "content_text": item.content,
+            "date_published": item.published_rfc3339
+        }
+        if item.cover_url:
+            entry["image"] = item.cover_url
+        items.append(entry)
+
+    document = {
+        "version": "https://jsonfeed.org/version/1.1",
+        "title": feed.title,
+        "home_page_url": feed.profile_url,
+        "feed_url": feed.url('jsonfeed', '.json'),
+        "description": feed.description,
+        "icon": feed.logo_url,
+        "language": "en",
+        "authors": [{"name": feed.user, "url": feed.profile_url}],
+        "items": items
+    }
+    yield json.dumps(document, indent=2, ensure_ascii=False)
+    yield "\n"
+
+
+# name -> (output directory, file extension, renderer)
+FORMATS = {
+    "rss": ("rss", ".xml", render_rss),
+    "atom": ("atom", ".xml", render_atom),
+    "jsonfeed": ("jsonfeed", ".json", render_json_feed),
+}
+
+
+def parse_formats(value) -> list:
+    """Parse a FEED_FORMATS setting ("rss,atom" or a list) into known format names"""
+    if isinstance(value, str):
+        value = value.split(',')
+    names = [name.strip().lower() for name in value or [] if name.strip()]
+    unknown = [name for name in names if name not in FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown feed format(s): {', '.join(unknown)} "
+                         f"(expected {', '.join(FORMATS)})")
+    return names
+
+
+def feed_path(name: str, user: str) -> str:
+    """Output path of a user's feed in the given format"""
+    directory, extension, _ = FORMATS[name]
+    return f"{directory}/{user}{extension}"
+
+
+def write_format(feed: Feed, name: str, path: str):
+    """Render one format of the feed to path"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    write_feed(path, FORMATS[name][2](feed))
+
+
+def write_feeds(feed: Feed, names: Iterable[str]) -> Dict[str, str]:
+    """
+    Render every requested format of a feed
+
+    Args:
+        feed: Feed model for one user
+        names: Format names from FORMATS
+
+    Returns:
+        dict of format name to the path written
+    """
+    paths = {}
+    for name in names:
+        paths[name] = feed_path(name, feed.user)
+        write_format(feed, name, paths[name])
+    return paths
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+In-memory feed model shared by the RSS, Atom and JSON Feed writers
+
+A user's videos are turned into a Feed once per run. Every field a writer
+needs is formatted here a single time (XML-escaped text, RFC 822 and
+RFC 3339 dates, feed URLs), so rendering each format is plain string
+concatenation over the same objects.
+"""
+
+import re
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from records import VideoRecord
+
+# Characters that are not allowed in XML 1.0 documents
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+def escape_text(text: str) -> str:
+    """Escape element text the way lxml serializes it"""
+    text = _INVALID_XML_CHARS.sub('', text)
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('\r', '&#13;')
+
+
+def escape_attr(value: str) -> str:
+    """Escape an attribute value the way lxml serializes it"""
+    return escape_text(value).replace('"', '&quot;').replace('\n', '&#10;').replace('\t', '&#9;')
+
+
+_IMAGE_TYPES = {'.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.webp': 'image/webp',
+                '.png': 'image/png', '.gif': 'image/gif'}
+
+
+def image_type(url: str) -> str:
+    """MIME type of an image URL from its extension (TikTok covers are JPEG)"""
+    path = url.split('?', 1)[0].split('#', 1)[0].lower()
+    return next((mime for ext, mime in _IMAGE_TYPES.items() if path.endswith(ext)), 'image/jpeg')
+
+
+def rfc822(dt: datetime) -> str:
+    """RFC 822 date as used by RSS (locale independent)"""
+    days = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+    months = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+              'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+    return (f"{days[dt.weekday()]}, {dt.day:02d} {months[dt.month - 1]} {dt.year:04d} "
+            f"{dt.hour:02d}:{dt.minute:02d}:{dt.second:02d} {dt.strftime('%z')}")
+
+
+def rfc3339(dt: datetime) -> str:
+    """RFC 3339 date as used by Atom and JSON Feed"""
+    return dt.isoformat()
+
+
+class FeedItem:
+    """One video with every field pre-formatted for the writers"""
+
+    __slots__ = ('id', 'link', 'title', 'content', 'cover_url', 'cover_type',
+                 'link_xml', 'link_attr', 'title_xml', 'content_xml', 'cover_attr',
+                 'published_rfc822', 'published_rfc3339')
+
+    def __init__(self, video: VideoRecord):
+        title = video.title
+        published = datetime.fromisoformat(video.created_time)
+
+        self.id = video.id
+        self.link = video.link
+        self.title = title[0:255] if title else "No Title"
+        self.content = video.description or "No Description"
+        self.cover_url = video.thumbnail_url or video.cover_url
+        self.cover_type = image_type(self.cover_url) if self.cover_url else None
+
+        self.link_xml = escape_text(self.link)
+        self.link_attr = escape_attr(self.link)
+        self.title_xml = escape_text(self.title)
+        self.content_xml = escape_text(self.content)
+        self.cover_attr = escape_attr(self.cover_url) if self.cover_url else None
+        self.published_rfc822 = rfc822(published)
+        self.published_rfc3339 = rfc3339(published)
+
+
+class Feed:
+    """A user's feed: channel metadata plus items, newest first"""
+
+    def __init__(self, user: str, videos: List[VideoRecord], gh_raw_url: str,
+                 updated: Optional[datetime] = None):
+        """
+        Build the feed model
+
+        Args:
+            user: TikTok username
+            videos: Video records, newest first
+            gh_raw_url: Base URL the feeds and logo are served from
+            updated: Time of the newest video, now if None
+        """
+        updated = updated or datetime.now(timezone.utc)
+
+        self.user = user
+        self.gh_raw_url = gh_raw_url
+        self.profile_url = 'https://www.tiktok.com/@' + user
+        self.title = user + ' TikTok'
+        self.description = 'OK Boomer, all the latest TikToks from ' + user
+        self.logo_url = gh_raw_url + 'tiktok-rss.png'
+        self.items = [FeedItem(video) for video in videos]
+
+        self.title_xml = escape_text(self.title)
+        self.description_xml = escape_text(self.description)
+        self.profile_url_xml = escape_text(self.profile_url)
+        self.profile_url_attr = escape_attr(self.profile_url)
+        self.logo_url_xml = escape_text(self.logo_url)
+        self.updated_rfc822 = rfc822(updated)
+        self.updated_rfc3339 = rfc3339(updated)
+
+    def url(self, directory: str, extension: str) -> str:
+        """Public URL of this feed in one of the output directories"""
+        return f"{self.gh_raw_url}{directory}/{self.user}{extension}"
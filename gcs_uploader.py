@@ -5,26 +5,138 @@ Google Cloud Storage Uploader for TikTok RSS JSON files
 
 import os
 import json
+import base64
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, List
 from google.cloud import storage
 from google.oauth2 import service_account
 
+# crc32c is installed alongside google-cloud-storage, but stay optional
+try:
+    import google_crc32c
+    CRC32C_AVAILABLE = True
+except ImportError:
+    CRC32C_AVAILABLE = False
+
+
+def file_checksums(file_path: str) -> dict:
+    """
+    Compute checksums of a local file in the format GCS reports them
+
+    Returns:
+        dict with base64 md5_hash, base64 crc32c (None if unavailable) and size
+    """
+    md5 = hashlib.md5()
+    crc = google_crc32c.Checksum() if CRC32C_AVAILABLE else None
+    size = 0
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            md5.update(chunk)
+            if crc is not None:
+                crc.update(chunk)
+            size += len(chunk)
+
+    return {
+        "md5_hash": base64.b64encode(md5.digest()).decode('ascii'),
+        "crc32c": base64.b64encode(crc.digest()).decode('ascii') if crc is not None else None,
+        "size": size
+    }
+
+
+def checksums_match(local: dict, remote: Optional[dict]) -> bool:
+    """True if a remote blob's checksums match the local file"""
+    if not remote:
+        return False
+    if remote.get('md5_hash'):
+        return remote['md5_hash'] == local['md5_hash']
+    # Composite objects have no md5, fall back to crc32c
+    if remote.get('crc32c') and local.get('crc32c'):
+        return remote['crc32c'] == local['crc32c']
+    return False
+
+
+class UploadQueue:
+    def __init__(self, uploader: "GCSUploader", max_workers: int = 8):
+        """
+        Bounded thread pool that runs uploads in the background
+
+        Args:
+            uploader: GCSUploader whose client is shared by all workers
+            max_workers: Maximum number of uploads in flight
+        """
+        self.uploader = uploader
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix='gcs-upload')
+        self._lock = threading.Lock()
+        self._pending = []
+
+    def submit(self, local_file_path: str, gcs_file_path: str = None, metadata: dict = None):
+        """Queue a file for upload and return immediately"""
+        if metadata:
+            future = self._executor.submit(self.uploader.upload_with_metadata,
+                                           local_file_path, gcs_file_path, metadata)
+        else:
+            future = self._executor.submit(self.uploader.upload_file,
+                                           local_file_path, gcs_file_path)
+        with self._lock:
+            self._pending.append((local_file_path, future))
+        return future
+
+    def flush(self) -> dict:
+        """
+        Wait for every queued upload to finish
+
+        Returns:
+            dict with succeeded/failed counts and the uploaded local paths
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+
+        wait([future for _, future in pending])
+
+        uploaded_files = []
+        failed = 0
+        for local_file_path, future in pending:
+            if future.exception() is None and future.result():
+                uploaded_files.append(local_file_path)
+            else:
+                failed += 1
+
+        return {
+            "succeeded": len(uploaded_files),
+            "failed": failed,
+            "files": uploaded_files
+        }
+
+    def close(self):
+        """Flush outstanding uploads and stop the worker threads"""
+        result = self.flush()
+        self._executor.shutdown(wait=True)
+        return result
+
 
 class GCSUploader:
-    def __init__(self, bucket_name: str, credentials_path: Optional[str] = None):
+    def __init__(self, bucket_name: str, credentials_path: Optional[str] = None, client=None):
         """
         Initialize GCS uploader
 
         Args:
             bucket_name: Name of the GCS bucket
             credentials_path: Path to service account JSON file (optional if using default credentials)
+            client: Pre-built storage client (e.g. one pointed at a fake-gcs-server
+                    through STORAGE_EMULATOR_HOST)
         """
         self.bucket_name = bucket_name
 
         # Initialize the client
-        if credentials_path and os.path.exists(credentials_path):
+        if client is not None:
+            self.client = client
+        elif credentials_path and os.path.exists(credentials_path):
             credentials = service_account.Credentials.from_service_account_file(
                 credentials_path)
             self.client = storage.Client(credentials=credentials)
@@ -34,6 +146,22 @@ class GCSUploader:
 
         self.bucket = self.client.bucket(bucket_name)
 
+    def upload_many(self, items: List[tuple], max_workers: int = 8) -> List[str]:
+        """
+        Upload several files in parallel with the shared client
+
+        Args:
+            items: (local_file_path, gcs_file_path) pairs
+            max_workers: Maximum number of uploads in flight
+
+        Returns:
+            List of successfully uploaded local file paths
+        """
+        queue = UploadQueue(self, max_workers)
+        for local_file_path, gcs_file_path in items:
+            queue.submit(str(local_file_path), gcs_file_path)
+        return queue.close()["files"]
+
     def upload_file(self, local_file_path: str, gcs_file_path: str = None) -> bool:
         """
         Upload a single file to GCS
@@ -73,16 +201,23 @@ class GCSUploader:
             print(f"❌ Error uploading {local_file_path}: {e}")
             return False
 
-    def upload_json_folder(self, json_folder: str = "json", prefix: str = "tiktok-data/json/") -> List[str]:
+    def upload_json_folder(self, json_folder: str = "json", prefix: str = "tiktok-data/json/",
+                           sync: bool = False, manifest_path: Optional[str] = None,
+                           max_workers: int = 8) -> List[str]:
         """
         Upload all JSON files from the json folder
 
         Args:
             json_folder: Local folder containing JSON files
             prefix: GCS path prefix for uploaded files
+            sync: Only upload files whose checksum differs from the remote blob
+            manifest_path: In sync mode, compare against this locally cached
+                           manifest instead of listing the bucket
+            max_workers: Maximum number of parallel uploads
 
         Returns:
-            List of successfully uploaded file paths
+            List of successfully uploaded file paths (in sync mode, also the
+            files that were already up to date)
         """
         uploaded_files = []
 
@@ -98,12 +233,85 @@ class GCSUploader:
 
         print(f"📁 Found {len(json_files)} JSON files to upload")
 
-        for json_file in json_files:
-            gcs_path = f"{prefix}{json_file.name}"
-            if self.upload_file(str(json_file), gcs_path):
-                uploaded_files.append(str(json_file))
+        if sync:
+            return self.sync_files(json_files, prefix, manifest_path, max_workers)
+
+        return self.upload_many(
+            [(json_file, f"{prefix}{json_file.name}") for json_file in json_files],
+            max_workers)
+
+    def list_remote_checksums(self, prefix: str) -> dict:
+        """
+        List checksums of all blobs under a prefix with a single bucket listing
+
+        Returns:
+            dict of gcs_path -> {md5_hash, crc32c, size}
+        """
+        remote = {}
+        for blob in self.client.list_blobs(self.bucket_name, prefix=prefix):
+            remote[blob.name] = {
+                "md5_hash": blob.md5_hash,
+                "crc32c": blob.crc32c,
+                "size": blob.size
+            }
+        return remote
 
-        return uploaded_files
+    def sync_files(self, files: List[Path], prefix: str, manifest_path: Optional[str] = None,
+                   max_workers: int = 8) -> List[str]:
+        """
+        Upload only the files that differ from what is already in the bucket
+
+        Args:
+            files: Local files to sync
+            prefix: GCS path prefix
+            manifest_path: Locally cached manifest of remote checksums. When it
+                           exists it is used instead of listing the bucket, and
+                           it is updated after the sync.
+            max_workers: Maximum number of parallel uploads
+
+        Returns:
+            List of local file paths that are in sync after the call
+        """
+        if manifest_path and os.path.exists(manifest_path):
+            remote = load_manifest(manifest_path)
+            print(f"📒 Comparing against cached manifest {manifest_path}")
+        else:
+            remote = self.list_remote_checksums(prefix)
+            print(f"📒 Listed {len(remote)} remote blobs under gs://{self.bucket_name}/{prefix}")
+
+        synced_files = []
+        changed = {}
+        skipped = 0
+        bytes_uploaded = bytes_saved = 0
+
+        for local_file in files:
+            gcs_path = f"{prefix}{Path(local_file).name}"
+            local = file_checksums(str(local_file))
+
+            if checksums_match(local, remote.get(gcs_path)):
+                skipped += 1
+                bytes_saved += local['size']
+                synced_files.append(str(local_file))
+            else:
+                changed[str(local_file)] = (gcs_path, local)
+
+        uploaded_files = self.upload_many(
+            [(local_file, gcs_path) for local_file, (gcs_path, _) in changed.items()],
+            max_workers)
+        for local_file in uploaded_files:
+            gcs_path, local = changed[local_file]
+            remote[gcs_path] = local
+            bytes_uploaded += local['size']
+        synced_files.extend(uploaded_files)
+        uploaded = len(uploaded_files)
+        failed = len(changed) - uploaded
+
+        if manifest_path:
+            save_manifest(manifest_path, remote)
+
+        print(f"🔄 Sync complete: {uploaded} uploaded, {skipped} unchanged, {failed} failed")
+        print(f"   📦 {bytes_uploaded:,} bytes uploaded, {bytes_saved:,} bytes saved")
+        return synced_files
 
     def upload_with_metadata(self, local_file_path: str, gcs_file_path: str = None, metadata: dict = None) -> bool:
         """
@@ -219,6 +427,39 @@ class GCSUploader:
             return False
 
 
+_uploaders = {}
+_uploaders_lock = threading.Lock()
+
+
+def get_shared_uploader(bucket_name: str, credentials_path: Optional[str] = None) -> GCSUploader:
+    """Return one GCSUploader (and storage client) per bucket for the whole process"""
+    key = (bucket_name, credentials_path)
+    with _uploaders_lock:
+        if key not in _uploaders:
+            _uploaders[key] = GCSUploader(bucket_name, credentials_path)
+        return _uploaders[key]
+
+
+def load_manifest(manifest_path: str) -> dict:
+    """Load a cached manifest of remote checksums"""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('blobs', {})
+    except Exception as e:
+        print(f"⚠️  Could not read manifest {manifest_path}: {e}")
+        return {}
+
+
+def save_manifest(manifest_path: str, blobs: dict):
+    """Save the manifest of remote checksums"""
+    Path(manifest_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "generated_at": datetime.utcnow().isoformat(),
+            "blobs": blobs
+        }, f, indent=2, sort_keys=True)
+
+
 def get_gcs_config():
     """Get GCS configuration from environment variables or config file"""
     # Try environment variables first
@@ -237,13 +478,17 @@ def get_gcs_config():
     return bucket_name, credentials_path
 
 
-def upload_json_files(bucket_name: str = None, credentials_path: str = None) -> bool:
+def upload_json_files(bucket_name: str = None, credentials_path: str = None,
+                      sync: bool = False, manifest_path: str = None) -> bool:
     """
     Main function to upload JSON files to GCS
 
     Args:
         bucket_name: GCS bucket name
         credentials_path: Path to service account JSON
+        sync: Skip files whose checksum matches the remote blob (lists the
+              bucket, so the credentials need storage.objects.list)
+        manifest_path: Cached manifest used instead of listing the bucket
 
     Returns:
         bool: True if successful, False otherwise
@@ -259,12 +504,13 @@ def upload_json_files(bucket_name: str = None, credentials_path: str = None) ->
         return False
 
     try:
-        uploader = GCSUploader(bucket_name, credentials_path)
+        uploader = get_shared_uploader(bucket_name, credentials_path)
 
         print(f"🚀 Starting upload to GCS bucket: {bucket_name}")
 
         # Upload JSON files
-        uploaded_files = uploader.upload_json_folder()
+        uploaded_files = uploader.upload_json_folder(
+            sync=sync, manifest_path=manifest_path)
 
         if uploaded_files:
             print(f"📊 Successfully uploaded {len(uploaded_files)} files")
@@ -285,14 +531,22 @@ def upload_json_files(bucket_name: str = None, credentials_path: str = None) ->
 if __name__ == "__main__":
     import sys
 
-    if len(sys.argv) > 1:
-        bucket_name = sys.argv[1]
-        credentials_path = sys.argv[2] if len(sys.argv) > 2 else None
-        upload_json_files(bucket_name, credentials_path)
+    # --sync only uploads changed files, --manifest=<path> syncs against a cached manifest
+    flags = [arg for arg in sys.argv[1:] if arg.startswith('--')]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    sync = '--sync' in flags
+    manifest_path = next((flag.split('=', 1)[1]
+                         for flag in flags if flag.startswith('--manifest=')), None)
+
+    if len(args) > 0:
+        bucket_name = args[0]
+        credentials_path = args[1] if len(args) > 1 else None
+        upload_json_files(bucket_name, credentials_path, sync, manifest_path)
     else:
         print("Usage:")
-        print("  python gcs_uploader.py <bucket-name> [credentials-path]")
+        print("  python gcs_uploader.py <bucket-name> [credentials-path] [--sync] [--manifest=<path>]")
         print("  or set environment variables:")
         print("  export GCS_BUCKET_NAME='your-bucket-name'")
         print("  export GOOGLE_APPLICATION_CREDENTIALS='path/to/credentials.json'")
-        upload_json_files()
+        print("  Set STORAGE_EMULATOR_HOST to sync against a local fake-gcs-server")
+        upload_json_files(sync=sync, manifest_path=manifest_path)
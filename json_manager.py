@@ -8,73 +8,139 @@ JSON Data Manager for TikTok RSS
 
 import json
 import os
+import time
 import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
+from json.encoder import encode_basestring
 from pathlib import Path
 import csv
 
+import content_hash
+import sharding
+from records import UserFeed, VideoRecord
+from settings import get_setting
+from video_store import VideoStore
+
+DEFAULT_DB_PATH = get_setting('VIDEO_STORE_PATH', None) or 'tiktok.db'
+DEFAULT_STATS_LOG_PATH = get_setting('STATS_LOG_PATH', None) or 'stats/stats.bin'
+
 
 def rss_to_json(rss_file_path):
-    """Convert RSS file to JSON format"""
+    """
+    Convert an RSS file to a UserFeed
+
+    The feed is read with iterparse and each <item> is freed as soon as it
+    has been converted, so memory stays flat for large feeds.
+    """
     try:
-        tree = ET.parse(rss_file_path)
-        root = tree.getroot()
+        feed = None
+        channel = None
+        path = []
+
+        for event, elem in ET.iterparse(rss_file_path, events=('start', 'end')):
+            if event == 'start':
+                path.append(elem.tag)
+                if path == ['rss', 'channel']:
+                    channel = elem
+                continue
+
+            path.pop()
+            if channel is None:
+                continue
+
+            if path == ['rss', 'channel'] and elem.tag == 'item':
+                if feed is None:
+                    feed = _channel_feed(channel)
+
+                title_elem = elem.find('title')
+                link_elem = elem.find('link')
+                description_elem = elem.find('description')
+                pub_date_elem = elem.find('pubDate')
+                guid_elem = elem.find('guid')
+
+                feed.videos.append(VideoRecord(
+                    guid_elem.text.split('/')[-1] if guid_elem is not None else "",
+                    link=link_elem.text if link_elem is not None else "",
+                    title=title_elem.text if title_elem is not None else "",
+                    description=description_elem.text if description_elem is not None else "",
+                    pub_date=pub_date_elem.text if pub_date_elem is not None else "",
+                    guid=guid_elem.text if guid_elem is not None else ""))
+
+                # Free the converted item
+                elem.clear()
+                channel.remove(elem)
 
-        # Find channel
-        channel = root.find('channel')
         if channel is None:
             return None
-
-        # Extract channel info
-        title = channel.find('title').text if channel.find(
-            'title') is not None else ""
-        description = channel.find('description').text if channel.find(
-            'description') is not None else ""
-
-        # Extract user from title (format: "username TikTok")
-        user = title.replace(' TikTok', '') if title.endswith(
-            ' TikTok') else title
-
-        json_data = {
-            "user": user,
-            "title": title,
-            "description": description,
-            "updated": None,
-            "videos": []
-        }
-
-        # Extract items
-        for item in channel.findall('item'):
-            title_elem = item.find('title')
-            link_elem = item.find('link')
-            description_elem = item.find('description')
-            pub_date_elem = item.find('pubDate')
-            guid_elem = item.find('guid')
-
-            video_data = {
-                "id": guid_elem.text.split('/')[-1] if guid_elem is not None else "",
-                "title": title_elem.text if title_elem is not None else "",
-                "link": link_elem.text if link_elem is not None else "",
-                "description": description_elem.text if description_elem is not None else "",
-                "pub_date": pub_date_elem.text if pub_date_elem is not None else "",
-                "guid": guid_elem.text if guid_elem is not None else ""
-            }
-
-            json_data["videos"].append(video_data)
+        if feed is None:
+            feed = _channel_feed(channel)
 
         # Set updated time to most recent video or now
-        if json_data["videos"]:
-            json_data["updated"] = datetime.now(timezone.utc).isoformat()
+        if feed.videos:
+            feed.updated = datetime.now(timezone.utc).isoformat()
 
-        return json_data
+        return feed
 
     except Exception as e:
         print(f"Error converting {rss_file_path}: {e}")
         return None
 
 
-def convert_all_rss_to_json():
-    """Convert all RSS files in rss/ directory to JSON files in json/ directory"""
+def _channel_feed(channel):
+    """Build an empty UserFeed from the <channel> children parsed so far"""
+    # Extract channel info
+    title = channel.find('title').text if channel.find(
+        'title') is not None else ""
+    description = channel.find('description').text if channel.find(
+        'description') is not None else ""
+    title = title or ""
+    description = description or ""
+
+    # Extract user from title (format: "username TikTok")
+    user = title.replace(' TikTok', '') if title.endswith(
+        ' TikTok') else title
+
+    return UserFeed(user, extra={"title": title, "description": description})
+
+
+def _convert_rss_file(rss_file, json_file):
+    """Convert one RSS file and write its JSON; runs in a worker process"""
+    feed = rss_to_json(rss_file)
+    if not feed:
+        return False
+    with open(json_file, 'w', encoding='utf-8') as f:
+        json.dump(feed.to_dict(), f, indent=2, ensure_ascii=False)
+    return True
+
+
+def _written_by_scraper(json_file):
+    """True if json_file was written by postprocessing rather than converted from RSS"""
+    if content_hash.hash_path(json_file).exists():
+        return True
+    try:
+        with open(json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return isinstance(data, dict) and ('high_water_mark' in data or 'user_info' in data)
+
+
+def convert_all_rss_to_json(workers=None, force=False):
+    """
+    Convert all RSS files in rss/ directory to JSON files in json/ directory
+
+    postprocessing writes json/<user>.json (and the Atom / JSON Feed
+    outputs) directly, so this is only needed for RSS files from elsewhere.
+    JSON files newer than their RSS are skipped, and so are JSON files the
+    scraper wrote (they have stats and creation times the RSS lacks), even
+    when a checkout left the RSS newer.
+
+    Args:
+        workers: Number of worker processes (default: CONVERT_WORKERS or CPU count)
+        force: Convert even if the JSON file is newer than the RSS file or
+               was written by the scraper
+    """
     rss_dir = Path('rss')
     json_dir = Path('json')
 
@@ -84,176 +150,640 @@ def convert_all_rss_to_json():
 
     json_dir.mkdir(exist_ok=True)
 
+    if workers is None:
+        workers = int(os.environ.get('CONVERT_WORKERS') or 0) or os.cpu_count() or 1
+
+    jobs = []
+    skipped_count = 0
+    scraped_count = 0
+    for rss_file in sorted(rss_dir.glob('*.xml')):
+        json_file = json_dir / f"{rss_file.stem}.json"
+        if not force and json_file.exists():
+            # JSON written after the RSS is already up to date
+            if json_file.stat().st_mtime >= rss_file.stat().st_mtime:
+                skipped_count += 1
+                continue
+            # Never replace the scraper's JSON with the lossy RSS version
+            if _written_by_scraper(json_file):
+                scraped_count += 1
+                continue
+        jobs.append((rss_file, json_file))
+
+    if workers <= 1 or len(jobs) <= 1:
+        results = [_convert_rss_file(rss_file, json_file) for rss_file, json_file in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_convert_rss_file,
+                                        [rss_file for rss_file, _ in jobs],
+                                        [json_file for _, json_file in jobs],
+                                        chunksize=max(1, len(jobs) // (workers * 4))))
+
     converted_count = 0
-    for rss_file in rss_dir.glob('*.xml'):
-        json_data = rss_to_json(rss_file)
-        if json_data:
-            json_file = json_dir / f"{rss_file.stem}.json"
-            with open(json_file, 'w', encoding='utf-8') as f:
-                json.dump(json_data, f, indent=2, ensure_ascii=False)
+    for (rss_file, json_file), converted in zip(jobs, results):
+        if converted:
             print(f"✅ Converted {rss_file.name} → {json_file.name}")
             converted_count += 1
 
-    print(f"🎉 Converted {converted_count} RSS files to JSON")
+    print(f"🎉 Converted {converted_count} RSS files to JSON ({skipped_count} up to date, "
+          f"{scraped_count} written by the scraper)")
+    if scraped_count:
+        print("   Use --force to overwrite JSON written by the scraper")
 
 
-def create_consolidated_json():
-    """Create a single JSON file with all users' data"""
-    json_dir = Path('json')
+def iter_user_files(json_dir):
+    """Yield (json_file, user_data) for every user JSON file, one at a time"""
+    for json_file in sorted(Path(json_dir).glob('*.json')):
+        try:
+            with open(json_file, 'r', encoding='utf-8') as f:
+                user_data = json.load(f)
+        except Exception as e:
+            print(f"❌ Error reading {json_file}: {e}")
+            continue
+        yield json_file, user_data
+
+
+def _encode_indented(value, newline, indent, parts):
+    """Append the indented JSON for value to parts (see indented_json)"""
+    kind = type(value)
+    if kind is dict:
+        if not value:
+            parts.append('{}')
+            return
+        inner = newline + indent
+        separator = '{' + inner
+        append = parts.append
+        for key, item in value.items():
+            item_kind = type(item)
+            if item_kind is str:
+                append(separator + encode_basestring(key) + ': ' + encode_basestring(item))
+            elif item_kind is int:
+                append(separator + encode_basestring(key) + ': ' + int.__repr__(item))
+            else:
+                append(separator + encode_basestring(key) + ': ')
+                _encode_indented(item, inner, indent, parts)
+            separator = ',' + inner
+        append(newline + '}')
+    elif kind is list:
+        if not value:
+            parts.append('[]')
+            return
+        inner = newline + indent
+        separator = '[' + inner
+        for item in value:
+            parts.append(separator)
+            _encode_indented(item, inner, indent, parts)
+            separator = ',' + inner
+        parts.append(newline + ']')
+    elif kind is str:
+        parts.append(encode_basestring(value))
+    elif value is None:
+        parts.append('null')
+    elif value is True:
+        parts.append('true')
+    elif value is False:
+        parts.append('false')
+    elif kind is int:
+        parts.append(int.__repr__(value))
+    elif kind is float and value - value == 0:
+        parts.append(float.__repr__(value))
+    else:
+        raise TypeError(f"not handled by the fast encoder: {kind.__name__}")
 
-    if not json_dir.exists():
+
+def indented_json(data, prefix='', indent='  '):
+    """
+    Same output as json.dumps(data, indent=2, ensure_ascii=False), with
+    every line after the first prefixed by prefix
+
+    json.dumps only uses its C encoder without indent; this walks the
+    plain dicts and lists json.load returns about twice as fast as the
+    pure-Python indenting encoder. Anything else (non-str keys, NaN,
+    subclasses) goes through json.dumps.
+    """
+    parts = []
+    try:
+        _encode_indented(data, '\n' + prefix, indent, parts)
+    except TypeError:
+        return json.dumps(data, indent=len(indent), ensure_ascii=False).replace('\n', '\n' + prefix)
+    return ''.join(parts)
+
+
+class ConsolidatedSink:
+    """
+    Writes tiktok_data_consolidated.json
+
+    Users are streamed to disk one at a time and the totals are written
+    after the users list, so memory use does not grow with the dataset.
+    """
+    name = "consolidated"
+
+    def __init__(self, output_file='tiktok_data_consolidated.json'):
+        self.output_file = Path(output_file)
+        self.tmp_file = self.output_file.with_suffix('.json.tmp')
+        self.total_users = 0
+        self.total_videos = 0
+        self.f = None
+
+    def start(self):
+        self.f = open(self.tmp_file, 'w', encoding='utf-8')
+        self.f.write('{\n')
+        self.f.write(
+            f'  "generated_at": {json.dumps(datetime.now(timezone.utc).isoformat())},\n')
+        self.f.write('  "users": [')
+
+    def add(self, json_file, user_data):
+        self.f.write(',\n    ' if self.total_users else '\n    ')
+        self.f.write(indented_json(user_data, '    '))
+        self.total_users += 1
+        self.total_videos += len(user_data.get('videos', []))
+
+    def finish(self):
+        self.f.write('\n  ],\n' if self.total_users else '],\n')
+        self.f.write(f'  "total_users": {self.total_users},\n')
+        self.f.write(f'  "total_videos": {self.total_videos}\n')
+        self.f.write('}\n')
+        self.f.close()
+        os.replace(self.tmp_file, self.output_file)
+
+        print(f"✅ Created consolidated JSON: {self.output_file}")
+        print(
+            f"   📊 {self.total_users} users, {self.total_videos} videos")
+
+
+# json.dumps builds a new encoder per call when given options
+_encode_ndjson = json.JSONEncoder(ensure_ascii=False).encode
+
+
+class NdjsonSink:
+    """Writes every video as one JSON object per line for downstream tools"""
+    name = "ndjson"
+
+    def __init__(self, output_file='tiktok_videos.ndjson'):
+        self.output_file = Path(output_file)
+        self.video_count = 0
+        self.f = None
+
+    def start(self):
+        self.f = open(self.output_file, 'w', encoding='utf-8')
+
+    def add(self, json_file, user_data):
+        user = user_data.get('user', json_file.stem)
+        lines = [_encode_ndjson({"user": user, **video})
+                 for video in user_data.get('videos', [])]
+        if lines:
+            self.f.write('\n'.join(lines))
+            self.f.write('\n')
+        self.video_count += len(lines)
+
+    def finish(self):
+        self.f.close()
+        print(f"✅ Exported {self.video_count} videos to {self.output_file}")
+
+
+_NO_STATS = {}
+
+
+class CsvSink:
+    """Writes all video data to tiktok_videos.csv"""
+    name = "csv"
+    fieldnames = ['user', 'video_id', 'title', 'description', 'link',
+                  'created_time', 'thumbnail_url', 'views', 'likes', 'comments', 'shares']
+
+    def __init__(self, output_file='tiktok_videos.csv'):
+        self.output_file = Path(output_file)
+        self.video_count = 0
+        self.csvfile = None
+        self.writer = None
+
+    def start(self):
+        self.csvfile = open(self.output_file, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.csvfile)
+        self.writer.writerow(self.fieldnames)
+
+    def add(self, json_file, user_data):
+        # Rows are plain lists in fieldnames order; csv.writer skips the
+        # per-row dict lookups DictWriter does
+        user = user_data.get('user', json_file.stem)
+        rows = []
+        for video in user_data.get('videos', []):
+            get = video.get
+            stats = get('stats') or _NO_STATS
+            rows.append((
+                user,
+                get('id', ''),
+                (get('title') or '').replace('\n', ' '),
+                (get('description') or '').replace('\n', ' '),
+                get('link') or '',
+                get('created_time') or '',
+                get('thumbnail_url') or '',
+                stats.get('views', 0),
+                stats.get('likes', 0),
+                stats.get('comments', 0),
+                stats.get('shares', 0)
+            ))
+        self.writer.writerows(rows)
+        self.video_count += len(rows)
+
+    def finish(self):
+        self.csvfile.close()
+        print(f"✅ Exported {self.video_count} videos to {self.output_file}")
+
+
+def _engagement_rate(stats):
+    """(likes + comments + shares) / views, rounded, 0 without views"""
+    if not stats["total_views"]:
+        return 0.0
+    interactions = stats["total_likes"] + stats["total_comments"] + stats["total_shares"]
+    return round(interactions / stats["total_views"], 6)
+
+
+class ReportSink:
+    """
+    Builds tiktok_summary_report.json
+
+    Sums and the latest video come from a plain loop over each user's
+    videos. With detailed=True the videos are also collected into NumPy
+    columns (report_stats) for percentiles and per-day buckets.
+    """
+    name = "report"
+
+    def __init__(self, output_file='tiktok_summary_report.json', detailed=False):
+        self.output_file = Path(output_file)
+        self.detailed = detailed
+        self.report = None
+        self.columns = None
+
+    def start(self):
+        self.report = {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "users": {},
+            "totals": {
+                "users": 0,
+                "videos": 0,
+                "total_views": 0,
+                "total_likes": 0,
+                "total_comments": 0,
+                "total_shares": 0
+            }
+        }
+        if self.detailed:
+            try:
+                from report_stats import StatsColumns
+            except ImportError as e:
+                print(f"⚠️  Detailed report needs NumPy ({e}), writing the summary only")
+                return
+            self.columns = StatsColumns()
+
+    def add(self, json_file, user_data):
+        user = user_data.get('user', json_file.stem)
+        videos = user_data.get('videos', [])
+
+        user_stats = {
+            "video_count": len(videos),
+            "total_views": 0,
+            "total_likes": 0,
+            "total_comments": 0,
+            "total_shares": 0,
+            "latest_video": None
+        }
+
+        for video in videos:
+            stats = video.get('stats') or {}
+            user_stats["total_views"] += stats.get('views') or 0
+            user_stats["total_likes"] += stats.get('likes') or 0
+            user_stats["total_comments"] += stats.get('comments') or 0
+            user_stats["total_shares"] += stats.get('shares') or 0
+
+            created_time = video.get('created_time') or ''
+            if not user_stats["latest_video"] or created_time > user_stats["latest_video"]:
+                user_stats["latest_video"] = created_time
+
+        user_stats["engagement_rate"] = _engagement_rate(user_stats)
+        if self.columns is not None:
+            self.columns.add_videos(videos)
+
+        totals = self.report["totals"]
+        self.report["users"][user] = user_stats
+        totals["users"] += 1
+        totals["videos"] += user_stats["video_count"]
+        totals["total_views"] += user_stats["total_views"]
+        totals["total_likes"] += user_stats["total_likes"]
+        totals["total_comments"] += user_stats["total_comments"]
+        totals["total_shares"] += user_stats["total_shares"]
+
+    def finish(self):
+        report = self.report
+        report["totals"]["engagement_rate"] = _engagement_rate(report["totals"])
+        if self.columns is not None:
+            from report_stats import summarize
+
+            detail = summarize(self.columns)
+            report["totals"]["percentiles"] = detail["percentiles"]
+            report["daily"] = detail["daily"]
+
+        # Save report
+        with open(self.output_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+        # Print summary
+        print(f"✅ Generated summary report: {self.output_file}")
+        print(f"📊 Summary:")
+        print(f"   👥 Users: {report['totals']['users']}")
+        print(f"   🎥 Videos: {report['totals']['videos']}")
+        print(f"   👁️  Total Views: {report['totals']['total_views']:,}")
+        print(f"   ❤️  Total Likes: {report['totals']['total_likes']:,}")
+        print(f"   💬 Total Comments: {report['totals']['total_comments']:,}")
+        print(f"   🔄 Total Shares: {report['totals']['total_shares']:,}")
+        print(f"   📈 Engagement Rate: {report['totals']['engagement_rate']:.2%}")
+        return report
+
+
+def open_store(db_path, json_dir='json'):
+    """Open the SQLite store, backfilling it from json_dir if it did not exist yet"""
+    store = VideoStore(db_path)
+    if store.created and Path(json_dir).exists():
+        loaded = store.backfill_from_json(json_dir)
+        print(f"🗄️  Created {db_path} with {loaded} users from {json_dir}/")
+    return store
+
+
+def iter_store_feeds(db_path):
+    """Yield (pseudo json_file, user_data) for every user in the SQLite store"""
+    with open_store(db_path) as store:
+        for feed in store.iter_user_feeds():
+            yield Path(f"{feed.user}.json"), feed.to_dict()
+
+
+def run_sinks(sinks, json_dir='json', db_path=None):
+    """
+    Read every user once and fan it out to all sinks
+
+    Sinks get the json/<user>.json dict as json.load returned it, so a
+    combined run parses each file once and never builds records for it.
+
+    Args:
+        sinks: Sinks to feed
+        json_dir: Directory of user JSON files
+        db_path: Read users from this SQLite store instead of json_dir
+
+    Returns:
+        dict of sink name -> seconds spent in that sink
+    """
+    json_dir = Path(json_dir)
+
+    if db_path is None and not json_dir.exists():
         print("❌ JSON directory not found")
-        return
+        return {}
 
-    consolidated_data = {
-        "generated_at": datetime.now(timezone.utc).isoformat(),
-        "total_users": 0,
-        "total_videos": 0,
-        "users": []
-    }
+    timings = {sink.name: 0.0 for sink in sinks}
+    timings["read"] = 0.0
 
-    for json_file in json_dir.glob('*.json'):
-        try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                user_data = json.load(f)
+    for sink in sinks:
+        started = time.perf_counter()
+        sink.start()
+        timings[sink.name] += time.perf_counter() - started
 
-            consolidated_data["users"].append(user_data)
-            consolidated_data["total_users"] += 1
-            consolidated_data["total_videos"] += len(
-                user_data.get("videos", []))
+    if db_path:
+        files = iter_store_feeds(db_path)
+    else:
+        files = iter_user_files(json_dir)
+    while True:
+        started = time.perf_counter()
+        item = next(files, None)
+        timings["read"] += time.perf_counter() - started
+        if item is None:
+            break
+
+        json_file, user_data = item
+        if not isinstance(user_data, dict):
+            print(f"❌ Error reading {json_file}: not a user object")
+            continue
+        for sink in sinks:
+            started = time.perf_counter()
+            try:
+                sink.add(json_file, user_data)
+            except Exception as e:
+                print(f"❌ Error processing {json_file} in {sink.name}: {e}")
+            timings[sink.name] += time.perf_counter() - started
 
-        except Exception as e:
-            print(f"❌ Error reading {json_file}: {e}")
+    for sink in sinks:
+        started = time.perf_counter()
+        sink.finish()
+        timings[sink.name] += time.perf_counter() - started
+
+    return timings
+
+
+def create_consolidated_json(db_path=None):
+    """Create a single JSON file with all users' data"""
+    run_sinks([ConsolidatedSink()], db_path=db_path)
 
-    # Save consolidated file
-    consolidated_file = Path('tiktok_data_consolidated.json')
-    with open(consolidated_file, 'w', encoding='utf-8') as f:
-        json.dump(consolidated_data, f, indent=2, ensure_ascii=False)
 
-    print(f"✅ Created consolidated JSON: {consolidated_file}")
-    print(
-        f"   📊 {consolidated_data['total_users']} users, {consolidated_data['total_videos']} videos")
+def export_to_ndjson(db_path=None):
+    """Export all videos as NDJSON (one JSON object per line) for downstream tools"""
+    run_sinks([NdjsonSink()], db_path=db_path)
 
 
-def export_to_csv():
+def export_to_csv(db_path=None):
     """Export all video data to CSV format"""
+    run_sinks([CsvSink()], db_path=db_path)
+
+
+def generate_summary_report(db_path=None, detailed=False):
+    """
+    Generate a summary report of all data
+
+    Args:
+        db_path: Read users from this SQLite store instead of json/
+        detailed: Add percentiles and per-day buckets (needs NumPy)
+    """
+    run_sinks([ReportSink(detailed=detailed)], db_path=db_path)
+
+
+def import_json_to_store(db_path):
+    """Load every json/*.json file into the SQLite store"""
     json_dir = Path('json')
 
     if not json_dir.exists():
         print("❌ JSON directory not found")
         return
 
-    csv_file = Path('tiktok_videos.csv')
+    with VideoStore(db_path) as store:
+        store.backfill_from_json(json_dir)
+        counts = store.counts()
 
-    with open(csv_file, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['user', 'video_id', 'title', 'description', 'link',
-                      'created_time', 'thumbnail_url', 'views', 'likes', 'comments', 'shares']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
+    print(f"✅ Imported into {db_path}: {counts['users']} users, {counts['videos']} videos")
 
-        video_count = 0
-        for json_file in json_dir.glob('*.json'):
-            try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    user_data = json.load(f)
-
-                user = user_data.get('user', '')
-                for video in user_data.get('videos', []):
-                    stats = video.get('stats', {})
-                    writer.writerow({
-                        'user': user,
-                        'video_id': video.get('id', ''),
-                        'title': video.get('title', '').replace('\n', ' '),
-                        'description': video.get('description', '').replace('\n', ' '),
-                        'link': video.get('link', ''),
-                        'created_time': video.get('created_time', ''),
-                        'thumbnail_url': video.get('thumbnail_url', ''),
-                        'views': stats.get('views', 0),
-                        'likes': stats.get('likes', 0),
-                        'comments': stats.get('comments', 0),
-                        'shares': stats.get('shares', 0)
-                    })
-                    video_count += 1
 
-            except Exception as e:
-                print(f"❌ Error processing {json_file}: {e}")
+def query_store(db_path, users=None, since=None, until=None, limit=None):
+    """Print videos matching the filters as NDJSON"""
+    with open_store(db_path) as store:
+        videos = store.query_videos(users, since, until, limit)
 
-    print(f"✅ Exported {video_count} videos to {csv_file}")
+    for video in videos:
+        print(json.dumps(video.to_dict(), ensure_ascii=False))
+    return videos
 
 
-def generate_summary_report():
-    """Generate a summary report of all data"""
-    json_dir = Path('json')
+def _iso_to_unix(iso_time):
+    return int(datetime.fromisoformat(iso_time).timestamp()) if iso_time else None
 
-    if not json_dir.exists():
-        print("❌ JSON directory not found")
-        return
 
-    report = {
-        "generated_at": datetime.now(timezone.utc).isoformat(),
-        "users": {},
-        "totals": {
-            "users": 0,
-            "videos": 0,
-            "total_views": 0,
-            "total_likes": 0,
-            "total_comments": 0,
-            "total_shares": 0
-        }
-    }
+def compact_stats_log(log_path=DEFAULT_STATS_LOG_PATH, full_days=None):
+    """
+    Sort the stats log, drop redundant samples and downsample old ones
 
-    for json_file in json_dir.glob('*.json'):
-        try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                user_data = json.load(f)
+    Args:
+        log_path: Path to the stats log
+        full_days: Keep every sample of this many days, one per video per day
+                   before that (default: STATS_LOG_FULL_DAYS)
+    """
+    import stats_log
 
-            user = user_data.get('user', json_file.stem)
-            videos = user_data.get('videos', [])
+    if full_days is None:
+        full_days = get_setting('STATS_LOG_FULL_DAYS', 7, int)
+    result = stats_log.compact(log_path, full_days)
+    print(f"✅ Compacted {log_path}: {result['before']:,} → {result['after']:,} samples")
+    return result
 
-            user_stats = {
-                "video_count": len(videos),
-                "total_views": 0,
-                "total_likes": 0,
-                "total_comments": 0,
-                "total_shares": 0,
-                "latest_video": None
-            }
 
-            for video in videos:
-                stats = video.get('stats', {})
-                user_stats["total_views"] += stats.get('views', 0)
-                user_stats["total_likes"] += stats.get('likes', 0)
-                user_stats["total_comments"] += stats.get('comments', 0)
-                user_stats["total_shares"] += stats.get('shares', 0)
+def show_velocity(log_path=DEFAULT_STATS_LOG_PATH, since=None, until=None, users=None, limit=20):
+    """Print the fastest-growing videos between their first and last sample in a window"""
+    import stats_log
 
-                if not user_stats["latest_video"] or video.get('created_time', '') > user_stats["latest_video"]:
-                    user_stats["latest_video"] = video.get('created_time', '')
+    video_users = {}
+    if Path('json').exists():
+        for json_file, user_data in iter_user_files('json'):
+            for video in user_data.get('videos', []):
+                video_users[str(video.get('id'))] = user_data.get('user', json_file.stem)
 
-            report["users"][user] = user_stats
-            report["totals"]["users"] += 1
-            report["totals"]["videos"] += user_stats["video_count"]
-            report["totals"]["total_views"] += user_stats["total_views"]
-            report["totals"]["total_likes"] += user_stats["total_likes"]
-            report["totals"]["total_comments"] += user_stats["total_comments"]
-            report["totals"]["total_shares"] += user_stats["total_shares"]
+    video_ids = None
+    if users:
+        video_ids = [int(video_id) for video_id, user in video_users.items()
+                     if user in users and video_id.isdigit()]
 
-        except Exception as e:
-            print(f"❌ Error processing {json_file}: {e}")
+    result = stats_log.velocity(log_path, _iso_to_unix(since), _iso_to_unix(until), video_ids)
+    result = result[result['samples'] > 1]
+    result = result[result['views_per_hour'].argsort()[::-1][:limit]]
+
+    print(f"📈 Top {len(result)} videos by views/hour")
+    print(f"   {'user':<20} {'video_id':<20} {'samples':>7} {'+views':>12} {'+likes':>10} {'views/h':>10}")
+    for row in result:
+        user = video_users.get(str(row['video_id']), '?')
+        print(f"   {user:<20} {row['video_id']:<20} {row['samples']:>7} "
+              f"{row['delta_views']:>12,} {row['delta_likes']:>10,} {row['views_per_hour']:>10,.1f}")
+    return result
+
+
+def upload_gcs_index(json_dir='json'):
+    """Upload a GCS index of every user JSON file, if GCS is configured"""
+    try:
+        from gcs_uploader import get_gcs_config, get_shared_uploader
+    except ImportError:
+        print("⚠️  Google Cloud Storage not available, skipping the GCS index")
+        return False
+
+    bucket_name, credentials_path = get_gcs_config()
+    if not bucket_name:
+        print("⚠️  GCS bucket not configured, skipping the GCS index")
+        return False
+    uploader = get_shared_uploader(bucket_name, credentials_path)
+    return uploader.create_index_file([str(path) for path in sorted(Path(json_dir).glob('*.json'))])
+
+
+def merge_shard_stats_logs(shard_dirs):
+    """Add the stats log samples of every shard to this tree's log (STATS_LOG_PATH)"""
+    log_path = get_setting('STATS_LOG_PATH', None)
+    if not log_path:
+        return None
+    import stats_log
+
+    result = stats_log.merge(log_path, [Path(shard_dir) / log_path for shard_dir in shard_dirs
+                                        if sharding.find_manifests(shard_dir)])
+    if result['sources']:
+        print(f"📈 Merged {result['added']:,} stats samples from {result['sources']} shards "
+              f"into {log_path} ({result['after']:,} after compaction)")
+    return result
+
+
+def merge_shard_store(users):
+    """
+    Load the merged users into this tree's SQLite store (VIDEO_STORE_PATH)
+
+    A store that does not exist yet is backfilled from all of json/;
+    otherwise the users a shard scraped are upserted from their merged JSON.
+    """
+    db_path = get_setting('VIDEO_STORE_PATH', None)
+    if not db_path:
+        return 0
+    loaded = 0
+    with open_store(db_path) as store:
+        if store.created:
+            return store.counts()['users']
+        for user, status in sorted(users.items()):
+            json_file = Path('json') / f'{user}.json'
+            if status != 'ok' or not json_file.exists():
+                continue
+            try:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    store.upsert_user_feed(UserFeed.from_dict(json.load(f), user))
+            except Exception as e:
+                print(f"❌ Error loading {json_file} into {db_path}: {e}")
+                continue
+            loaded += 1
+    print(f"🗄️  Updated {loaded} users in {db_path}")
+    return loaded
+
+
+def merge_shard_outputs(shard_dirs, upload_index=True):
+    """
+    Merge shard outputs into this tree, then rebuild the exports and the GCS index
+
+    The shards' stats log samples and the SQLite store are merged too, when
+    STATS_LOG_PATH / VIDEO_STORE_PATH are set.
+    """
+    if not shard_dirs:
+        print("❌ No shard directories given")
+        return None
+
+    merged = sharding.merge_shards(shard_dirs)
+    print(f"🧩 Merged {len(merged['shards'])} of {merged['shard_count']} shards: "
+          f"{len(merged['users'])} users, {len(merged['files'])} files ({merged['copied']} copied)")
+    if merged['missing_shards']:
+        print(f"⚠️  Missing shards: {', '.join(map(str, merged['missing_shards']))}")
+    for conflict in merged['conflicts']:
+        print(f"❌ {conflict}")
+
+    merge_shard_stats_logs(shard_dirs)
+    merge_shard_store(merged['users'])
+
+    run_sinks([ConsolidatedSink(), NdjsonSink(), CsvSink(), ReportSink()])
+    if upload_index:
+        upload_gcs_index()
+    return merged
+
+
+def run_all(workers=None, force=False, db_path=None, detailed=False):
+    """Convert RSS, then build every export from a single scan of json/"""
+    started = time.perf_counter()
+    if db_path is None:
+        convert_all_rss_to_json(workers, force)
+    convert_time = time.perf_counter() - started
+
+    timings = run_sinks([ConsolidatedSink(), NdjsonSink(), CsvSink(), ReportSink(detailed=detailed)],
+                        db_path=db_path)
+    timings = {"convert": convert_time, **timings}
+
+    print("⏱️  Timings:")
+    for name, seconds in timings.items():
+        print(f"   {name:<12} {seconds:.3f}s")
+    return timings
 
-    # Save report
-    report_file = Path('tiktok_summary_report.json')
-    with open(report_file, 'w', encoding='utf-8') as f:
-        json.dump(report, f, indent=2, ensure_ascii=False)
 
-    # Print summary
-    print(f"✅ Generated summary report: {report_file}")
-    print(f"📊 Summary:")
-    print(f"   👥 Users: {report['totals']['users']}")
-    print(f"   🎥 Videos: {report['totals']['videos']}")
-    print(f"   👁️  Total Views: {report['totals']['total_views']:,}")
-    print(f"   ❤️  Total Likes: {report['totals']['total_likes']:,}")
-    print(f"   💬 Total Comments: {report['totals']['total_comments']:,}")
-    print(f"   🔄 Total Shares: {report['totals']['total_shares']:,}")
+def _flag_value(flags, name):
+    """Return the value of a --name=value flag, or None"""
+    prefix = f'--{name}='
+    return next((flag[len(prefix):] for flag in flags if flag.startswith(prefix)), None)
 
 
 def main():
@@ -263,32 +793,70 @@ def main():
     if len(sys.argv) < 2:
         print("TikTok JSON Data Manager")
         print("Commands:")
-        print("  convert     - Convert RSS files to JSON")
+        print("  convert     - Convert RSS files to JSON [--workers=N] [--force]")
         print("  consolidate - Create consolidated JSON file")
+        print("  ndjson      - Export videos as NDJSON (one per line)")
         print("  csv         - Export to CSV format")
-        print("  report      - Generate summary report")
+        print("  report      - Generate summary report [--detailed: percentiles and daily buckets, needs NumPy]")
         print("  all         - Run all operations")
+        print("  import      - Load json/*.json into the SQLite store")
+        print("  query       - Query the SQLite store [--users=a,b] [--since=ISO] [--until=ISO] [--limit=N]")
+        print("  velocity    - Fastest-growing videos from the stats log [--since=ISO] [--until=ISO] [--users=a,b] [--limit=N]")
+        print("  compact-stats - Sort the stats log, drop redundant samples and keep one per day after --days=N")
+        print("  merge <shard-dir>... - Merge sharded scraper outputs and rebuild the exports [--no-index]")
+        print("Add --db (or --db=path) to consolidate/ndjson/csv/report/all to read from the SQLite store")
         return
 
     command = sys.argv[1]
+    flags = sys.argv[2:]
+    force = '--force' in flags
+    workers = _flag_value(flags, 'workers')
+    workers = int(workers) if workers else None
+    db_path = _flag_value(flags, 'db')
+    if db_path is None and '--db' in flags:
+        db_path = DEFAULT_DB_PATH
 
     if command == "convert":
-        convert_all_rss_to_json()
+        convert_all_rss_to_json(workers, force)
     elif command == "consolidate":
-        create_consolidated_json()
+        create_consolidated_json(db_path)
+    elif command == "ndjson":
+        export_to_ndjson(db_path)
     elif command == "csv":
-        export_to_csv()
+        export_to_csv(db_path)
     elif command == "report":
-        generate_summary_report()
+        generate_summary_report(db_path, '--detailed' in flags)
     elif command == "all":
         print("🚀 Running all JSON operations...")
-        convert_all_rss_to_json()
-        create_consolidated_json()
-        export_to_csv()
-        generate_summary_report()
+        run_all(workers, force, db_path, '--detailed' in flags)
         print("🎉 All operations completed!")
+    elif command == "import":
+        import_json_to_store(db_path or DEFAULT_DB_PATH)
+    elif command == "query":
+        users = _flag_value(flags, 'users')
+        limit = _flag_value(flags, 'limit')
+        query_store(db_path or DEFAULT_DB_PATH,
+                    users=users.split(',') if users else None,
+                    since=_flag_value(flags, 'since'),
+                    until=_flag_value(flags, 'until'),
+                    limit=int(limit) if limit else None)
+    elif command == "velocity":
+        users = _flag_value(flags, 'users')
+        limit = _flag_value(flags, 'limit')
+        show_velocity(_flag_value(flags, 'log') or DEFAULT_STATS_LOG_PATH,
+                      since=_flag_value(flags, 'since'),
+                      until=_flag_value(flags, 'until'),
+                      users=users.split(',') if users else None,
+                      limit=int(limit) if limit else 20)
+    elif command == "compact-stats":
+        days = _flag_value(flags, 'days')
+        compact_stats_log(_flag_value(flags, 'log') or DEFAULT_STATS_LOG_PATH,
+                          int(days) if days else None)
+    elif command == "merge":
+        merge_shard_outputs([arg for arg in flags if not arg.startswith('--')],
+                            upload_index='--no-index' not in flags)
     else:
-        print("Unknown command. Use: convert, consolidate, csv, report, or all")
+        print("Unknown command. Use: convert, consolidate, ndjson, csv, report, all, import, query, velocity, compact-stats, or merge")
 
 
 if __name__ == "__main__":
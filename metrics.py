@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Per-stage timing and counters for scraper runs
+
+postprocessing wraps each stage of a run (msToken bootstrap, session
+creation, ttuser.info(), video paging, feed writing, the JSON dump,
+uploads) in a span and counts events such as new videos or unchanged
+feeds. At the end of the run the totals are written as a JSON summary or,
+for paths ending in .prom, as a Prometheus textfile for node_exporter's
+textfile collector.
+
+A disabled Metrics hands out one shared no-op context manager and ignores
+counters, so leaving the calls in place costs next to nothing.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+PROMETHEUS_PREFIX = 'tiktok_rss'
+
+_NULL_SPAN = nullcontext()
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def _label(value: str) -> str:
+    """Escape a Prometheus label value"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Span:
+    __slots__ = ('metrics', 'stage', 'user', 'started')
+
+    def __init__(self, metrics: 'Metrics', stage: str, user: Optional[str]):
+        self.metrics = metrics
+        self.stage = stage
+        self.user = user
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.stage, time.perf_counter() - self.started, self.user)
+        return False
+
+
+class Metrics:
+    def __init__(self, enabled: bool = True):
+        """
+        Initialize the collector
+
+        Args:
+            enabled: Record spans and counters; when False every call is a no-op
+        """
+        self.enabled = enabled
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.stages: Dict[str, List[float]] = {}
+        self.counters: Dict[str, float] = {}
+        self.users: Dict[str, Dict[str, float]] = {}
+
+    def span(self, stage: str, user: Optional[str] = None):
+        """Context manager timing one stage, optionally attributed to a user"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, stage, user)
+
+    def observe(self, stage: str, seconds: float, user: Optional[str] = None):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.stages.setdefault(stage, []).append(seconds)
+            if user is not None:
+                user_stages = self.users.setdefault(user, {})
+                user_stages[stage] = user_stages.get(stage, 0.0) + seconds
+
+    def count(self, name: str, value: float = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self, statuses: Optional[Dict[str, str]] = None) -> dict:
+        """
+        Totals for the run so far
+
+        Args:
+            statuses: user -> final status ("ok", "failed", ...) to include
+
+        Returns:
+            dict with per-stage timings, counters and per-user breakdowns
+        """
+        statuses = statuses or {}
+        with self._lock:
+            stages = {}
+            for stage, samples in self.stages.items():
+                ordered = sorted(samples)
+                total = sum(ordered)
+                stages[stage] = {
+                    "count": len(ordered),
+                    "total_seconds": round(total, 6),
+                    "mean_seconds": round(total / len(ordered), 6),
+                    "p50_seconds": round(_percentile(ordered, 50), 6),
+                    "p99_seconds": round(_percentile(ordered, 99), 6),
+                    "max_seconds": round(ordered[-1], 6)
+                }
+            counters = dict(self.counters)
+            users = {}
+            for user in sorted(set(self.users) | set(statuses)):
+                entry = {"stages": {stage: round(seconds, 6)
+                                    for stage, seconds in self.users.get(user, {}).items()}}
+                if user in statuses:
+                    entry["status"] = statuses[user]
+                users[user] = entry
+
+        for status in statuses.values():
+            counters[f'users_{status}'] = counters.get(f'users_{status}', 0) + 1
+
+        return {
+            "started_at": self.started_at.isoformat(),
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "run_seconds": round(time.perf_counter() - self._started, 6),
+            "stages": stages,
+            "counters": counters,
+            "users": users
+        }
+
+    def to_prometheus(self, statuses: Optional[Dict[str, str]] = None) -> str:
+        """Render the summary in the Prometheus text exposition format"""
+        summary = self.summary(statuses)
+        p = PROMETHEUS_PREFIX
+        lines = [
+            f'# HELP {p}_run_seconds Wall time of the last run',
+            f'# TYPE {p}_run_seconds gauge',
+            f'{p}_run_seconds {summary["run_seconds"]}',
+            f'# HELP {p}_last_run_timestamp_seconds When the last run finished',
+            f'# TYPE {p}_last_run_timestamp_seconds gauge',
+            f'{p}_last_run_timestamp_seconds {time.time():.0f}',
+            f'# HELP {p}_stage_seconds Time spent in each stage of the last run',
+            f'# TYPE {p}_stage_seconds summary',
+        ]
+        for stage, stats in sorted(summary["stages"].items()):
+            label = f'stage="{_label(stage)}"'
+            lines.append(f'{p}_stage_seconds{{{label},quantile="0.5"}} {stats["p50_seconds"]}')
+            lines.append(f'{p}_stage_seconds{{{label},quantile="0.99"}} {stats["p99_seconds"]}')
+            lines.append(f'{p}_stage_seconds_sum{{{label}}} {stats["total_seconds"]}')
+            lines.append(f'{p}_stage_seconds_count{{{label}}} {stats["count"]}')
+        lines += [
+            f'# HELP {p}_stage_max_seconds Slowest single span of each stage in the last run',
+            f'# TYPE {p}_stage_max_seconds gauge',
+        ]
+        for stage, stats in sorted(summary["stages"].items()):
+            lines.append(f'{p}_stage_max_seconds{{stage="{_label(stage)}"}} {stats["max_seconds"]}')
+        lines += [
+            f'# HELP {p}_events Events counted during the last run',
+            f'# TYPE {p}_events gauge',
+        ]
+        for name, value in sorted(summary["counters"].items()):
+            lines.append(f'{p}_events{{event="{_label(name)}"}} {value}')
+        lines += [
+            f'# HELP {p}_user_seconds Time spent on each user in the last run',
+            f'# TYPE {p}_user_seconds gauge',
+        ]
+        for user, entry in summary["users"].items():
+            if 'user' in entry["stages"]:
+                lines.append(f'{p}_user_seconds{{user="{_label(user)}",'
+                             f'status="{_label(entry.get("status", ""))}"}} '
+                             f'{entry["stages"]["user"]}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, paths: Iterable[str], statuses: Optional[Dict[str, str]] = None) -> List[str]:
+        """
+        Write the summary to each path, as a Prometheus textfile for .prom
+        paths and as JSON otherwise
+
+        Returns:
+            The paths written
+        """
+        if not self.enabled:
+            return []
+
+        written = []
+        for path in paths:
+            path = Path(path)
+            if path.suffix == '.prom':
+                content = self.to_prometheus(statuses)
+            else:
+                content = json.dumps(self.summary(statuses), indent=2, ensure_ascii=False) + '\n'
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # node_exporter may read the file at any moment, so replace it atomically
+            tmp_path = path.with_name(path.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+            written.append(str(path))
+        return written
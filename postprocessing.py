@@ -1,53 +1,45 @@
-from http import cookies
 import os
 import asyncio
-import csv
-import time
 import json
+import time
 from datetime import datetime, timezone
-import traceback
-from feedgen.feed import FeedGenerator
 # from tiktokapipy.api import TikTokAPI
-from TikTokApi import TikTokApi
 import config
-from playwright.async_api import async_playwright, Playwright
+import scheduler
+import sharding
+from scheduler import load_subscriptions, plan_users
+from settings import get_setting
+import token_cache
+import content_hash
+import feed_formats
+from feed_model import Feed, image_type
+from records import UserFeed, VideoRecord
+import metrics
+from video_store import VideoStore
 from pathlib import Path
-from urllib.parse import urlparse
+from importlib.util import find_spec
 
-# Google Cloud Storage imports (optional)
+# Google Cloud Storage (optional) is only imported once there is something to upload
 try:
-    from google.cloud import storage
-    from google.oauth2 import service_account
-    GCS_AVAILABLE = True
+    GCS_AVAILABLE = find_spec('google.cloud.storage') is not None
 except ImportError:
     GCS_AVAILABLE = False
+if not GCS_AVAILABLE:
     print("⚠️  Google Cloud Storage not available. Install with: pip install google-cloud-storage")
 
 
 # Edit config.py to change your URLs
 ghRawURL = config.ghRawURL
 
-api = TikTokApi()
-
-# ms_token = os.environ.get(
-#     "MS_TOKEN", None
-# )
+# Background upload queue, created on first use and flushed at the end of the run
+_upload_queue = None
 
 
-async def runscreenshot(playwright: Playwright, url, screenshotpath):
-    chromium = playwright.chromium  # or "firefox" or "webkit".
-    browser = await chromium.launch()
-    page = await browser.new_page()
-    await page.goto(url)
-    # Save the screenshot
-    await page.screenshot(path=screenshotpath, quality=20, type='jpeg')
-    await browser.close()
-
-
-async def upload_to_gcs(json_filename: str, user: str):
-    """Upload JSON file to Google Cloud Storage if configured"""
-    if not GCS_AVAILABLE:
-        return
+def get_upload_queue():
+    """Return the shared GCS upload queue, or None if GCS is not configured"""
+    global _upload_queue
+    if _upload_queue is not None:
+        return _upload_queue
 
     # Get GCS configuration
     bucket_name = os.environ.get('GCS_BUCKET_NAME') or getattr(
@@ -56,43 +48,154 @@ async def upload_to_gcs(json_filename: str, user: str):
         config, 'GCS_CREDENTIALS_PATH', None)
 
     if not bucket_name:
-        print(f"⚠️  GCS bucket not configured for {user}, skipping upload")
+        return None
+
+    from gcs_uploader import UploadQueue, get_shared_uploader
+    uploader = get_shared_uploader(bucket_name, credentials_path)
+    _upload_queue = UploadQueue(
+        uploader, get_setting('GCS_UPLOAD_WORKERS', 8, int))
+    return _upload_queue
+
+
+def upload_to_gcs(json_filename: str, user: str):
+    """Queue a JSON file for background upload to Google Cloud Storage if configured"""
+    if not GCS_AVAILABLE:
         return
 
     try:
-        # Initialize client
-        if credentials_path and os.path.exists(credentials_path):
-            credentials = service_account.Credentials.from_service_account_file(
-                credentials_path)
-            client = storage.Client(credentials=credentials)
-        else:
-            client = storage.Client()
+        queue = get_upload_queue()
+        if queue is None:
+            print(f"⚠️  GCS bucket not configured for {user}, skipping upload")
+            return
 
-        bucket = client.bucket(bucket_name)
+        queue.submit(json_filename, f"tiktok-data/json/{user}.json",
+                     metadata={'user': user})
 
-        # Upload file
-        gcs_path = f"tiktok-data/json/{user}.json"
-        blob = bucket.blob(gcs_path)
-        blob.content_type = 'application/json'
+    except Exception as e:
+        print(f"❌ Failed to upload {json_filename} to GCS: {e}")
 
-        # Add metadata
-        blob.metadata = {
-            'uploaded_at': datetime.utcnow().isoformat(),
-            'source': 'tiktok-rss-generator',
-            'user': user,
-            'file_size': str(os.path.getsize(json_filename))
-        }
 
-        blob.upload_from_filename(json_filename)
+async def flush_gcs_uploads():
+    """Wait for queued uploads without blocking the event loop"""
+    if _upload_queue is None:
+        return
 
-        print(f"☁️  Uploaded {json_filename} to gs://{bucket_name}/{gcs_path}")
+    with get_metrics().span('upload_flush'):
+        result = await asyncio.to_thread(_upload_queue.flush)
+    get_metrics().count('uploads_succeeded', result['succeeded'])
+    get_metrics().count('uploads_failed', result['failed'])
+    print(f"☁️  GCS uploads: {result['succeeded']} succeeded, {result['failed']} failed")
 
-    except Exception as e:
-        print(f"❌ Failed to upload {json_filename} to GCS: {e}")
 
+# SQLite video store, opened on first use and closed at the end of the run
+_video_store = None
+
+
+def get_video_store():
+    """Return the shared VideoStore, or None if VIDEO_STORE_PATH is empty"""
+    global _video_store
+    if _video_store is None:
+        db_path = get_setting('VIDEO_STORE_PATH', None)
+        if db_path:
+            _video_store = VideoStore(db_path)
+            if _video_store.created:
+                loaded = _video_store.backfill_from_json('json')
+                print(f'🗄️  Created {db_path} with {loaded} users from json/')
+    return _video_store
+
+
+def close_video_store():
+    global _video_store
+    if _video_store is not None:
+        _video_store.close()
+        _video_store = None
+
+
+# Run metrics, enabled by METRICS_PATH
+_metrics = None
+
+
+def get_metrics() -> metrics.Metrics:
+    """Return the run's Metrics, a no-op collector unless METRICS_PATH is set"""
+    global _metrics
+    if _metrics is None:
+        _metrics = metrics.Metrics(enabled=bool(get_setting('METRICS_PATH', None)))
+    return _metrics
+
+
+def write_metrics(statuses: dict):
+    """Write the run metrics to every path in METRICS_PATH (comma-separated)"""
+    paths = [path.strip() for path in (get_setting('METRICS_PATH', '') or '').split(',')
+             if path.strip()]
+    try:
+        for path in get_metrics().write(paths, statuses):
+            print(f'📈 Wrote run metrics to {path}')
+    except OSError as e:
+        print(f'⚠️  Could not write run metrics: {e}')
+
+
+# Thumbnail service, created on first use and closed at the end of the run
+_thumbnail_service = None
+
+
+def get_thumbnail_service():
+    """
+    Return the shared thumbnail service selected by THUMBNAILS
+
+    "screenshot" captures covers with a shared browser (ThumbnailCapture),
+    "fetch" downloads and re-encodes them (CoverFetcher); anything else
+    turns thumbnails off and returns None.
+    """
+    global _thumbnail_service
+    if _thumbnail_service is None:
+        mode = get_setting('THUMBNAILS', 'off')
+        root = get_setting('THUMBNAIL_DIR', 'thumbnails')
+        if mode == 'screenshot':
+            from thumbnail_capture import ThumbnailCapture
+            _thumbnail_service = ThumbnailCapture(
+                pages=get_setting('THUMBNAIL_PAGES', 4, int), root=root)
+        elif mode == 'fetch':
+            from cover_fetcher import CoverFetcher
+            _thumbnail_service = CoverFetcher(
+                root=root,
+                size=get_setting('THUMBNAIL_SIZE', 360, int),
+                image_format=get_setting('THUMBNAIL_FORMAT', 'jpeg'),
+                quality=get_setting('THUMBNAIL_QUALITY', 70, int),
+                connections=get_setting('THUMBNAIL_CONNECTIONS', 8, int))
+    return _thumbnail_service
+
+
+async def close_thumbnail_service():
+    global _thumbnail_service
+    if _thumbnail_service is None:
+        return
+    service, _thumbnail_service = _thumbnail_service, None
+    await service.close()
+    stats = service.stats()
+    for name, value in stats.items():
+        get_metrics().count(f'thumbnails_{name}', value)
+    print('🖼️  Thumbnails: ' + ', '.join(f'{value} {name}' for name, value in stats.items()))
+
+
+async def add_thumbnails(service, user: str, videos: list):
+    """Capture or fetch (or reuse) the thumbnails of videos and set their thumbnail_url"""
+    # A failed thumbnail leaves that video without one, it never fails the user
+    paths = await asyncio.gather(
+        *(service.thumbnail(user, video.id, video.cover_url) for video in videos),
+        return_exceptions=True)
+    for video, path in zip(videos, paths):
+        if isinstance(path, BaseException):
+            print(f"⚠️  No thumbnail for {user}/{video.id}: {path}")
+        elif path is not None:
+            video.thumbnail_url = ghRawURL + Path(path).as_posix()
+
+
+async def fetch_ms_token():
+    """Load a TikTok profile in headless Chromium and read the msToken cookie"""
+    from playwright.async_api import async_playwright
 
-async def user_videos():
     ms_token = ""
+    cookies = {}
     try:
         async with async_playwright() as playwright:
             chromium = playwright.chromium  # or "firefox" or "webkit".
@@ -101,146 +204,532 @@ async def user_videos():
             await page.goto('https://www.tiktok.com/@pdkm.tech')
             cookies_list = await page.context.cookies()
             for cookie in cookies_list:
+                if 'tiktok.com' in cookie.get('domain', ''):
+                    cookies[cookie['name']] = cookie['value']
                 if cookie['name'] == 'msToken':
                     ms_token = cookie['value']
                     print(f'Found msToken cookie: {ms_token}')
-                    break
             await browser.close()
     except Exception as e:
         print(f"❌ Error taking screenshot: {e}")
+    return ms_token, cookies
+
+
+async def get_ms_token(refresh: bool = False):
+    """
+    Return (ms_token, cookies, source)
 
-    with open('subscriptions.csv') as f:
-        cf = csv.DictReader(f, fieldnames=['username'])
-        for row in cf:
-            user = row['username']
-
-            print(f'Running for user \'{user}\'')
-
-            fg = FeedGenerator()
-            fg.id('https://www.tiktok.com/@' + user)
-            fg.title(user + ' TikTok')
-            fg.author({'name': 'Conor ONeill',
-                      'email': 'conor@conoroneill.com'})
-            fg.link(href='http://tiktok.com', rel='alternate')
-            fg.logo(ghRawURL + 'tiktok-rss.png')
-            fg.subtitle('OK Boomer, all the latest TikToks from ' + user)
-            fg.link(href=ghRawURL + 'rss/' + user + '.xml', rel='self')
-            fg.language('en')
-
-            # Set the last modification time for the feed to be the most recent post, else now.
-            updated = None
-
-            # Prepare JSON data structure for the user
-            user_json_data = {
-                "user": user,
-                "updated": None,
-                "videos": []
-            }
-
-            async with TikTokApi() as api:
-                await api.create_sessions(ms_tokens=[ms_token], num_sessions=1, sleep_after=3, headless=False)
-                ttuser = api.user(user)
-                try:
-                    user_data = await ttuser.info()
-                    # Store user info in JSON data
-                    user_json_data["user_info"] = {
-                        "username": user,
-                        "retrieved_at": datetime.now(timezone.utc).isoformat()
-                    }
-                    index = 0
-                    async for video in ttuser.videos(count=10):
-
-                        index += 1
-                        # remove pin 3 video
-                        if index <= 3:
-                            continue
-                        # RSS feed entry
-                        fe = fg.add_entry()
-                        link = "https://tiktok.com/@" + user + "/video/" + video.id
-
-                        fe.id(link)
-                        ts = datetime.fromtimestamp(
-                            video.as_dict['createTime'], timezone.utc)
-                        fe.published(ts)
-                        fe.updated(ts)
-                        updated = max(ts, updated) if updated else ts
-
-                        # Extract video data
-                        title = video.as_dict['desc'] if video.as_dict['desc'] else "No Title"
-                        content = video.as_dict['desc'] if video.as_dict['desc'] else "No Description"
-
-                        # Set RSS entry data
-                        fe.title(title[0:255] if title else "No Title")
-                        fe.link(href=link)
-
-                        # Handle thumbnail
-                        # thumbnail_url = None
-                        # if video.as_dict['video']['cover']:
-                        #     videourl = video.as_dict['video']['cover']
-                        #     parsed_url = urlparse(videourl)
-                        #     path_segments = parsed_url.path.split('/')
-                        #     last_segment = [
-                        #         seg for seg in path_segments if seg][-1]
-
-                        #     screenshotsubpath = "thumbnails/" + user + \
-                        #         "/screenshot_" + last_segment + ".jpg"
-                        #     screenshotpath = os.path.dirname(
-                        #         os.path.realpath(__file__)) + "/" + screenshotsubpath
-                        #     if not os.path.isfile(screenshotpath):
-                        #         async with async_playwright() as playwright:
-                        #             await runscreenshot(playwright, videourl, screenshotpath)
-                        #     screenshoturl = ghRawURL + screenshotsubpath
-                        #     thumbnail_url = screenshoturl
-                        #     content = '<img src="' + screenshoturl + '" / > ' + content
-
-                        fe.content(content)
-
-                        # Add to JSON data
-                        video_json = {
-                            "id": video.id,
-                            "link": link,
-                            "title": title,
-                            "description": video.as_dict['desc'] if video.as_dict['desc'] else "",
-                            "created_time": ts.isoformat(),
-                            # "thumbnail_url": thumbnail_url,
-                            "cover_url": video.as_dict['video']['cover'] if video.as_dict.get('video', {}).get('cover') else None,
-                            "author": user,
-                            "stats": {
-                                "views": video.as_dict.get('stats', {}).get('playCount', 0),
-                                "likes": video.as_dict.get('stats', {}).get('diggCount', 0),
-                                "comments": video.as_dict.get('stats', {}).get('commentCount', 0),
-                                "shares": video.as_dict.get('stats', {}).get('shareCount', 0)
-                            }
-                        }
-                        user_json_data["videos"].append(video_json)
-
-                    # Update timestamps
-                    fg.updated(updated)
-                    user_json_data["updated"] = updated.isoformat(
-                    ) if updated else datetime.now(timezone.utc).isoformat()
-
-                    # Create directories if they don't exist
-                    os.makedirs('rss', exist_ok=True)
-                    os.makedirs('json', exist_ok=True)
-
-                    # Write the RSS feed to a file
-                    fg.rss_file('rss/' + user + '.xml', pretty=True)
-
-                    # Write the JSON data to a file
-                    json_filename = f'json/{user}.json'
-                    with open(json_filename, 'w', encoding='utf-8') as json_file:
-                        json.dump(user_json_data, json_file,
-                                  indent=2, ensure_ascii=False)
-
-                    print(
-                        f'✅ Generated RSS: rss/{user}.xml and JSON: {json_filename}')
-
-                    # Upload to Google Cloud Storage if configured
-                    await upload_to_gcs(json_filename, user)
-                    # print(video)
-                    # print(video.as_dict)
-                except Exception as e:
-                    print(f'❌ Error processing user {user}: {e}')
+    MS_TOKEN from the environment wins, then an unexpired cached token,
+    and only then is the browser started to fetch a fresh one.
+    """
+    env_token = os.environ.get('MS_TOKEN')
+    if env_token and not refresh:
+        return env_token, {}, 'env'
+
+    cache_path = get_setting('MS_TOKEN_CACHE_PATH', '.cache/ms_token.json')
+    if not refresh:
+        cached = token_cache.load_cached_token(cache_path)
+        if cached:
+            print('🔑 Using cached msToken')
+            return cached['ms_token'], cached.get('cookies', {}), 'cache'
+
+    ms_token, cookies = await fetch_ms_token()
+    if ms_token:
+        ttl = get_setting('MS_TOKEN_TTL_SECONDS', 6 * 3600, float)
+        token_cache.save_token(cache_path, ms_token, cookies, ttl)
+    return ms_token, cookies, 'browser'
+
+
+def read_user_feed(user: str):
+    """Return json/<user>.json as a UserFeed, or None if it is missing or unreadable"""
+    json_filename = f'json/{user}.json'
+    try:
+        with open(json_filename, 'r', encoding='utf-8') as f:
+            return UserFeed.from_dict(json.load(f), user)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f'⚠️  Could not read {json_filename}: {e}')
+        return None
+
+
+def has_created_time(video: VideoRecord) -> bool:
+    try:
+        datetime.fromisoformat(video.created_time)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def load_previous_feed(user: str):
+    """
+    Return the previous run's json/<user>.json as a UserFeed, or None
+
+    New videos are merged with the previous ones by created_time. A feed
+    where some video has none (e.g. one written by "json_manager.py
+    convert", which only knows the RSS pubDate) is treated as absent, so
+    the user's videos are fetched again.
+    """
+    previous = read_user_feed(user)
+    if previous is not None and not all(has_created_time(video) for video in previous.videos):
+        print(f'⚠️  json/{user}.json has videos without created_time, fetching all videos')
+        return None
+    return previous
+
+
+def get_high_water_mark(previous: UserFeed):
+    """Return (known video ids, newest createTime already emitted) for a previous feed"""
+    if not previous:
+        return set(), 0
+
+    known_ids = {video.id for video in previous.videos}
+    mark = previous.high_water_mark or {}
+    newest = mark.get('create_time', 0)
+    if not newest:
+        for video in previous.videos:
+            try:
+                created = datetime.fromisoformat(video.created_time)
+                newest = max(newest, int(created.timestamp()))
+            except (TypeError, ValueError):
+                continue
+    return known_ids, newest
+
+
+def add_feed_entry(fg: 'FeedGenerator', video: VideoRecord):
+    """Add an RSS entry for a video record"""
+    fe = fg.add_entry()
+    fe.id(video.link)
+    ts = datetime.fromisoformat(video.created_time)
+    fe.published(ts)
+    fe.updated(ts)
+
+    title = video.title
+    fe.title(title[0:255] if title else "No Title")
+    fe.link(href=video.link)
+    fe.content(video.description or "No Description")
+    cover_url = video.thumbnail_url or video.cover_url
+    if cover_url:
+        fe.enclosure(cover_url, 0, image_type(cover_url))
+    return ts
+
+
+def build_feed_generator(user: str, videos: list, updated):
+    """Build the feedgen FeedGenerator for a user's videos (RSS_WRITER = "feedgen")"""
+    from feedgen.feed import FeedGenerator
+
+    fg = FeedGenerator()
+    fg.id('https://www.tiktok.com/@' + user)
+    fg.title(user + ' TikTok')
+    fg.author({'name': 'Conor ONeill',
+              'email': 'conor@conoroneill.com'})
+    fg.link(href='http://tiktok.com', rel='alternate')
+    fg.logo(ghRawURL + 'tiktok-rss.png')
+    fg.subtitle('OK Boomer, all the latest TikToks from ' + user)
+    fg.link(href=ghRawURL + 'rss/' + user + '.xml', rel='self')
+    fg.language('en')
+
+    for video in videos:
+        add_feed_entry(fg, video)
+
+    fg.updated(updated)
+    return fg
+
+
+def write_user_feeds(user: str, videos: list, updated, paths: dict):
+    """Render every enabled feed format for a user from one feed model"""
+    feed = Feed(user, videos, ghRawURL, updated)
+    for name, path in paths.items():
+        if name == 'rss' and get_setting('RSS_WRITER', 'stream') == 'feedgen':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            build_feed_generator(user, videos, updated).rss_file(path, pretty=True)
+        else:
+            feed_formats.write_format(feed, name, path)
+
+
+# A profile lists up to 3 pinned videos before the newest ones
+PINNED_VIDEOS = 3
+
+
+async def fetch_videos(ttuser, count: int = 10, seen=None, limit: int = 100) -> list:
+    """
+    Read a user's videos, newest first
+
+    Args:
+        ttuser: TikTokApi user
+        count: Videos always read (TikTokApi asks for 30 per request, so
+               these come from the first page)
+        seen: Returns True for a video that was already emitted; more pages
+              are only requested until one after the pinned videos is seen
+        limit: Most videos read when no seen video turns up
+
+    Returns:
+        TikTokApi videos
+    """
+    videos = []
+    crossed = seen is None
+    pages = ttuser.videos(count=count if seen is None else limit)
+    try:
+        async for video in pages:
+            videos.append(video)
+            if not crossed and len(videos) > PINNED_VIDEOS and seen(video):
+                crossed = True
+            if (crossed and len(videos) >= count) or len(videos) >= limit:
+                break
+    finally:
+        await pages.aclose()
+    return videos
+
+
+async def process_user(user: str, pool: 'TikTokSessionPool', limiter: 'RateLimiter'):
+    """Scrape one user and write json/<user>.json plus the enabled feed formats"""
+    print(f'Running for user \'{user}\'')
+
+    # Set the last modification time for the feed to be the most recent post, else now.
+    updated = None
+
+    # Prepare the feed for the user
+    feed = UserFeed(user)
+
+    # Page until the last-seen video is crossed. Videos already in the feed
+    # come back in the same page and get their stats refreshed
+    previous = load_previous_feed(user)
+    known_ids, newest_seen = get_high_water_mark(previous)
+    max_videos = get_setting('MAX_VIDEOS_PER_USER', 7, int)
+
+    def seen(video) -> bool:
+        return video.id in known_ids or video.as_dict['createTime'] <= newest_seen
+
+    async with pool.lease() as api:
+        ttuser = api.user(user)
+        with get_metrics().span('info', user):
+            user_data = await limiter.call(ttuser.info, f'info for {user}')
+        # Store user info in JSON data
+        feed.user_info = {
+            "username": user,
+            "retrieved_at": datetime.now(timezone.utc).isoformat()
+        }
+        with get_metrics().span('videos', user):
+            videos = await limiter.call(
+                lambda: fetch_videos(ttuser, PINNED_VIDEOS + max_videos,
+                                     seen if known_ids else None),
+                f'videos for {user}')
+        get_metrics().count('videos_fetched', len(videos))
+
+    # remove pin 3 video
+    fetched = videos[PINNED_VIDEOS:]
+    records = [VideoRecord.from_tiktok(video, user) for video in fetched]
+    new_videos = [record for record, video in zip(records, fetched) if not seen(video)]
+
+    # Pinned videos are left out of the stats log like they are left out of the feed
+    stats_log_path = get_setting('STATS_LOG_PATH', None)
+    if stats_log_path:
+        import stats_log
+        stats_log.append_samples(stats_log_path, [
+            (record.id, record.stats.views, record.stats.likes,
+             record.stats.comments, record.stats.shares) for record in records])
+
+    # Thumbnails are made after the TikTok session is handed back
+    thumbnails = get_thumbnail_service()
+    if thumbnails is not None and new_videos:
+        with get_metrics().span('thumbnails', user):
+            await add_thumbnails(thumbnails, user, new_videos)
+
+    # Merge the fetched videos (new ones and fresh stats for known ones) with
+    # the entries from the previous run, newest first
+    merged = {video.id: video for video in previous.videos} if previous else {}
+    for video in records:
+        known = merged.get(video.id)
+        if known is not None and video.thumbnail_url is None:
+            video.thumbnail_url = known.thumbnail_url
+        merged[video.id] = video
+    feed.videos = sorted(
+        merged.values(), key=lambda v: v.created_time, reverse=True)[:max_videos]
+
+    print(f'   {len(new_videos)} new videos for {user}')
+    get_metrics().count('videos_new', len(new_videos))
+
+    for video in feed.videos:
+        ts = datetime.fromisoformat(video.created_time)
+        updated = max(ts, updated) if updated else ts
+
+    if feed.videos:
+        newest = feed.videos[0]
+        feed.high_water_mark = {
+            "id": newest.id,
+            "create_time": int(datetime.fromisoformat(newest.created_time).timestamp())
+        }
+
+    # Update timestamps
+    feed.updated = updated.isoformat(
+    ) if updated else datetime.now(timezone.utc).isoformat()
+
+    # Create directories if they don't exist
+    os.makedirs('json', exist_ok=True)
+
+    feed_paths = {name: feed_formats.feed_path(name, user)
+                  for name in feed_formats.parse_formats(get_setting('FEED_FORMATS', 'rss'))}
+    json_filename = f'json/{user}.json'
+
+    # Keep the SQLite store in sync even when the files are unchanged
+    store = get_video_store()
+    if store is not None:
+        with get_metrics().span('store', user):
+            store.upsert_user_feed(feed)
+
+    # Skip writing (and uploading) feeds whose content has not changed
+    user_json_data = feed.to_dict()
+    payload = content_hash.meaningful_payload(user_json_data)
+    json_digest = content_hash.payload_hash(payload)
+    feed_digest = content_hash.payload_hash({"feed": payload, "ghRawURL": ghRawURL})
+    if all(content_hash.is_unchanged(path, feed_digest) for path in feed_paths.values()) and \
+            content_hash.is_unchanged(json_filename, json_digest):
+        print(f'⏭️  No changes for {user}, skipping write and upload')
+        get_metrics().count('feeds_unchanged')
+        return
+
+    # Write every feed format from the same data
+    with get_metrics().span('feed_write', user):
+        write_user_feeds(user, feed.videos, updated, feed_paths)
+        for path in feed_paths.values():
+            content_hash.write_hash(path, feed_digest)
+
+    # Write the JSON data to a file
+    with get_metrics().span('json_dump', user):
+        with open(json_filename, 'w', encoding='utf-8') as json_file:
+            json.dump(user_json_data, json_file,
+                      indent=2, ensure_ascii=False)
+        content_hash.write_hash(json_filename, json_digest)
+    get_metrics().count('feeds_written')
+
+    print(
+        f'✅ Generated {", ".join(feed_paths.values())} and JSON: {json_filename}')
+
+    # Upload to Google Cloud Storage if configured
+    with get_metrics().span('upload_enqueue', user):
+        upload_to_gcs(json_filename, user)
+    # print(video)
+    # print(video.as_dict)
+
+
+async def run_user_job(user: str, pool: 'TikTokSessionPool', limiter: 'RateLimiter',
+                       semaphore: asyncio.Semaphore, timeout: float):
+    """
+    Run process_user under the concurrency limit and per-user timeout
+
+    Returns True on success, False if the user failed and may be retried
+    later in the run, and None if retrying cannot help.
+    """
+    from TikTokApi.exceptions import NotFoundException
+
+    async with semaphore:
+        try:
+            with get_metrics().span('user', user):
+                if timeout and timeout > 0:
+                    await asyncio.wait_for(process_user(user, pool, limiter), timeout=timeout)
+                else:
+                    await process_user(user, pool, limiter)
+            return True
+        except NotFoundException:
+            print(f'❓ User {user} was not found on TikTok')
+            return None
+        except asyncio.TimeoutError:
+            print(f'⏱️  Timed out processing user {user} after {timeout:.0f}s')
+            get_metrics().count('user_timeouts')
+        except Exception as e:
+            print(f'❌ Error processing user {user}: {e}')
+            get_metrics().count('user_errors')
+        return False
+
+
+def create_fake_backend(kind: str):
+    """Build the offline TikTok backend selected by TIKTOK_BACKEND"""
+    import fake_tiktok
+
+    if kind == 'replay':
+        recording = fake_tiktok.load_recording(
+            get_setting('TIKTOK_REPLAY_PATH', 'tiktok_example_data.json'))
+    elif kind == 'synthetic':
+        recording = None
+    else:
+        raise ValueError(f'Unknown TIKTOK_BACKEND {kind!r} (expected live, replay or synthetic)')
+
+    return fake_tiktok.FakeBackend(
+        recording,
+        videos_per_user=get_setting('FAKE_VIDEOS_PER_USER', 10, int),
+        latency=get_setting('FAKE_LATENCY_MS', 0, float) / 1000,
+        jitter=get_setting('FAKE_JITTER_MS', 0, float) / 1000,
+        error_rate=get_setting('FAKE_ERROR_RATE', 0, float),
+        seed=get_setting('FAKE_SEED', 0, int),
+        cover_base_url=get_setting('FAKE_COVER_BASE_URL', fake_tiktok.COVER_BASE_URL))
+
+
+async def start_session_pool(size: int):
+    """Create the session pool, refreshing a cached msToken if TikTok rejects it"""
+    import fake_tiktok
+
+    backend = get_setting('TIKTOK_BACKEND', 'live')
+    if backend != 'live':
+        print(f'🧪 Using the offline {backend} TikTok backend')
+        pool = fake_tiktok.FakeSessionPool(create_fake_backend(backend), size)
+        with get_metrics().span('create_sessions'):
+            await pool.start()
+        return pool
+
+    pool = await start_live_session_pool(size)
+    record_path = get_setting('TIKTOK_RECORD_PATH', None)
+    if record_path:
+        pool = fake_tiktok.RecordingSessionPool(pool, record_path)
+    return pool
+
+
+# Where the msToken of the live session pool came from ("env", "cache" or "browser")
+_ms_token_source = None
+
+
+async def start_live_session_pool(size: int):
+    """Create the live TikTokApi session pool"""
+    global _ms_token_source
+    from session_pool import TikTokSessionPool
+
+    with get_metrics().span('ms_token'):
+        ms_token, cookies, source = await get_ms_token()
+    _ms_token_source = source
+    pool = TikTokSessionPool(size, ms_tokens=[ms_token], cookies=cookies,
+                             sleep_after=3, headless=False)
+    try:
+        with get_metrics().span('create_sessions'):
+            await pool.start()
+        return pool
+    except Exception as e:
+        if source != 'cache':
+            raise
+        print(f'⚠️  Cached msToken was rejected ({e}), fetching a new one')
+
+    token_cache.invalidate_token(
+        get_setting('MS_TOKEN_CACHE_PATH', '.cache/ms_token.json'))
+    get_metrics().count('ms_token_refreshes')
+    with get_metrics().span('ms_token'):
+        ms_token, cookies, _ = await get_ms_token(refresh=True)
+    _ms_token_source = 'browser'
+    pool = TikTokSessionPool(size, ms_tokens=[ms_token], cookies=cookies,
+                             sleep_after=3, headless=False)
+    with get_metrics().span('create_sessions'):
+        await pool.start()
+    return pool
+
+
+def check_ms_token(users: list, statuses: dict, limiter: 'RateLimiter'):
+    """
+    Invalidate the cached msToken if TikTok throttled the whole run
+
+    A stale msToken does not make create_sessions fail, it shows up as
+    captcha or empty responses on every request. When no user succeeded
+    and requests were still throttled after the limiter's retries, the
+    next run fetches a fresh token instead of reusing this one until it
+    expires.
+    """
+    if not limiter.exhausted or any(statuses.get(user) == 'ok' for user in users):
+        return
+    if _ms_token_source == 'env':
+        print('⚠️  Every user was throttled, MS_TOKEN may be stale')
+    elif _ms_token_source in ('cache', 'browser'):
+        print('⚠️  Every user was throttled, fetching a new msToken on the next run')
+        token_cache.invalidate_token(
+            get_setting('MS_TOKEN_CACHE_PATH', '.cache/ms_token.json'))
+        get_metrics().count('ms_token_invalidations')
+
+
+def output_files(user: str) -> list:
+    """Files a run writes for a user: its outputs, their content-hash sidecars and thumbnails"""
+    paths = [f'json/{user}.json']
+    paths += [feed_formats.feed_path(name, user)
+              for name in feed_formats.parse_formats(get_setting('FEED_FORMATS', 'rss'))]
+    files = [str(path) for artifact in paths
+             for path in (artifact, content_hash.hash_path(artifact))]
+    return files + thumbnail_files(user)
+
+
+def thumbnail_files(user: str) -> list:
+    """Thumbnails referenced by json/<user>.json, relative to the working tree"""
+    previous = read_user_feed(user)
+    files = {video.thumbnail_url[len(ghRawURL):] for video in (previous.videos if previous else [])
+             if video.thumbnail_url and video.thumbnail_url.startswith(ghRawURL)}
+    return sorted(files)
+
+
+async def scrape_users(users: list, statuses: dict):
+    """Scrape users with retries, recording "ok", "failed" or "not_found" in statuses"""
+    from rate_limit import RateLimiter
+
+    max_concurrent = max(1, get_setting('MAX_CONCURRENT_USERS', 1, int))
+    timeout = get_setting('USER_TIMEOUT_SECONDS', 0, float)
+
+    retry_rounds = max(0, get_setting('USER_RETRY_ROUNDS', 2, int))
+    limiter = RateLimiter(rate=get_setting('REQUESTS_PER_SECOND', 1.0, float),
+                          burst=get_setting('REQUEST_BURST', 2, int),
+                          max_retries=get_setting('REQUEST_MAX_RETRIES', 3, int),
+                          backoff_max=get_setting('BACKOFF_MAX_SECONDS', 120, float))
+
+    print(f'🚀 Processing {len(users)} users, {max_concurrent} at a time')
+    semaphore = asyncio.Semaphore(max_concurrent)
+    pool_size = min(max_concurrent, max(1, len(users)))
+    pool = await start_session_pool(pool_size)
+    pending = users
+    try:
+        # Failed users are queued again after everyone else has had a turn
+        for round_number in range(retry_rounds + 1):
+            if round_number:
+                print(f'🔁 Retrying {len(pending)} failed users '
+                      f'(round {round_number}/{retry_rounds})')
+                get_metrics().count('user_retries', len(pending))
+            results = await asyncio.gather(
+                *(run_user_job(user, pool, limiter, semaphore, timeout) for user in pending))
+            for user, ok in zip(pending, results):
+                statuses[user] = 'ok' if ok else 'failed' if ok is False else 'not_found'
+            pending = [user for user, ok in zip(pending, results) if ok is False]
+            if not pending:
+                break
+    finally:
+        get_metrics().count('throttled_requests', limiter.throttled)
+        await pool.close()
+        await close_thumbnail_service()
+        await flush_gcs_uploads()
+        close_video_store()
+
+    check_ms_token(users, statuses, limiter)
+    succeeded = sum(1 for user in users if statuses.get(user) == 'ok')
+    print(f'🎉 Finished: {succeeded} succeeded, {len(users) - succeeded} failed'
+          f' ({limiter.throttled} throttled requests)')
+
+
+async def user_videos():
+    # Created first so the run time covers the whole run
+    get_metrics()
+    subscriptions = load_subscriptions()
+
+    # With SHARD_COUNT > 1 this worker only scrapes the users its shard owns
+    subscriptions, shard_index, shard_count = sharding.select_shard(subscriptions)
+
+    # Users are marked checked as of the plan, not the end of the run
+    planned_at = time.time()
+    users, schedule_state = plan_users(subscriptions, planned_at)
+    statuses = {subscription.username: 'not_due' for subscription in subscriptions}
+    try:
+        if users:
+            await scrape_users(users, statuses)
+        else:
+            print('😴 No users are due, nothing to do')
+    finally:
+        if schedule_state is not None:
+            scheduler.mark_checked(schedule_state, [
+                user for user in users if statuses.get(user) in ('ok', 'not_found')],
+                now=planned_at)
+            scheduler.save_state(get_setting('SCHEDULE_STATE_PATH'), schedule_state)
+        if shard_count > 1:
+            path = sharding.write_manifest(shard_index, shard_count, statuses,
+                                           {user: output_files(user) for user in statuses})
+            print(f'🧩 Wrote shard manifest {path}')
+        write_metrics(statuses)
 
 
 if __name__ == "__main__":
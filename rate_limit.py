@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Adaptive rate limiting for TikTok requests
+
+A token bucket shared by every user job paces ttuser.info() and
+ttuser.videos() calls. When TikTok throttles us (captcha or empty
+responses) the rate is halved, all jobs pause for an exponential backoff
+with full jitter and the call is retried; every success nudges the rate
+back up towards the configured maximum.
+"""
+
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from TikTokApi.exceptions import CaptchaException, EmptyResponseException, InvalidJSONException
+
+T = TypeVar('T')
+
+THROTTLE_ERRORS = (CaptchaException, EmptyResponseException, InvalidJSONException)
+THROTTLE_MARKERS = ('429', 'too many requests', 'rate limit', 'captcha')
+
+
+def is_throttled(error: BaseException) -> bool:
+    """True if an exception looks like TikTok throttling or bot detection"""
+    if isinstance(error, THROTTLE_ERRORS):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in THROTTLE_MARKERS)
+
+
+class RateLimiter:
+    def __init__(self, rate: float = 1.0, burst: int = 2, min_rate: Optional[float] = None,
+                 max_retries: int = 3, backoff_base: float = 2.0, backoff_max: float = 120.0,
+                 increase: Optional[float] = None, rng: Optional[random.Random] = None):
+        """
+        Initialize the limiter
+
+        Args:
+            rate: Requests per second allowed at most (the starting rate)
+            burst: Requests that may be made back to back
+            min_rate: Floor for the rate after repeated throttling (default: rate / 20)
+            max_retries: Retries of a throttled call before giving up
+            backoff_base: Backoff ceiling for the first throttle, doubled on each one after
+            backoff_max: Upper bound for a single backoff
+            increase: Requests per second added back after each success (default: rate / 20)
+            rng: Random source for the jitter
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.min_rate = min(min_rate, rate) if min_rate is not None else rate / 20
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.increase = increase if increase is not None else rate / 20
+        self.rng = rng or random.Random()
+
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._consecutive_throttles = 0
+        self._lock = asyncio.Lock()
+        self.throttled = 0
+        # Calls still throttled after max_retries
+        self.exhausted = 0
+
+    async def acquire(self):
+        """Wait for a token (and for any backoff pause) before a request"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given attempt (1-based)"""
+        ceiling = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return self.rng.uniform(0, ceiling)
+
+    def on_success(self):
+        self._consecutive_throttles = 0
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self) -> float:
+        """Slow down after a throttled request; returns the pause in seconds"""
+        self.throttled += 1
+        self._consecutive_throttles += 1
+        self.rate = max(self.min_rate, self.rate / 2)
+        self._tokens = 0
+        delay = self.backoff_delay(self._consecutive_throttles)
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return delay
+
+    async def call(self, fn: Callable[[], Awaitable[T]], what: str = 'request') -> T:
+        """
+        Run an async call under the limiter, retrying when throttled
+
+        Args:
+            fn: Zero-argument coroutine function making one TikTok request
+            what: Description used in log messages
+
+        Returns:
+            Whatever fn returns
+        """
+        attempt = 0
+        while True:
+            await self.acquire()
+            try:
+                result = await fn()
+            except Exception as e:
+                if not is_throttled(e):
+                    raise
+                if attempt >= self.max_retries:
+                    self.exhausted += 1
+                    raise
+                attempt += 1
+                delay = self.on_throttle()
+                print(f'🐢 Throttled on {what} ({e}), backing off {delay:.1f}s '
+                      f'(retry {attempt}/{self.max_retries}, {self.rate:.2f} req/s)')
+                continue
+            self.on_success()
+            return result
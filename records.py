@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Slotted record types for videos and user feeds
+
+The scraper, the RSS converter, the SQLite store and the exporters all pass
+videos around as VideoRecord objects instead of nested dicts. Records use
+__slots__, so a large corpus takes far less memory than the equivalent
+dicts, and to_dict()/from_dict() convert to and from the json/<user>.json
+shape. Optional fields that are None are left out of to_dict(); keys a
+record does not know about are kept in `extra` and written back unchanged.
+"""
+
+from datetime import datetime, timezone
+from typing import List, Optional
+
+
+class VideoStats:
+    __slots__ = ('views', 'likes', 'comments', 'shares')
+
+    def __init__(self, views: int = 0, likes: int = 0, comments: int = 0, shares: int = 0):
+        self.views = views
+        self.likes = likes
+        self.comments = comments
+        self.shares = shares
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'VideoStats':
+        return cls(data.get('views', 0) or 0, data.get('likes', 0) or 0,
+                   data.get('comments', 0) or 0, data.get('shares', 0) or 0)
+
+    def to_dict(self) -> dict:
+        return {
+            "views": self.views,
+            "likes": self.likes,
+            "comments": self.comments,
+            "shares": self.shares
+        }
+
+
+# Shared stand-in for videos without stats; never mutate it
+NO_STATS = VideoStats()
+
+_VIDEO_KEYS = frozenset(('id', 'link', 'title', 'description', 'created_time', 'pub_date',
+                         'guid', 'cover_url', 'thumbnail_url', 'author', 'stats'))
+
+
+class VideoRecord:
+    __slots__ = ('id', 'link', 'title', 'description', 'created_time', 'pub_date', 'guid',
+                 'cover_url', 'thumbnail_url', 'author', 'stats', 'extra')
+
+    def __init__(self, id: str, link: str = '', title: str = '', description: str = '',
+                 created_time: Optional[str] = None, pub_date: Optional[str] = None,
+                 guid: Optional[str] = None, cover_url: Optional[str] = None,
+                 thumbnail_url: Optional[str] = None, author: Optional[str] = None,
+                 stats: Optional[VideoStats] = None, extra: Optional[dict] = None):
+        """
+        Args:
+            id: TikTok video id
+            link: Video URL
+            title: Title (the video caption, "No Title" if empty)
+            description: Caption, may be empty
+            created_time: ISO 8601 creation time (scraped videos)
+            pub_date: RFC 822 date (videos converted from RSS)
+            guid: RSS guid (videos converted from RSS)
+            cover_url: TikTok cover image URL
+            thumbnail_url: URL of the stored thumbnail
+            author: Username of the author
+            stats: View, like, comment and share counts
+            extra: Any other keys from the source dict
+        """
+        self.id = id
+        self.link = link
+        self.title = title
+        self.description = description
+        self.created_time = created_time
+        self.pub_date = pub_date
+        self.guid = guid
+        self.cover_url = cover_url
+        self.thumbnail_url = thumbnail_url
+        self.author = author
+        self.stats = stats
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'VideoRecord':
+        """Build a record from a video in the json/<user>.json shape"""
+        get = data.get
+        stats = get('stats')
+        extra = None
+        if not _VIDEO_KEYS.issuperset(data):
+            extra = {key: value for key, value in data.items() if key not in _VIDEO_KEYS} or None
+        return cls(get('id', ''), get('link') or '', get('title') or '', get('description') or '',
+                   get('created_time'), get('pub_date'), get('guid'), get('cover_url'),
+                   get('thumbnail_url'), get('author'),
+                   VideoStats.from_dict(stats) if stats is not None else None, extra)
+
+    @classmethod
+    def from_tiktok(cls, video, user: str) -> 'VideoRecord':
+        """Build a record from a TikTokApi video"""
+        data = video.as_dict
+        desc = data['desc']
+        stats = data.get('stats', {})
+        return cls(
+            video.id,
+            "https://tiktok.com/@" + user + "/video/" + video.id,
+            desc if desc else "No Title",
+            desc if desc else "",
+            datetime.fromtimestamp(data['createTime'], timezone.utc).isoformat(),
+            cover_url=data.get('video', {}).get('cover') or None,
+            author=user,
+            stats=VideoStats(stats.get('playCount', 0), stats.get('diggCount', 0),
+                             stats.get('commentCount', 0), stats.get('shareCount', 0)))
+
+    def to_dict(self) -> dict:
+        """Convert to the json/<user>.json shape"""
+        data = {
+            "id": self.id,
+            "link": self.link,
+            "title": self.title,
+            "description": self.description
+        }
+        if self.created_time is not None:
+            data["created_time"] = self.created_time
+        if self.pub_date is not None:
+            data["pub_date"] = self.pub_date
+        if self.guid is not None:
+            data["guid"] = self.guid
+        if self.cover_url is not None:
+            data["cover_url"] = self.cover_url
+        if self.thumbnail_url is not None:
+            data["thumbnail_url"] = self.thumbnail_url
+        if self.author is not None:
+            data["author"] = self.author
+        if self.stats is not None:
+            data["stats"] = self.stats.to_dict()
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+
+_FEED_KEYS = frozenset(('user', 'updated', 'videos', 'user_info', 'high_water_mark'))
+
+
+class UserFeed:
+    __slots__ = ('user', 'updated', 'videos', 'user_info', 'high_water_mark', 'extra')
+
+    def __init__(self, user: str, updated: Optional[str] = None,
+                 videos: Optional[List[VideoRecord]] = None, user_info: Optional[dict] = None,
+                 high_water_mark: Optional[dict] = None, extra: Optional[dict] = None):
+        """
+        Args:
+            user: TikTok username
+            updated: ISO 8601 time of the newest video
+            videos: Videos, newest first
+            user_info: Profile details recorded by the scraper
+            high_water_mark: Newest video already emitted ({id, create_time})
+            extra: Any other keys from the source dict
+        """
+        self.user = user
+        self.updated = updated
+        self.videos = videos if videos is not None else []
+        self.user_info = user_info
+        self.high_water_mark = high_water_mark
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data: dict, default_user: str = '') -> 'UserFeed':
+        """Build a feed from a json/<user>.json payload"""
+        extra = {key: value for key, value in data.items() if key not in _FEED_KEYS} or None
+        return cls(data.get('user', default_user), data.get('updated'),
+                   [VideoRecord.from_dict(video) for video in data.get('videos', [])],
+                   data.get('user_info'), data.get('high_water_mark'), extra)
+
+    def to_dict(self) -> dict:
+        """Convert to the json/<user>.json shape"""
+        data = {
+            "user": self.user,
+            "updated": self.updated,
+            "videos": [video.to_dict() for video in self.videos]
+        }
+        if self.user_info is not None:
+            data["user_info"] = self.user_info
+        if self.high_water_mark is not None:
+            data["high_water_mark"] = self.high_water_mark
+        if self.extra:
+            data.update(self.extra)
+        return data
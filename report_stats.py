@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Detailed statistics for the TikTok summary report (report --detailed)
+
+The per-user and overall sums in tiktok_summary_report.json come from a
+plain loop in json_manager.ReportSink, which is as fast as it gets for
+dicts from json.load. Percentiles and per-day buckets need every video's
+values, so for those the per-video stats are collected into flat int64
+columns and computed with NumPy. The columns are filled with C-level
+map()/itemgetter passes rather than a Python statement per video.
+"""
+
+from datetime import datetime, timezone
+from itertools import chain
+from operator import itemgetter, methodcaller
+from typing import List
+
+import numpy as np
+
+# created_time sentinel for videos without a parseable timestamp
+MISSING_TIME = np.iinfo(np.int64).min
+PERCENTILES = (50, 90, 99)
+SECONDS_PER_DAY = 86400
+
+COUNTERS = ('views', 'likes', 'comments', 'shares')
+
+_GET_CREATED = methodcaller('get', 'created_time', '')
+_GET_STATS = methodcaller('get', 'stats', {})
+_GET_COUNTERS = itemgetter(*COUNTERS)
+_UTC_SUFFIX = np.frombuffer(b'+00:00', dtype=np.uint8)
+
+
+def _created_ts(created_time) -> int:
+    if not created_time:
+        return MISSING_TIME
+    try:
+        return int(datetime.fromisoformat(created_time).timestamp())
+    except (TypeError, ValueError):
+        return MISSING_TIME
+
+
+def _parse_created(created_times: list):
+    """Parse ISO 8601 strings to int64 unix seconds with vectorized NumPy calls"""
+    result = np.full(len(created_times), MISSING_TIME, dtype=np.int64)
+    if not created_times:
+        return result
+
+    try:
+        raw = np.array(created_times, dtype='S32')
+    except (UnicodeEncodeError, TypeError, ValueError):
+        return np.array([_created_ts(t) for t in created_times], dtype=np.int64)
+
+    # postprocessing writes "YYYY-MM-DDTHH:MM:SS+00:00"; parse the first 19
+    # bytes of those rows in place and fall back to fromisoformat for the rest
+    chars = raw.view(np.uint8).reshape(len(raw), raw.itemsize)
+    utc = (chars[:, 24] != 0) & (chars[:, 25] == 0) & (chars[:, 19:25] == _UTC_SUFFIX).all(axis=1)
+    seconds = np.ndarray(raw.shape, dtype='S19', buffer=raw, strides=raw.strides)
+    result[utc] = seconds[utc].astype('datetime64[s]').astype(np.int64)
+
+    for i in np.flatnonzero(~utc & (chars[:, 0] != 0)):
+        result[i] = _created_ts(created_times[i])
+    return result
+
+
+def _engagement(likes, comments, shares, views):
+    """(likes + comments + shares) / views, 0 where there are no views"""
+    interactions = np.asarray(likes + comments + shares, dtype=np.float64)
+    views = np.asarray(views, dtype=np.float64)
+    return np.divide(interactions, views, out=np.zeros_like(interactions), where=views > 0)
+
+
+class StatsColumns:
+    """Append-only columnar buffer of per-video stats"""
+
+    def __init__(self):
+        self.created = []
+        # views, likes, comments, shares of every video, four values per row
+        self.counters = []
+
+    def add_videos(self, videos: List[dict]):
+        """
+        Append one user's videos
+
+        Args:
+            videos: Videos in the json/<user>.json shape, as json.load returned them
+        """
+        rows = len(self.counters)
+        try:
+            self.counters.extend(chain.from_iterable(map(_GET_COUNTERS, map(_GET_STATS, videos))))
+        except (KeyError, TypeError):
+            # Missing or null stats: undo the partial extend, then go video by video
+            del self.counters[rows:]
+            for video in videos:
+                stats = video.get('stats') or {}
+                self.counters.extend([stats.get(name) or 0 for name in COUNTERS])
+        self.created.extend(map(_GET_CREATED, videos))
+
+    def to_numpy(self) -> dict:
+        """The columns as NumPy arrays"""
+        try:
+            counters = np.array(self.counters, dtype=np.int64)
+        except (TypeError, ValueError):
+            # a null counter inside an otherwise complete stats dict
+            counters = np.array([value or 0 for value in self.counters], dtype=np.int64)
+        counters = counters.reshape(-1, len(COUNTERS))
+        columns = {name: counters[:, i] for i, name in enumerate(COUNTERS)}
+        columns['created'] = _parse_created(self.created)
+        return columns
+
+
+def _bincount_sum(index, values, length):
+    """Exact int64 sums of values grouped by index"""
+    if np.abs(values).sum() < 2 ** 53:
+        # float64 sums are exact below 2**53 and bincount is much faster than np.add.at
+        return np.bincount(index, weights=values, minlength=length).astype(np.int64)
+    sums = np.zeros(length, dtype=np.int64)
+    np.add.at(sums, index, values)
+    return sums
+
+
+def summarize(columns: StatsColumns) -> dict:
+    """
+    Compute the detailed report sections from collected columns
+
+    Returns:
+        dict with "percentiles" (p50/p90/p99 of each counter and of the
+        per-video engagement rate) and "daily" (videos and views per UTC day)
+    """
+    cols = columns.to_numpy()
+    created = cols['created']
+    counters = {name: cols[name] for name in COUNTERS}
+
+    percentiles = {}
+    if len(created):
+        video_engagement = _engagement(counters['likes'], counters['comments'],
+                                       counters['shares'], counters['views'])
+        percentiles = {
+            name: {f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(col, PERCENTILES))}
+            for name, col in {**counters, "engagement_rate": video_engagement}.items()
+        }
+
+    # Per-day buckets (UTC) of videos created
+    dated = created != MISSING_TIME
+    day_numbers = created[dated] // SECONDS_PER_DAY
+    first_day = int(day_numbers.min()) if len(day_numbers) else 0
+    day_index = day_numbers - first_day
+    day_videos = np.bincount(day_index)
+    day_views = _bincount_sum(day_index, counters['views'][dated], len(day_videos))
+    daily = [
+        {
+            "date": datetime.fromtimestamp((first_day + int(i)) * SECONDS_PER_DAY,
+                                           timezone.utc).date().isoformat(),
+            "videos": int(day_videos[i]),
+            "views": int(day_views[i])
+        }
+        for i in np.flatnonzero(day_videos)
+    ]
+
+    return {"percentiles": percentiles, "daily": daily}
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Streaming RSS 2.0 writer
+
+Writes a user's feed straight to a buffered file from the feed model,
+without building an lxml tree. The output is byte-for-byte what feedgen's
+rss_file(pretty=True) produces for the same feed (see
+benchmarks/bench_rss_writer.py).
+"""
+
+import os
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+from feed_model import Feed, FeedItem, escape_attr, escape_text
+from records import VideoRecord
+
+XML_DECLARATION = "<?xml version='1.0' encoding='UTF-8'?>\n"
+RSS_OPEN = ('<rss xmlns:atom="http://www.w3.org/2005/Atom" '
+            'xmlns:content="http://purl.org/rss/1.0/modules/content/" version="2.0">\n')
+
+
+def render_item(item: FeedItem) -> str:
+    """Render one <item>, with the thumbnail (or cover) as an <enclosure>"""
+    enclosure = (f"      <enclosure url=\"{item.cover_attr}\" length=\"0\" type=\"{item.cover_type}\"/>\n"
+                 if item.cover_url else "")
+    return (
+        "    <item>\n"
+        f"      <title>{item.title_xml}</title>\n"
+        f"      <link>{item.link_xml}</link>\n"
+        f"      <description>{item.content_xml}</description>\n"
+        f"      <guid isPermaLink=\"false\">{item.link_xml}</guid>\n"
+        f"{enclosure}"
+        f"      <pubDate>{item.published_rfc822}</pubDate>\n"
+        "    </item>\n"
+    )
+
+
+def render_channel_header(feed: Feed) -> str:
+    """Render everything in the feed before the first <item>"""
+    self_url = feed.url('rss', '.xml')
+    self_link = escape_text(self_url)
+
+    return (
+        XML_DECLARATION + RSS_OPEN +
+        "  <channel>\n"
+        f"    <title>{feed.title_xml}</title>\n"
+        f"    <link>{self_link}</link>\n"
+        f"    <description>{feed.description_xml}</description>\n"
+        f"    <atom:link href=\"{escape_attr(self_url)}\" rel=\"self\"/>\n"
+        "    <docs>http://www.rssboard.org/rss-specification</docs>\n"
+        "    <generator>python-feedgen</generator>\n"
+        "    <image>\n"
+        f"      <url>{feed.logo_url_xml}</url>\n"
+        f"      <title>{feed.title_xml}</title>\n"
+        f"      <link>{self_link}</link>\n"
+        "    </image>\n"
+        "    <language>en</language>\n"
+        f"    <lastBuildDate>{feed.updated_rfc822}</lastBuildDate>\n"
+    )
+
+
+def render_rss(feed: Feed) -> Iterator[str]:
+    """Yield the RSS document in chunks"""
+    yield render_channel_header(feed)
+    # feedgen prepends entries, so items come out oldest first
+    for item in reversed(feed.items):
+        yield render_item(item)
+    yield "  </channel>\n</rss>\n"
+
+
+def write_feed(path: str, chunks: Iterator[str]):
+    """Write rendered chunks to path through a temporary file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='\n', buffering=1024 * 1024) as f:
+        f.writelines(chunks)
+    os.replace(tmp_path, path)
+
+
+def write_rss(path: str, user: str, videos: List[VideoRecord], gh_raw_url: str,
+              updated: Optional[datetime] = None):
+    """
+    Stream a user's RSS feed to path
+
+    Args:
+        path: Output file
+        user: TikTok username
+        videos: Video records, newest first
+        gh_raw_url: Base URL the feed and logo are served from
+        updated: Time of the newest video (lastBuildDate), now if None
+    """
+    write_feed(path, render_rss(Feed(user, videos, gh_raw_url, updated)))
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Activity-based polling schedule
+
+Instead of scraping every subscription on every run, each user gets a
+polling interval derived from how often they post (the created_time
+history in json/<user>.json). A run only visits users whose next due time
+has passed, most overdue first, up to an optional per-run budget. When
+each user was last checked is kept in schedule.json so the schedule
+carries over between runs (including CI runs that commit the output).
+"""
+
+import csv
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from settings import get_setting
+
+HOUR = 3600
+
+# Poll twice per expected gap between posts
+POLLS_PER_POST = 2
+
+
+class Subscription(NamedTuple):
+    username: str
+    min_hours: Optional[float] = None
+    max_hours: Optional[float] = None
+
+
+def _hours(value: Optional[str], username: str, column: str) -> Optional[float]:
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        print(f"⚠️  Ignoring invalid {column} {value!r} for {username}")
+        return None
+
+
+def load_subscriptions(path: str = 'subscriptions.csv') -> List[Subscription]:
+    """
+    Read subscriptions.csv
+
+    Each row is "username[,min_hours[,max_hours]]". The optional columns
+    override the polling interval bounds for that user; set both to the
+    same value for a fixed interval, or to 0 to scrape on every run. A
+    header row starting with "username" may name the columns instead.
+    """
+    subscriptions = []
+    columns = ['username', 'min_hours', 'max_hours']
+    with open(path, newline='') as f:
+        for index, row in enumerate(csv.reader(f)):
+            if not row or not row[0].strip():
+                continue
+            if index == 0 and row[0].strip().lower() == 'username':
+                columns = [name.strip().lower() for name in row]
+                continue
+            values = dict(zip(columns, row))
+            username = values['username'].strip()
+            subscriptions.append(Subscription(
+                username,
+                _hours(values.get('min_hours'), username, 'min_hours'),
+                _hours(values.get('max_hours'), username, 'max_hours')))
+    return subscriptions
+
+
+def load_state(path: str) -> Dict[str, dict]:
+    """Load the per-user schedule state ({user: {"last_checked": unix time}})"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Could not read schedule state {path}: {e}")
+        return {}
+
+
+def save_state(path: str, state: Dict[str, dict]):
+    """Write the schedule state atomically"""
+    path = Path(path)
+    if path.parent != Path('.'):
+        path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp_path, path)
+
+
+def load_history(user: str, json_dir: str = 'json') -> List[int]:
+    """Unix creation times of a user's known videos, oldest first"""
+    try:
+        with open(Path(json_dir) / f'{user}.json', 'r', encoding='utf-8') as f:
+            videos = json.load(f).get('videos', [])
+    except (OSError, ValueError, AttributeError):
+        return []
+
+    created = []
+    for video in videos:
+        try:
+            created.append(int(datetime.fromisoformat(video['created_time']).timestamp()))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return sorted(created)
+
+
+def poll_interval(created: List[int], now: float, min_seconds: float, max_seconds: float) -> float:
+    """
+    Seconds between checks for a user with the given posting history
+
+    The expected gap between posts is the mean gap over the known videos,
+    or the time since the newest one if the account has gone quiet for
+    longer than that. Users without enough history are polled as often as
+    allowed.
+    """
+    if len(created) < 2:
+        return min_seconds
+    mean_gap = (created[-1] - created[0]) / (len(created) - 1)
+    expected_gap = max(mean_gap, now - created[-1])
+    return min(max_seconds, max(min_seconds, expected_gap / POLLS_PER_POST))
+
+
+def plan_run(subscriptions: Iterable[Subscription], state: Dict[str, dict],
+             min_hours: float = 4, max_hours: float = 168, grace_minutes: float = 30,
+             budget: int = 0, json_dir: str = 'json', now: Optional[float] = None) -> List[str]:
+    """
+    Pick the users to scrape in this run
+
+    Args:
+        subscriptions: Subscriptions with optional per-user interval overrides
+        state: Schedule state from load_state
+        min_hours: Shortest polling interval
+        max_hours: Longest polling interval
+        grace_minutes: Users due within this window are scraped now, so a
+            user on the same interval as the cron schedule is not skipped
+            by a few seconds of drift
+        budget: Maximum number of users (0 = no limit)
+        json_dir: Directory with the json/<user>.json history
+        now: Current unix time
+
+    Returns:
+        Usernames that are due, most overdue first
+    """
+    now = time.time() if now is None else now
+    grace = grace_minutes * 60
+    due = []
+    for subscription in subscriptions:
+        user = subscription.username
+        low = subscription.min_hours if subscription.min_hours is not None else min_hours
+        high = subscription.max_hours if subscription.max_hours is not None else max_hours
+        high = max(low, high)
+
+        last_checked = (state.get(user) or {}).get('last_checked')
+        if not last_checked:
+            due.append((float('inf'), user))
+            continue
+
+        interval = poll_interval(load_history(user, json_dir), now, low * HOUR, high * HOUR)
+        overdue = now + grace - (last_checked + interval)
+        if overdue >= 0:
+            due.append((overdue, user))
+
+    due.sort(key=lambda item: item[0], reverse=True)
+    users = [user for _, user in due]
+    return users[:budget] if budget and budget > 0 else users
+
+
+def mark_checked(state: Dict[str, dict], users: Iterable[str], now: Optional[float] = None):
+    """Record that users were scraped"""
+    now = int(time.time() if now is None else now)
+    for user in users:
+        state.setdefault(user, {})['last_checked'] = now
+
+
+def plan_users(subscriptions: list, now: Optional[float] = None):
+    """
+    Return (users to scrape this run, schedule state or None when every user runs)
+
+    Args:
+        subscriptions: Subscriptions to plan
+        now: Unix time of the run; pass the same value to mark_checked so a
+             long run does not push its users' next check past the grace window
+    """
+    state_path = get_setting('SCHEDULE_STATE_PATH', None)
+    if get_setting('SCHEDULER', 'activity') != 'activity' or not state_path:
+        return [subscription.username for subscription in subscriptions], None
+
+    state = load_state(state_path)
+    users = plan_run(
+        subscriptions, state,
+        min_hours=get_setting('SCHEDULE_MIN_HOURS', 4, float),
+        max_hours=get_setting('SCHEDULE_MAX_HOURS', 168, float),
+        grace_minutes=get_setting('SCHEDULE_GRACE_MINUTES', 30, float),
+        budget=get_setting('MAX_USERS_PER_RUN', 0, int),
+        now=now)
+    print(f'📅 {len(users)} of {len(subscriptions)} users are due this run')
+    return users, state
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Shared TikTokApi session pool
+
+Browser sessions are created once per run and leased out to user jobs.
+Each session is health-checked when it is leased and only broken sessions
+are recreated.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from TikTokApi import TikTokApi
+
+
+class TikTokSessionPool:
+    def __init__(self, size: int, ms_tokens: Optional[List[str]] = None,
+                 cookies: Optional[dict] = None, sleep_after: int = 3, headless: bool = False,
+                 health_check_timeout: float = 10):
+        """
+        Initialize the session pool
+
+        Args:
+            size: Number of sessions kept alive (one TikTokApi per session)
+            ms_tokens: msToken values handed to create_sessions
+            cookies: Extra TikTok cookies (name -> value) set on every session
+            sleep_after: Seconds to wait after a session is created
+            headless: Run the Playwright browser headless
+            health_check_timeout: Seconds before a health check counts as failed
+        """
+        self.size = max(1, size)
+        self.ms_tokens = [token for token in (ms_tokens or []) if token]
+        self.cookies = cookies or {}
+        self.sleep_after = sleep_after
+        self.headless = headless
+        self.health_check_timeout = health_check_timeout
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._apis: List[TikTokApi] = []
+        self.recreated = 0
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def start(self):
+        """Create all sessions concurrently"""
+        results = await asyncio.gather(
+            *(self._create_api() for _ in range(self.size)),
+            return_exceptions=True)
+
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"❌ Failed to create TikTok session: {result}")
+                continue
+            self._apis.append(result)
+            self._idle.put_nowait(result)
+
+        if not self._apis:
+            raise RuntimeError("Could not create any TikTok sessions")
+
+        print(f"🌐 Session pool ready with {len(self._apis)} sessions")
+
+    async def close(self):
+        """Close every session in the pool"""
+        for api in self._apis:
+            await self._close_api(api)
+        self._apis.clear()
+
+    @asynccontextmanager
+    async def lease(self):
+        """Borrow a healthy TikTokApi instance for the duration of a job"""
+        api = await self._idle.get()
+        try:
+            healthy = api is not None and await self._is_healthy(api)
+        except BaseException:
+            # Cancelled during the health check, the session is untouched
+            self._idle.put_nowait(api)
+            raise
+        if not healthy:
+            try:
+                api = await self._recreate(api)
+            except BaseException:
+                # _recreate removed the broken session from _apis first, hand
+                # back an empty slot that the next lease fills with a new session
+                self._idle.put_nowait(None)
+                raise
+        try:
+            yield api
+        finally:
+            self._idle.put_nowait(api)
+
+    async def _create_api(self) -> TikTokApi:
+        api = TikTokApi()
+        session_options = {}
+        if self.cookies:
+            session_options['cookies'] = [self.cookies]
+        await api.create_sessions(ms_tokens=self.ms_tokens or None, num_sessions=1,
+                                  sleep_after=self.sleep_after, headless=self.headless,
+                                  **session_options)
+        return api
+
+    async def _close_api(self, api: TikTokApi):
+        try:
+            await api.close_sessions()
+            await api.stop_playwright()
+        except Exception as e:
+            print(f"⚠️  Error closing TikTok session: {e}")
+
+    async def _is_healthy(self, api: TikTokApi) -> bool:
+        if not api.sessions:
+            return False
+        page = api.sessions[0].page
+        if page is None or page.is_closed():
+            return False
+        try:
+            await asyncio.wait_for(page.evaluate("() => true"),
+                                   timeout=self.health_check_timeout)
+            return True
+        except Exception:
+            return False
+
+    async def _recreate(self, api: Optional[TikTokApi]) -> TikTokApi:
+        """Close a broken session (None for an empty slot) and create its replacement"""
+        if api is not None:
+            print("♻️  Recreating broken TikTok session")
+            self._apis.remove(api)
+            await self._close_api(api)
+        new_api = await self._create_api()
+        self._apis.append(new_api)
+        self.recreated += 1
+        return new_api
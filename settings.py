@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Settings lookup shared by the scraper and the CLI
+
+Every setting can be overridden by an environment variable of the same
+name; otherwise the value in config.py is used.
+"""
+
+import os
+
+import config
+
+
+def get_setting(name: str, default=None, cast=str):
+    """Read a setting from the environment, falling back to config.py"""
+    value = os.environ.get(name)
+    if value is None or value == '':
+        value = getattr(config, name, None)
+    if value is None:
+        return default
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        print(f"⚠️  Invalid value for {name}: {value!r}, using {default!r}")
+        return default
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Deterministic sharding of subscriptions across parallel workers
+
+Users are assigned to shards by a stable hash of the username, so shard i
+of N owns the same users on every run and on every machine. Each shard
+scrapes its users into its own working tree and writes
+shards/shard-<i>-of-<N>.json describing what it produced. "json_manager.py
+merge" then combines the shard outputs into one tree.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+SHARDS_DIR = 'shards'
+MERGED_MANIFEST = 'shards/manifest.json'
+SCHEDULE_STATE = 'schedule.json'
+
+
+def shard_of(user: str, shard_count: int) -> int:
+    """Shard index owning a user (stable across runs, machines and Python versions)"""
+    if shard_count <= 1:
+        return 0
+    digest = hashlib.sha256(user.strip().lower().encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count
+
+
+def shard_users(users: Iterable, index: int, shard_count: int) -> list:
+    """Keep the users (usernames or objects with .username) owned by one shard"""
+    if shard_count <= 1:
+        return list(users)
+    return [user for user in users
+            if shard_of(getattr(user, 'username', user), shard_count) == index]
+
+
+def select_shard(subscriptions: list):
+    """
+    Keep the subscriptions owned by the shard set in SHARD_INDEX / SHARD_COUNT
+
+    Returns:
+        (subscriptions, shard index, shard count)
+    """
+    from settings import get_setting
+
+    shard_index = get_setting('SHARD_INDEX', 0, int)
+    shard_count = max(1, get_setting('SHARD_COUNT', 1, int))
+    if shard_count > 1:
+        if not 0 <= shard_index < shard_count:
+            raise ValueError(f'SHARD_INDEX must be between 0 and {shard_count - 1}')
+        subscriptions = shard_users(subscriptions, shard_index, shard_count)
+        print(f'🧩 Shard {shard_index} of {shard_count}: {len(subscriptions)} users')
+    return subscriptions, shard_index, shard_count
+
+
+def manifest_path(index: int, shard_count: int, root: str = '.') -> Path:
+    return Path(root) / SHARDS_DIR / f'shard-{index}-of-{shard_count}.json'
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_manifest(index: int, shard_count: int, statuses: Dict[str, str],
+                   user_files: Dict[str, List[str]], root: str = '.') -> Path:
+    """
+    Write shards/shard-<i>-of-<N>.json for a finished shard run
+
+    Args:
+        index: Shard index
+        shard_count: Total number of shards
+        statuses: user -> "ok", "failed", "not_found" or "not_due"
+        user_files: user -> output files (relative to root) that exist for the user
+        root: Working tree of the shard
+
+    Returns:
+        Path of the manifest
+    """
+    files = {}
+    for user, paths in user_files.items():
+        for relpath in paths:
+            path = Path(root) / relpath
+            if path.is_file():
+                files[relpath] = {"user": user, "sha256": _sha256(path),
+                                  "size": path.stat().st_size}
+
+    manifest = {
+        "shard": index,
+        "shard_count": shard_count,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "users": statuses,
+        "files": files
+    }
+    path = manifest_path(index, shard_count, root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False, sort_keys=True)
+        f.write('\n')
+    return path
+
+
+def find_manifests(shard_dir: str) -> List[Path]:
+    """Shard manifests in a shard's output directory"""
+    return sorted(p for p in (Path(shard_dir) / SHARDS_DIR).glob('shard-*-of-*.json'))
+
+
+def _load_json(path: Path, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def merge_shards(shard_dirs: List[str], dest: str = '.',
+                 shard_count: Optional[int] = None) -> dict:
+    """
+    Merge shard outputs into dest
+
+    Only files of users a shard owns are taken from it, so shards can never
+    overwrite each other. Files already identical in dest are not copied.
+    schedule.json is merged per user from the owning shard.
+
+    Args:
+        shard_dirs: Output directories of the shard runs
+        dest: Tree to merge into
+        shard_count: Expected number of shards (default: from the manifests)
+
+    Returns:
+        The merged manifest, also written to shards/manifest.json in dest
+    """
+    dest = Path(dest)
+    merged = {"users": {}, "files": {}, "shards": [], "conflicts": []}
+    schedule = _load_json(dest / SCHEDULE_STATE, {})
+    schedule_changed = False
+    copied = 0
+
+    for shard_dir in shard_dirs:
+        manifests = find_manifests(shard_dir)
+        if not manifests:
+            print(f"⚠️  No shard manifest in {shard_dir}, skipping")
+            continue
+
+        for path in manifests:
+            manifest = _load_json(path, {})
+            index, count = manifest.get('shard'), manifest.get('shard_count')
+            if shard_count is None:
+                shard_count = count
+            if count != shard_count:
+                merged["conflicts"].append(f"{path}: shard count {count}, expected {shard_count}")
+                continue
+            if index in merged["shards"]:
+                merged["conflicts"].append(f"{path}: shard {index} appears more than once")
+                continue
+            merged["shards"].append(index)
+
+            for user, status in manifest.get('users', {}).items():
+                if shard_of(user, shard_count) != index:
+                    merged["conflicts"].append(f"{path}: user {user} belongs to another shard")
+                    continue
+                merged["users"][user] = status
+
+            for relpath, info in manifest.get('files', {}).items():
+                user = info.get('user', '')
+                if relpath in merged["files"] and \
+                        merged["files"][relpath].get('sha256') == info.get('sha256'):
+                    # Content-addressed covers can be shared by users of different shards
+                    continue
+                if shard_of(user, shard_count) != index or relpath in merged["files"]:
+                    merged["conflicts"].append(f"{path}: {relpath} is not owned by shard {index}")
+                    continue
+                source = Path(shard_dir) / relpath
+                target = dest / relpath
+                if not source.is_file() or _sha256(source) != info.get('sha256'):
+                    merged["conflicts"].append(f"{path}: {relpath} is missing or does not match")
+                    continue
+                merged["files"][relpath] = info
+                if source.resolve() != target.resolve() and \
+                        (not target.is_file() or _sha256(target) != info['sha256']):
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(source, target)
+                    copied += 1
+
+            shard_schedule = _load_json(Path(shard_dir) / SCHEDULE_STATE, {})
+            for user, state in shard_schedule.items():
+                if shard_of(user, shard_count) == index and schedule.get(user) != state:
+                    schedule[user] = state
+                    schedule_changed = True
+
+    if schedule_changed:
+        tmp_path = dest / (SCHEDULE_STATE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(schedule, f, indent=2, sort_keys=True)
+            f.write('\n')
+        os.replace(tmp_path, dest / SCHEDULE_STATE)
+
+    merged["shards"].sort()
+    merged["shard_count"] = shard_count
+    merged["missing_shards"] = [i for i in range(shard_count or 0) if i not in merged["shards"]]
+    merged["generated_at"] = datetime.now(timezone.utc).isoformat()
+    merged["copied"] = copied
+
+    path = dest / MERGED_MANIFEST
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(merged, f, indent=2, ensure_ascii=False, sort_keys=True)
+        f.write('\n')
+    return merged
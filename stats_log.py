@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Append-only stats time-series
+
+Every run appends one fixed-width record per video seen:
+(video_id, timestamp, views, likes, comments, shares), all little-endian
+64-bit integers. The file is read back through a NumPy memory map, so
+scanning millions of samples does not load them into Python objects.
+"""
+
+import os
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+MAGIC = b'TTSTATS1'
+HEADER_SIZE = 16
+RECORD_DTYPE = np.dtype([
+    ('video_id', '<u8'),
+    ('timestamp', '<i8'),
+    ('views', '<i8'),
+    ('likes', '<i8'),
+    ('comments', '<i8'),
+    ('shares', '<i8'),
+])
+COUNTERS = ('views', 'likes', 'comments', 'shares')
+SECONDS_PER_DAY = 86400
+
+
+def _header() -> bytes:
+    return MAGIC + RECORD_DTYPE.itemsize.to_bytes(8, 'little')
+
+
+def _check_header(f, path):
+    header = f.read(HEADER_SIZE)
+    if header != _header():
+        raise ValueError(f"{path} is not a stats log (bad header)")
+
+
+def _sorted(samples: np.ndarray) -> np.ndarray:
+    """Samples ordered by (video_id, timestamp)"""
+    return samples[np.lexsort((samples['timestamp'], samples['video_id']))]
+
+
+def append_samples(log_path: str, samples: Iterable[tuple], timestamp: Optional[int] = None) -> int:
+    """
+    Append one sample per video to the log
+
+    Args:
+        log_path: Path to the stats log
+        samples: (video_id, views, likes, comments, shares) tuples
+        timestamp: Unix time of the samples (default: now)
+
+    Returns:
+        Number of records written
+    """
+    timestamp = int(timestamp if timestamp is not None else time.time())
+    rows = []
+    for video_id, views, likes, comments, shares in samples:
+        try:
+            rows.append((int(video_id), timestamp, int(views or 0), int(likes or 0),
+                         int(comments or 0), int(shares or 0)))
+        except (TypeError, ValueError):
+            continue
+
+    if not rows:
+        return 0
+
+    path = Path(log_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    records = np.array(rows, dtype=RECORD_DTYPE)
+
+    with open(path, 'ab') as f:
+        if f.tell() == 0:
+            f.write(_header())
+        f.write(records.tobytes())
+    return len(records)
+
+
+def read_samples(log_path: str) -> np.ndarray:
+    """Memory-map the log as a structured array (empty if the log does not exist)"""
+    path = Path(log_path)
+    if not path.exists() or path.stat().st_size <= HEADER_SIZE:
+        return np.empty(0, dtype=RECORD_DTYPE)
+
+    with open(path, 'rb') as f:
+        _check_header(f, path)
+
+    count = (path.stat().st_size - HEADER_SIZE) // RECORD_DTYPE.itemsize
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(count,))
+
+
+def compact(log_path: str, full_days: Optional[int] = None, now: Optional[int] = None) -> dict:
+    """
+    Rewrite the log sorted by (video_id, timestamp) without redundant samples
+
+    Duplicate samples and samples in the middle of a run of identical
+    counters are dropped; the first and last sample of each run are kept so
+    deltas and velocities are unchanged. With full_days, samples older than
+    that are downsampled to the last sample of each video per UTC day, so
+    the log grows with the number of days a video is tracked rather than
+    the number of runs.
+
+    Args:
+        log_path: Path to the stats log
+        full_days: Keep every sample of the last full_days days only
+        now: Unix time full_days counts back from (default: now)
+
+    Returns:
+        dict with records before and after compaction
+    """
+    samples = read_samples(log_path)
+    before = len(samples)
+    if before == 0:
+        return {"before": 0, "after": 0}
+
+    data = _sorted(np.asarray(samples))
+    del samples
+
+    # Drop exact duplicates of (video_id, timestamp)
+    keep = np.ones(len(data), dtype=bool)
+    keep[1:] = (data['video_id'][1:] != data['video_id'][:-1]) | \
+        (data['timestamp'][1:] != data['timestamp'][:-1])
+    data = data[keep]
+
+    if full_days is not None and len(data):
+        cutoff = int(time.time() if now is None else now) - full_days * SECONDS_PER_DAY
+        day = data['timestamp'] // SECONDS_PER_DAY
+        last_of_day = np.ones(len(data), dtype=bool)
+        last_of_day[:-1] = (data['video_id'][1:] != data['video_id'][:-1]) | (day[1:] != day[:-1])
+        data = data[(data['timestamp'] >= cutoff) | last_of_day]
+
+    # Drop samples whose counters match both neighbours of the same video
+    same = np.ones(len(data) - 1, dtype=bool) if len(data) > 1 else np.zeros(0, dtype=bool)
+    same &= data['video_id'][1:] == data['video_id'][:-1]
+    for name in COUNTERS:
+        same &= data[name][1:] == data[name][:-1]
+    redundant = np.zeros(len(data), dtype=bool)
+    if len(data) > 2:
+        redundant[1:-1] = same[:-1] & same[1:]
+    data = data[~redundant]
+
+    tmp_path = f"{log_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_header())
+        f.write(data.tobytes())
+    os.replace(tmp_path, log_path)
+
+    return {"before": before, "after": len(data)}
+
+
+def merge(log_path: str, source_paths: Iterable[str]) -> dict:
+    """
+    Add the samples of other stats logs (e.g. from shard runs) to a log
+
+    The log is compacted afterwards, so samples that more than one source
+    holds (same video and timestamp) are kept once.
+
+    Args:
+        log_path: Path to the stats log to merge into
+        source_paths: Logs to merge; missing ones and log_path itself are skipped
+
+    Returns:
+        dict with the number of sources merged, samples added, and the
+        records before and after compaction
+    """
+    path = Path(log_path)
+    result = {"sources": 0, "added": 0, "before": 0, "after": 0}
+    for source in source_paths:
+        source = Path(source)
+        if not source.exists() or (path.exists() and source.resolve() == path.resolve()):
+            continue
+        samples = read_samples(source)
+        if len(samples) == 0:
+            continue
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'ab') as f:
+            if f.tell() == 0:
+                f.write(_header())
+            f.write(np.asarray(samples).tobytes())
+        result["sources"] += 1
+        result["added"] += len(samples)
+        del samples
+
+    if result["added"]:
+        result.update(compact(log_path))
+    return result
+
+
+def velocity(log_path: str, since: Optional[int] = None, until: Optional[int] = None,
+             video_ids: Optional[Iterable[int]] = None) -> np.ndarray:
+    """
+    Growth of each video between its first and last sample in a time window
+
+    Args:
+        log_path: Path to the stats log
+        since: Only use samples at or after this unix time
+        until: Only use samples before this unix time
+        video_ids: Only these videos
+
+    Returns:
+        Structured array with video_id, samples, first/last timestamp, the
+        delta of each counter and views_per_hour
+    """
+    samples = read_samples(log_path)
+    mask = np.ones(len(samples), dtype=bool)
+    if since is not None:
+        mask &= samples['timestamp'] >= since
+    if until is not None:
+        mask &= samples['timestamp'] < until
+    if video_ids is not None:
+        mask &= np.isin(samples['video_id'], np.fromiter((int(v) for v in video_ids), dtype=np.uint64))
+
+    data = _sorted(np.asarray(samples[mask]))
+    result_dtype = [('video_id', '<u8'), ('samples', '<i8'), ('first', '<i8'), ('last', '<i8')] + \
+        [(f'delta_{name}', '<i8') for name in COUNTERS] + [('views_per_hour', '<f8')]
+    if len(data) == 0:
+        return np.empty(0, dtype=result_dtype)
+
+    starts = np.flatnonzero(np.r_[True, data['video_id'][1:] != data['video_id'][:-1]])
+    ends = np.r_[starts[1:], len(data)] - 1
+
+    result = np.empty(len(starts), dtype=result_dtype)
+    result['video_id'] = data['video_id'][starts]
+    result['samples'] = ends - starts + 1
+    result['first'] = data['timestamp'][starts]
+    result['last'] = data['timestamp'][ends]
+    for name in COUNTERS:
+        result[f'delta_{name}'] = data[name][ends] - data[name][starts]
+    hours = (result['last'] - result['first']) / 3600.0
+    result['views_per_hour'] = np.divide(result['delta_views'], hours,
+                                         out=np.zeros(len(result)), where=hours > 0)
+    return result
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Thumbnail capture with one shared browser
+
+Cover images are screenshotted into thumbnails/<user>/<video id>.jpg. One
+Chromium is launched on the first capture of a run and kept alive, and
+screenshots are taken concurrently from a bounded pool of pages. A
+thumbnail that already exists is never captured again, and concurrent
+requests for the same one share a single capture.
+"""
+
+import asyncio
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+from playwright.async_api import async_playwright
+
+# The screenshot quality the old per-image browser used
+JPEG_QUALITY = 20
+
+
+def thumbnail_path(user: str, video_id: str, root: str = 'thumbnails') -> Path:
+    """Where the thumbnail of a video is cached"""
+    return Path(root) / user / f'{video_id}.jpg'
+
+
+class ThumbnailCapture:
+    def __init__(self, pages: int = 4, root: str = 'thumbnails', timeout: float = 15.0,
+                 quality: int = JPEG_QUALITY):
+        """
+        Initialize the capture service
+
+        Args:
+            pages: Maximum number of screenshots in flight (pages kept open)
+            root: Directory thumbnails are cached under
+            timeout: Seconds to wait for a cover image to load
+            quality: JPEG quality of the screenshots
+        """
+        self.pages = max(1, pages)
+        self.root = root
+        self.timeout = timeout
+        self.quality = quality
+        self.captured = 0
+        self.cached = 0
+        self.failed = 0
+        self.unavailable = False
+
+        self._playwright = None
+        self._browser = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._start_lock = asyncio.Lock()
+        self._in_flight: Dict[Path, asyncio.Task] = {}
+
+    async def start(self):
+        """Launch the browser and open the page pool (done on the first capture)"""
+        async with self._start_lock:
+            if self._browser is not None:
+                return
+            self._playwright = await async_playwright().start()
+            try:
+                self._browser = await self._playwright.chromium.launch()
+                self._idle = asyncio.Queue()
+                for _ in range(self.pages):
+                    self._idle.put_nowait(await self._browser.new_page())
+            except Exception:
+                await self.close()
+                raise
+            print(f'🖼️  Thumbnail browser ready with {self.pages} pages')
+
+    async def close(self):
+        """Close the browser; a later capture starts a new one"""
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception as e:
+                print(f'⚠️  Error closing thumbnail browser: {e}')
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._browser = None
+        self._playwright = None
+        self._idle = None
+
+    def stats(self) -> dict:
+        return {"captured": self.captured, "cached": self.cached, "failed": self.failed}
+
+    async def thumbnail(self, user: str, video_id: str, url: str) -> Optional[Path]:
+        """
+        Return the cached thumbnail of a video, capturing it if needed
+
+        Args:
+            user: TikTok username (the cache directory)
+            video_id: Video id (the cache file name)
+            url: Cover image URL to screenshot
+
+        Returns:
+            Path of the thumbnail, or None if it could not be captured
+        """
+        path = thumbnail_path(user, video_id, self.root)
+        if path.is_file():
+            self.cached += 1
+            return path
+        if not url or self.unavailable:
+            return None
+
+        task = self._in_flight.get(path)
+        if task is None:
+            task = asyncio.ensure_future(self._capture(url, path))
+            self._in_flight[path] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(path, None))
+        return await asyncio.shield(task)
+
+    async def _capture(self, url: str, path: Path) -> Optional[Path]:
+        try:
+            await self.start()
+        except Exception as e:
+            # Without a browser the feeds are still written, just without thumbnails
+            if not self.unavailable:
+                print(f'❌ Could not start the thumbnail browser, skipping thumbnails: {e}')
+            self.unavailable = True
+            return None
+
+        page = await self._idle.get()
+        tmp_path = path.with_name(path.name + '.tmp')
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            await page.goto(url, timeout=self.timeout * 1000)
+            await page.screenshot(path=str(tmp_path), quality=self.quality, type='jpeg')
+            # Only a complete screenshot may take the cached name
+            os.replace(tmp_path, path)
+            self.captured += 1
+            return path
+        except Exception as e:
+            print(f'⚠️  Could not capture thumbnail {path}: {e}')
+            self.failed += 1
+            tmp_path.unlink(missing_ok=True)
+            if page.is_closed():
+                try:
+                    page = await self._browser.new_page()
+                except Exception as e:
+                    print(f'⚠️  Could not reopen a thumbnail page: {e}')
+            return None
+        finally:
+            self._idle.put_nowait(page)
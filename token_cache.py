@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+On-disk cache for the TikTok msToken and cookies
+
+Avoids launching Chromium just to read the msToken cookie when a recent
+token is already known.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+
+def load_cached_token(cache_path: str) -> Optional[dict]:
+    """
+    Load a cached token if it exists and has not expired
+
+    Args:
+        cache_path: Path to the cache file
+
+    Returns:
+        dict with ms_token, cookies, fetched_at and expires_at, or None
+    """
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠️  Ignoring unreadable msToken cache {cache_path}: {e}")
+        return None
+
+    if not data.get('ms_token'):
+        return None
+    if data.get('expires_at', 0) <= time.time():
+        return None
+    return data
+
+
+def save_token(cache_path: str, ms_token: str, cookies: Optional[dict] = None, ttl: float = 6 * 3600):
+    """
+    Store a token and its cookies with an expiry time
+
+    Args:
+        cache_path: Path to the cache file
+        ms_token: msToken cookie value
+        cookies: Other TikTok cookies as a name -> value mapping
+        ttl: Seconds until the cached token expires
+    """
+    if not ms_token:
+        return
+
+    now = time.time()
+    data = {
+        "ms_token": ms_token,
+        "cookies": cookies or {},
+        "fetched_at": now,
+        "expires_at": now + ttl
+    }
+
+    path = Path(cache_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.chmod(tmp_path, 0o600)
+    os.replace(tmp_path, path)
+
+
+def invalidate_token(cache_path: str):
+    """Remove the cached token, e.g. after TikTok rejected it"""
+    try:
+        os.remove(cache_path)
+        print(f"🗑️  Invalidated msToken cache {cache_path}")
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+SQLite-backed store for users, videos and stats
+
+postprocessing upserts every scraped feed here and json_manager can read
+from it instead of re-parsing every file in json/. A store that did not
+exist yet (e.g. on a fresh CI runner) is backfilled from json/ first, so
+it always covers every user and not only the ones scraped in this run.
+"""
+
+import json
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from records import NO_STATS, UserFeed, VideoRecord, VideoStats
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user TEXT PRIMARY KEY,
+    updated TEXT,
+    retrieved_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS videos (
+    video_id TEXT PRIMARY KEY,
+    user TEXT NOT NULL REFERENCES users(user),
+    link TEXT,
+    title TEXT,
+    description TEXT,
+    created_time TEXT,
+    created_ts INTEGER,
+    cover_url TEXT,
+    thumbnail_url TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_videos_user_created ON videos(user, created_ts);
+CREATE INDEX IF NOT EXISTS idx_videos_created ON videos(created_ts);
+
+CREATE TABLE IF NOT EXISTS stats (
+    video_id TEXT PRIMARY KEY REFERENCES videos(video_id),
+    views INTEGER DEFAULT 0,
+    likes INTEGER DEFAULT 0,
+    comments INTEGER DEFAULT 0,
+    shares INTEGER DEFAULT 0
+);
+"""
+
+VIDEO_COLUMNS = """
+    v.video_id, v.user, v.link, v.title, v.description, v.created_time,
+    v.cover_url, v.thumbnail_url, s.views, s.likes, s.comments, s.shares
+"""
+
+
+def _timestamp(iso_time: Optional[str]) -> Optional[int]:
+    """Convert an ISO 8601 time to a unix timestamp for indexing"""
+    if not iso_time:
+        return None
+    try:
+        return int(datetime.fromisoformat(iso_time).timestamp())
+    except ValueError:
+        return None
+
+
+def _stats_row(video: VideoRecord) -> tuple:
+    stats = video.stats or NO_STATS
+    return (video.id, stats.views, stats.likes, stats.comments, stats.shares)
+
+
+def _video_from_row(row) -> VideoRecord:
+    """Rebuild a video record from a query row"""
+    return VideoRecord(
+        row["video_id"], row["link"], row["title"] or "", row["description"] or "",
+        row["created_time"], cover_url=row["cover_url"], thumbnail_url=row["thumbnail_url"],
+        author=row["user"],
+        stats=VideoStats(row["views"] or 0, row["likes"] or 0,
+                         row["comments"] or 0, row["shares"] or 0))
+
+
+class VideoStore:
+    def __init__(self, db_path: str = "tiktok.db"):
+        """
+        Open (and create if needed) the video store
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = db_path
+        # True if the database file did not exist before it was opened
+        self.created = db_path == ':memory:' or not os.path.exists(db_path)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def upsert_user_feed(self, feed: UserFeed):
+        """Insert or update a user and all of their videos and stats"""
+        user = feed.user
+        if not user:
+            return
+
+        retrieved_at = (feed.user_info or {}).get("retrieved_at")
+        with self.conn:
+            self.conn.execute(
+                """INSERT INTO users (user, updated, retrieved_at) VALUES (?, ?, ?)
+                   ON CONFLICT(user) DO UPDATE SET
+                       updated = excluded.updated,
+                       retrieved_at = COALESCE(excluded.retrieved_at, users.retrieved_at)""",
+                (user, feed.updated, retrieved_at))
+
+            videos = [video for video in feed.videos if video.id]
+            self.conn.executemany(
+                """INSERT INTO videos (video_id, user, link, title, description,
+                                       created_time, created_ts, cover_url, thumbnail_url)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(video_id) DO UPDATE SET
+                       user = excluded.user,
+                       link = excluded.link,
+                       title = excluded.title,
+                       description = excluded.description,
+                       created_time = excluded.created_time,
+                       created_ts = excluded.created_ts,
+                       cover_url = excluded.cover_url,
+                       thumbnail_url = COALESCE(excluded.thumbnail_url, videos.thumbnail_url)""",
+                [(video.id, user, video.link, video.title, video.description,
+                  video.created_time, _timestamp(video.created_time), video.cover_url,
+                  video.thumbnail_url)
+                 for video in videos])
+
+            self.conn.executemany(
+                """INSERT INTO stats (video_id, views, likes, comments, shares)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(video_id) DO UPDATE SET
+                       views = excluded.views,
+                       likes = excluded.likes,
+                       comments = excluded.comments,
+                       shares = excluded.shares""",
+                [_stats_row(video) for video in videos])
+
+    def backfill_from_json(self, json_dir: str = 'json') -> int:
+        """
+        Upsert every json/<user>.json into the store
+
+        Args:
+            json_dir: Directory of user JSON files
+
+        Returns:
+            Number of users loaded
+        """
+        loaded = 0
+        for json_file in sorted(Path(json_dir).glob('*.json')):
+            try:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    feed = UserFeed.from_dict(json.load(f), json_file.stem)
+            except Exception as e:
+                print(f"❌ Error reading {json_file}: {e}")
+                continue
+            self.upsert_user_feed(feed)
+            loaded += 1
+        return loaded
+
+    def query_videos(self, users: Optional[List[str]] = None, since: Optional[str] = None,
+                     until: Optional[str] = None, limit: Optional[int] = None) -> List[VideoRecord]:
+        """
+        Query videos with indexed filters
+
+        Args:
+            users: Only videos from these users
+            since: Only videos created at or after this ISO 8601 time
+            until: Only videos created before this ISO 8601 time
+            limit: Maximum number of videos, newest first
+
+        Returns:
+            Video records, newest first
+        """
+        where = []
+        params = []
+        if users:
+            where.append(f"v.user IN ({','.join('?' for _ in users)})")
+            params.extend(users)
+        if since:
+            where.append("v.created_ts >= ?")
+            params.append(_timestamp(since))
+        if until:
+            where.append("v.created_ts < ?")
+            params.append(_timestamp(until))
+
+        sql = f"SELECT {VIDEO_COLUMNS} FROM videos v LEFT JOIN stats s ON s.video_id = v.video_id"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY v.created_ts DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        return [_video_from_row(row) for row in self.conn.execute(sql, params)]
+
+    def iter_user_feeds(self) -> Iterator[UserFeed]:
+        """Yield one UserFeed per user"""
+        users = self.conn.execute(
+            "SELECT user, updated FROM users ORDER BY user").fetchall()
+        for user_row in users:
+            rows = self.conn.execute(
+                f"""SELECT {VIDEO_COLUMNS} FROM videos v
+                    LEFT JOIN stats s ON s.video_id = v.video_id
+                    WHERE v.user = ? ORDER BY v.created_ts DESC""",
+                (user_row["user"],))
+            yield UserFeed(user_row["user"], user_row["updated"],
+                           [_video_from_row(row) for row in rows])
+
+    def counts(self) -> dict:
+        """Number of users and videos in the store"""
+        return {
+            "users": self.conn.execute("SELECT COUNT(*) FROM users").fetchone()[0],
+            "videos": self.conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+        }